@@ -0,0 +1,160 @@
+"""Server-sent events fan-out of TaskManager changes.
+
+`TaskEventBroadcaster.publish` is registered as a TaskManager listener and turns
+every TaskChange into one SSE frame, encoded once and shared by all subscribers.
+Event ids are `<epoch>.<version>`, so a Last-Event-ID from before a restart (or
+from another process) is answered with a `reset` rather than a wrong replay.
+Each subscriber has a bounded buffer: a client that falls `max_buffered` events
+behind has its buffer dropped and receives a single `reset` event, after which
+it should resync through GET /tasks/changes.
+"""
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from backend.serialization import encode_change
+from backend.tasks import TaskChange, TaskChangeFeed, TaskManager
+
+RESET_FRAME = b"event: reset\ndata: {}\n\n"
+HEARTBEAT_FRAME = b": ping\n\n"
+
+
+def event_id(epoch: str, version: int) -> str:
+    """The SSE id of `version`: just the number when there is no epoch."""
+    return f"{epoch}.{version}" if epoch else str(version)
+
+
+def parse_event_id(value: str, epoch: str) -> int | None:
+    """The version in a Last-Event-ID, or None if it is malformed or from another epoch."""
+    tag, _, version = value.rpartition(".")
+    if tag != epoch or not version.isdigit():
+        return None
+    return int(version)
+
+
+def change_frame(change: TaskChange, epoch: str = "") -> bytes:
+    """Encode a change as an SSE frame whose id is the version it produced."""
+    return b"id: %s\nevent: %s\ndata: %b\n\n" % (
+        event_id(epoch, change.version).encode(), change.op.encode(), encode_change(change)
+    )
+
+
+class Subscription:
+    """One client's bounded frame buffer, owned by the event loop serving it."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_buffered: int):
+        self.loop = loop
+        self.max_buffered = max_buffered
+        self.overflowed = False
+        self.dropped = 0
+        # Frames for versions up to this one were already sent as a replay.
+        self.skip_through = 0
+        self._frames: deque[bytes] = deque()
+        self._ready = asyncio.Event()
+
+    def offer(self, version: int, frame: bytes) -> None:
+        """Buffer a frame; must run on `self.loop`."""
+        if version <= self.skip_through:
+            return
+        if self.overflowed:
+            self.dropped += 1
+            return
+        if len(self._frames) >= self.max_buffered:
+            self.dropped += len(self._frames) + 1
+            self._frames.clear()
+            self.overflowed = True
+        else:
+            self._frames.append(frame)
+        self._ready.set()
+
+    async def drain(self, timeout: float) -> list[bytes]:
+        """Wait up to `timeout` seconds and return everything buffered ([] on timeout)."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except TimeoutError:
+            return []
+        self._ready.clear()
+        if self.overflowed:
+            self.overflowed = False
+            return [RESET_FRAME]
+        frames = list(self._frames)
+        self._frames.clear()
+        return frames
+
+
+class TaskEventBroadcaster:
+    """Fans TaskManager changes out to SSE subscribers."""
+
+    def __init__(self, max_buffered: int = 1_000, heartbeat: float = 15.0, manager: TaskChangeFeed | None = None):
+        self.max_buffered = max_buffered
+        self.heartbeat = heartbeat
+        # The publishing manager, whose epoch goes in every event id.
+        self.manager = manager
+        self._subscribers: set[Subscription] = set()
+
+    @property
+    def epoch(self) -> str:
+        """The manager's current epoch, read per event: a restore starts a new one."""
+        return self.manager.epoch if self.manager is not None else ""
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop(), self.max_buffered)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, change: TaskChange) -> None:
+        """TaskManager listener: queue `change` for every subscriber, from any thread."""
+        if not self._subscribers:
+            return
+        frame = change_frame(change, self.epoch)
+        try:
+            running: asyncio.AbstractEventLoop | None = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for subscription in list(self._subscribers):
+            if subscription.loop is running:
+                subscription.offer(change.version, frame)
+            else:
+                subscription.loop.call_soon_threadsafe(subscription.offer, change.version, frame)
+
+    async def stream(
+        self,
+        manager: TaskManager,
+        last_event_id: str | None,
+        is_disconnected: Callable[[], Awaitable[bool]],
+    ) -> AsyncIterator[bytes]:
+        """Yield SSE bytes for one client until it disconnects.
+
+        A reconnecting EventSource sends Last-Event-ID; the changes it missed are
+        replayed from the manager's change log, or a reset is sent if they are gone.
+        """
+        subscription = self.subscribe()
+        try:
+            if last_event_id is not None:
+                # Read together, so a write landing in between is neither replayed twice nor lost.
+                with manager.locked():
+                    epoch = self.epoch
+                    version = parse_event_id(last_event_id, epoch)
+                    missed = None if version is None else manager.changes_since(version)
+                    subscription.skip_through = manager.version
+                if missed is None:
+                    yield RESET_FRAME
+                elif missed:
+                    yield b"".join(change_frame(change, epoch) for change in missed)
+            while True:
+                frames = await subscription.drain(self.heartbeat)
+                if frames:
+                    yield b"".join(frames)
+                elif await is_disconnected():
+                    return
+                else:
+                    yield HEARTBEAT_FRAME
+        finally:
+            self.unsubscribe(subscription)
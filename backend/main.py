@@ -1,37 +1,251 @@
-"""FastAPI app providing task management endpoints."""
+"""FastAPI app providing task management endpoints.
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from backend.tasks import TaskManager, Task
+Tasks are kept in memory; set TASKS_DATA_DIR to persist them with a
+write-ahead log and snapshots in that directory (see backend/storage.py), or
+set TASKS_DATABASE_URL to keep them in the Postgres `tasks` table instead
+(see backend/postgres.py).
+"""
 
+from contextlib import asynccontextmanager
+import os
 
-app = FastAPI(title="Task Manager API", version="1.0.0")
-manager = TaskManager()
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+
+from backend.events import TaskEventBroadcaster
+from backend.postgres import PostgresTaskManager
+from backend.serialization import FastJSONResponse, dumps, encode_change, join_array
+from backend.storage import WALTaskStorage
+from backend.tasks import TaskManager, normalize_priority
+from commons.database import DatabaseConfig
+
+database_url = os.environ.get("TASKS_DATABASE_URL")
+manager = (
+    PostgresTaskManager(DatabaseConfig.from_dsn(database_url)) if database_url else TaskManager(thread_safe=True)
+)
+broadcaster = TaskEventBroadcaster(manager=manager)
+manager.add_listener(broadcaster.publish)
+data_dir = None if database_url else os.environ.get("TASKS_DATA_DIR")
+storage = WALTaskStorage(data_dir) if data_dir else None
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    if isinstance(manager, PostgresTaskManager):
+        with manager:
+            yield
+        return
+    if storage is None:
+        yield
+        return
+    with storage:
+        storage.open(manager)
+        yield
+
+
+app = FastAPI(
+    title="Task Manager API",
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
+)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_SIZE = 10_000
 
 
 class TaskCreate(BaseModel):
     desc: str
-    priority: str = Field(default="medium", pattern="^(high|medium|low)$")
+    priority: str = "medium"
+
+    @field_validator("priority")
+    @classmethod
+    def _canonical_priority(cls, value: str) -> str:
+        return normalize_priority(value)
+
+
+class TaskBatchCreate(BaseModel):
+    tasks: list[TaskCreate] = Field(max_length=MAX_BATCH_SIZE)
+
+
+class TaskIdBatch(BaseModel):
+    ids: list[int] = Field(max_length=MAX_BATCH_SIZE)
+
+
+async def _call(method, *args):
+    """Call a manager method, in the threadpool when the store blocks on I/O."""
+    if manager.blocking:
+        return await run_in_threadpool(method, *args)
+    return method(*args)
+
+
+async def _write(method, *args):
+    """Call a mutating manager method; with TASKS_DATA_DIR, return once the change is on disk.
+
+    A ValueError from the store (such as a description too long for it) is a 422.
+    """
+    try:
+        result = await _call(method, *args)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from None
+    if storage is not None:
+        await run_in_threadpool(storage.wait_for_commit)
+    return result
+
+
+def _encode_cursor(task_id: int | None) -> str | None:
+    return None if task_id is None else format(task_id, "x")
+
+
+def _decode_cursor(cursor: str | None) -> int:
+    """Decode an opaque page cursor; the empty cursor starts from the beginning."""
+    if not cursor:
+        return 0
+    try:
+        return int(cursor, 16)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+
+def _parse_priority(priority: str | None) -> str | None:
+    """Canonicalize a priority filter with the same case-insensitive lookup as TaskCreate."""
+    if priority is None:
+        return None
+    try:
+        return normalize_priority(priority)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from None
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak If-None-Match comparison, as used for GET (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _matching_tasks(priority: str | None, completed: bool | None) -> list:
+    tasks = manager.get_tasks_by_priority(priority) if priority is not None else manager.list_tasks()
+    return tasks if completed is None else [t for t in tasks if t.completed == completed]
 
 
 @app.get("/tasks")
-async def get_tasks():
-    """Get all tasks."""
-    tasks = manager.list_tasks()
-    return [{"id": t.id, "description": t.description, "priority": t.priority, "completed": t.completed} for t in tasks]
+async def get_tasks(
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    priority: str | None = None,
+    completed: bool | None = None,
+    if_none_match: str | None = Header(None),
+):
+    """Get tasks in creation order, optionally filtered.
+
+    With `limit` or `cursor`, the response is one page, `{"items", "next_cursor"}`
+    (`limit` defaults to 100): pass `next_cursor` back as `cursor` to fetch the
+    next page; it is null on the last page. Without either, it is the bare list
+    of every matching task, as before pagination was added. The ETag is the manager epoch and version, so a
+    client sending it back in If-None-Match gets a 304 until something changes
+    (or the server restarts).
+    """
+    # Read the version before the tasks: a concurrent change can only make the tag stale, never wrong.
+    priority = _parse_priority(priority)
+    etag = f'"{manager.epoch}-{manager.version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    if limit is None and cursor is None:
+        tasks = await _call(_matching_tasks, priority, completed)
+        return FastJSONResponse(join_array([t.to_json() for t in tasks]), headers=headers)
+    limit = limit or DEFAULT_PAGE_SIZE
+    tasks, next_id = await _call(manager.page_tasks, _decode_cursor(cursor), limit, priority, completed)
+    items = join_array([t.to_json() for t in tasks])
+    return FastJSONResponse(
+        b'{"items":' + items + b',"next_cursor":' + dumps(_encode_cursor(next_id)) + b"}",
+        headers=headers,
+    )
+
+
+@app.get("/tasks/changes")
+async def get_task_changes(since: int = Query(0, ge=0), epoch: str | None = None):
+    """Get the changes made after version `since` of `epoch`.
+
+    Changes are applied in order: "add" and "complete" carry the task's current
+    state, "remove" carries a null task. Pass back the `epoch` and `version` of
+    the last response. Without an epoch, with one from before a restart, or when
+    `since` is older than the retained change log, the response has
+    `reset: true` and the full task list instead.
+    """
+    # Read together, so `version` is exactly the last change returned.
+    with manager.locked():
+        current, version = manager.epoch, manager.version
+        changes = manager.changes_since(since) if epoch == current else None
+    head = b'{"epoch":"%s","version":%d' % (current.encode(), version)
+    if changes is None:
+        tasks = join_array([t.to_json() for t in await _call(manager.list_tasks)])
+        return FastJSONResponse(head + b',"reset":true,"tasks":%b}' % tasks)
+    items = join_array([encode_change(c) for c in changes])
+    return FastJSONResponse(head + b',"reset":false,"changes":%b}' % items)
+
+
+@app.get("/tasks/events")
+async def stream_task_events(request: Request, last_event_id: str | None = Header(None)):
+    """Push every task change as a server-sent event.
+
+    Each event is named after the change op and carries the same JSON as one
+    /tasks/changes entry, with `<epoch>.<version>` as the event id. A `reset`
+    event means the client fell too far behind (or the server restarted) and
+    should resync through /tasks/changes.
+    """
+    return StreamingResponse(
+        broadcaster.stream(manager, last_event_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/tasks")
 async def create_task(task_data: TaskCreate):
     """Create a new task."""
-    task = manager.add_task(task_data.desc, task_data.priority)
-    return {"id": task.id, "description": task.description, "priority": task.priority, "completed": task.completed}
+    task = await _write(manager.add_task, task_data.desc, task_data.priority)
+    return FastJSONResponse(task.to_json())
+
+
+@app.post("/tasks/batch")
+async def create_tasks(batch: TaskBatchCreate):
+    """Create many tasks in one request; items are returned in request order."""
+    tasks = await _write(manager.add_tasks, [(item.desc, item.priority) for item in batch.tasks])
+    return FastJSONResponse(b'{"items":' + join_array([t.to_json() for t in tasks]) + b"}")
+
+
+def _batch_results(task_ids: list[int], found: list[bool]) -> dict:
+    return {
+        "results": [
+            {"id": task_id, "status": "success" if ok else "not_found"}
+            for task_id, ok in zip(task_ids, found, strict=True)
+        ]
+    }
+
+
+@app.post("/tasks/batch/complete")
+async def complete_tasks(batch: TaskIdBatch):
+    """Mark many tasks as completed, with a per-id status."""
+    return _batch_results(batch.ids, await _write(manager.complete_tasks, batch.ids))
+
+
+@app.post("/tasks/batch/delete")
+async def delete_tasks(batch: TaskIdBatch):
+    """Delete many tasks, with a per-id status."""
+    return _batch_results(batch.ids, await _write(manager.remove_tasks, batch.ids))
 
 
 @app.put("/tasks/{task_id}")
 async def complete_task(task_id: int):
     """Mark a task as completed."""
-    success = manager.complete_task(task_id)
+    success = await _write(manager.complete_task, task_id)
     if not success:
         raise HTTPException(status_code=404, detail="Task not found")
     return {"status": "success"}
@@ -40,7 +254,7 @@ async def complete_task(task_id: int):
 @app.delete("/tasks/{task_id}")
 async def delete_task(task_id: int):
     """Delete a task."""
-    success = manager.remove_task(task_id)
+    success = await _write(manager.remove_task, task_id)
     if not success:
         raise HTTPException(status_code=404, detail="Task not found")
     return {"status": "success"}
@@ -49,4 +263,4 @@ async def delete_task(task_id: int):
 @app.get("/")
 async def root():
     """Health check endpoint."""
-    return {"message": "Task Manager API is running"} 
\ No newline at end of file
+    return {"message": "Task Manager API is running"}
@@ -0,0 +1,279 @@
+"""Task store backed by the `tasks` table created by setup_database.py.
+
+API ids are `tasks.number`, a BIGSERIAL kept next to the UUID primary key.
+Descriptions are stored as titles, so they are limited to the column's 255
+characters; `completed` means status = 'completed', and the schema's extra
+'urgent' priority reads back as "high".
+
+Connections come from a commons.database pool, and each connection prepares
+the statements below once, so most calls are a single EXECUTE round trip.
+Calls wait on the network, so `blocking` is True and backend/main.py runs them
+in its threadpool: the event loop stays free while up to `max_size` queries
+are in flight.
+
+The version counter and change log live in this process; it must be the only
+writer for ETags and the change feed to be exact. The manager lock covers each
+write's commit and the recording of its changes, so versions follow commit
+order; the statements themselves run on separate pooled connections at the
+same time.
+"""
+
+from collections.abc import Iterable, Iterator
+from contextlib import closing, contextmanager
+
+import psycopg2
+from psycopg2.extensions import connection as Connection
+from psycopg2.extensions import cursor as Cursor
+
+from backend.tasks import PRIORITY_VALUES, Task, TaskChangeFeed, normalize_priority
+from commons.database import ConnectionPool, DatabaseConfig
+
+MAX_DESCRIPTION_LENGTH = 255  # tasks.title is VARCHAR(255)
+_COLUMNS = "number, title, priority, status = 'completed', EXTRACT(EPOCH FROM created_at)::float8"
+# Stored priorities for each API priority; 'urgent' only exists in the schema.
+_DB_PRIORITIES = {"high": ["high", "urgent"], "medium": ["medium"], "low": ["low"]}
+_API_PRIORITY = {"urgent": "high", None: "medium"}
+_STATUS_FILTERS = {None: "", True: " AND status = 'completed'", False: " AND status <> 'completed'"}
+_STATUS_NAMES = {None: "all", True: "completed", False: "pending"}
+
+
+def _page_statement(by_priority: bool, completed: bool | None) -> str:
+    return f"page_{'priority_' if by_priority else ''}{_STATUS_NAMES[completed]}"
+
+
+# name -> (parameter types, statement), prepared on every pooled connection.
+_STATEMENTS: dict[str, tuple[str, str]] = {
+    "task_get": ("bigint", f"SELECT {_COLUMNS} FROM tasks WHERE number = $1"),
+    "task_add": (
+        "text, text, float8",
+        "INSERT INTO tasks (title, priority, created_at) VALUES ($1, $2, to_timestamp($3)) RETURNING number",
+    ),
+    "task_add_many": (
+        "text[], text[], float8[]",
+        "INSERT INTO tasks (title, priority, created_at) "
+        "SELECT title, priority, to_timestamp(ts) FROM unnest($1, $2, $3) AS new (title, priority, ts) "
+        "RETURNING number",
+    ),
+    "task_complete": (
+        "bigint[]",
+        "UPDATE tasks SET status = 'completed', completed_at = CURRENT_TIMESTAMP "
+        f"WHERE number = ANY($1) AND status <> 'completed' RETURNING {_COLUMNS}",
+    ),
+    "task_exists": ("bigint[]", "SELECT number FROM tasks WHERE number = ANY($1)"),
+    "task_remove": ("bigint[]", "DELETE FROM tasks WHERE number = ANY($1) RETURNING number"),
+}
+for _by_priority in (False, True):
+    for _completed, _status_filter in _STATUS_FILTERS.items():
+        _STATEMENTS[_page_statement(_by_priority, _completed)] = (
+            "bigint, bigint" + (", text[]" if _by_priority else ""),
+            f"SELECT {_COLUMNS} FROM tasks WHERE number > $1"
+            + (" AND priority = ANY($3)" if _by_priority else "")
+            + _status_filter
+            + " ORDER BY number LIMIT $2",
+        )
+
+
+def _prepare(conn: Connection) -> None:
+    with conn.cursor() as cursor:
+        for name, (types, statement) in _STATEMENTS.items():
+            cursor.execute(f"PREPARE {name} ({types}) AS {statement}")
+
+
+def _to_task(row: tuple) -> Task:
+    number, title, priority, completed, created_ts = row
+    return Task.restore(number, title, _API_PRIORITY.get(priority, priority), completed, created_ts)
+
+
+class PostgresTaskManager(TaskChangeFeed):
+    """TaskManager interface over Postgres; use as a context manager or call open/close."""
+
+    blocking = True
+
+    def __init__(self, config: DatabaseConfig, change_log_size: int = 10_000):
+        super().__init__(change_log_size, thread_safe=True)
+        # Timestamps are written and read back as epochs, so the session must be in UTC.
+        options = " ".join(filter(None, ["-c timezone=UTC", config.options]))
+        self.config = config.model_copy(update={"options": options})
+        self._pool: ConnectionPool | None = None
+
+    def __enter__(self) -> "PostgresTaskManager":
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def open(self) -> None:
+        """Open the pool; fails fast on a database that predates the `number` column.
+
+        Adding the column rewrites `tasks` under an exclusive lock, so it is left
+        to migrate.py (migration 2) instead of happening when the API starts.
+        """
+        # Before the pool connects, since every prepared statement refers to the column.
+        with closing(psycopg2.connect(**self.config.connect_kwargs())) as conn, conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = 'tasks' AND column_name = 'number'"
+            )
+            if cursor.fetchone() is None:
+                raise RuntimeError("tasks.number is missing; run `python migrate.py` before starting the API")
+        self._pool = ConnectionPool(self.config, configure=_prepare)
+        self._pool.open()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    @contextmanager
+    def _cursor(self) -> Iterator[Cursor]:
+        """A cursor on a pooled connection, in a transaction committed on exit."""
+        with self._pool.cursor() as cursor:
+            yield cursor
+
+    @contextmanager
+    def _committed(self, cursor: Cursor) -> Iterator[None]:
+        """Commit `cursor`'s transaction and keep the manager lock for the block.
+
+        Record changes in the block: a write that waited on another's row locks
+        also commits, and so records, after it.
+        """
+        with self._lock:
+            cursor.connection.commit()
+            yield
+
+    def _query(self, statement: str, *params: object) -> list[Task]:
+        with self._cursor() as cursor:
+            cursor.execute(f"EXECUTE {statement} ({', '.join(['%s'] * len(params))})", params)
+            return [_to_task(row) for row in cursor.fetchall()]
+
+    def add_task(self, description: str, priority: str = "medium") -> Task:
+        """Add a new task and return it."""
+        return self.add_tasks([(description, priority)])[0]
+
+    def add_tasks(self, items: Iterable[tuple[str, str]]) -> list[Task]:
+        """Add (description, priority) pairs in one statement and return the new tasks.
+
+        All items are validated before anything is written.
+        """
+        new_tasks = [Task(0, description, priority) for description, priority in items]
+        if any(len(task.description) > MAX_DESCRIPTION_LENGTH for task in new_tasks):
+            raise ValueError(f"Description must be at most {MAX_DESCRIPTION_LENGTH} characters")
+        if not new_tasks:
+            return []
+        with self._cursor() as cursor:
+            if len(new_tasks) == 1:
+                task = new_tasks[0]
+                cursor.execute("EXECUTE task_add (%s, %s, %s)", (task.description, task.priority, task.created_ts))
+            else:
+                cursor.execute(
+                    "EXECUTE task_add_many (%s, %s, %s)",
+                    (
+                        [t.description for t in new_tasks],
+                        [t.priority for t in new_tasks],
+                        [t.created_ts for t in new_tasks],
+                    ),
+                )
+            # Numbers are drawn in insertion order, which is the order of `items`.
+            numbers = sorted(row[0] for row in cursor.fetchall())
+            with self._committed(cursor):
+                for task, number in zip(new_tasks, numbers, strict=True):
+                    task.id = number
+                    self._record("add", number, task)
+        return new_tasks
+
+    def list_tasks(self) -> list[Task]:
+        """Return all tasks in id order."""
+        return self._query("page_all", 0, None)
+
+    def get_task(self, task_id: int) -> Task | None:
+        """Get a task by its ID."""
+        tasks = self._query("task_get", task_id)
+        return tasks[0] if tasks else None
+
+    def complete_task(self, task_id: int) -> bool:
+        """Mark a task as completed. Returns True if task was found."""
+        return self.complete_tasks([task_id])[0]
+
+    def complete_tasks(self, task_ids: Iterable[int]) -> list[bool]:
+        """Complete several tasks; one found/not-found flag per id, in order."""
+        task_ids = list(task_ids)
+        if not task_ids:
+            return []
+        with self._cursor() as cursor:
+            cursor.execute("EXECUTE task_complete (%s)", (task_ids,))
+            changed = {task.id: task for task in map(_to_task, cursor.fetchall())}
+            found = set(task_ids)
+            if len(changed) < len(found):
+                # Some ids were already completed or do not exist; tell them apart.
+                cursor.execute("EXECUTE task_exists (%s)", (task_ids,))
+                found = {row[0] for row in cursor.fetchall()}
+            with self._committed(cursor):
+                for task_id in task_ids:
+                    task = changed.pop(task_id, None)
+                    if task is not None:
+                        self._record("complete", task_id, task)
+        return [task_id in found for task_id in task_ids]
+
+    def remove_task(self, task_id: int) -> bool:
+        """Remove a task. Returns True if task was found and removed."""
+        return self.remove_tasks([task_id])[0]
+
+    def remove_tasks(self, task_ids: Iterable[int]) -> list[bool]:
+        """Remove several tasks; one found/not-found flag per id, in order."""
+        task_ids = list(task_ids)
+        if not task_ids:
+            return []
+        with self._cursor() as cursor:
+            cursor.execute("EXECUTE task_remove (%s)", (task_ids,))
+            removed = {row[0] for row in cursor.fetchall()}
+            with self._committed(cursor):
+                results = []
+                for task_id in task_ids:
+                    found = task_id in removed
+                    if found:
+                        removed.discard(task_id)
+                        self._record("remove", task_id, None)
+                    results.append(found)
+        return results
+
+    def get_pending_tasks(self) -> list[Task]:
+        """Return all pending (not completed) tasks."""
+        return self._query("page_pending", 0, None)
+
+    def get_completed_tasks(self) -> list[Task]:
+        """Return all completed tasks."""
+        return self._query("page_completed", 0, None)
+
+    def get_tasks_by_priority(self, priority: str) -> list[Task]:
+        """Return tasks filtered by priority level."""
+        try:
+            value = normalize_priority(priority)
+        except ValueError:
+            return []
+        return self._query("page_priority_all", 0, None, _DB_PRIORITIES[value])
+
+    def page_tasks(
+        self,
+        after_id: int = 0,
+        limit: int = 100,
+        priority: str | None = None,
+        completed: bool | None = None,
+    ) -> tuple[list[Task], int | None]:
+        """Return up to `limit` tasks with id > `after_id`, in id order, plus the next cursor."""
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        params: list[object] = [after_id, limit + 1]
+        if priority is not None:
+            try:
+                params.append(_DB_PRIORITIES[normalize_priority(priority)])
+            except ValueError:
+                return [], None
+        tasks = self._query(_page_statement(priority is not None, completed), *params)
+        if len(tasks) > limit:
+            return tasks[:limit], tasks[limit - 1].id
+        return tasks, None
+
+    def get_priority_sorted_tasks(self) -> list[Task]:
+        """Return all tasks sorted by priority (high -> medium -> low)."""
+        return [task for value in PRIORITY_VALUES for task in self.get_tasks_by_priority(value)]
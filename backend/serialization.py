@@ -0,0 +1,60 @@
+"""Fast JSON encoding for task API responses.
+
+Uses orjson when it is installed (`pip install -e ".[fast]"`) and falls back to
+the stdlib json module otherwise. Both paths produce compact UTF-8 bytes.
+"""
+
+import json
+from typing import TYPE_CHECKING, Any
+
+from fastapi.responses import Response
+
+if TYPE_CHECKING:
+    from backend.tasks import TaskChange
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when the extra is not installed
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode `obj` to compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode JSON produced by `dumps`."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def join_array(fragments: list[bytes]) -> bytes:
+    """Join pre-encoded JSON values into a JSON array."""
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def encode_change(change: "TaskChange") -> bytes:
+    """Encode a TaskChange as {"version", "op", "id", "task"}; task is null for removals."""
+    task = change.task.to_json() if change.task is not None else b"null"
+    return b'{"version":%d,"op":"%s","id":%d,"task":%b}' % (
+        change.version, change.op.encode(), change.task_id, task
+    )
+
+
+class FastJSONResponse(Response):
+    """JSON response that skips jsonable_encoder.
+
+    Routes may return pre-encoded bytes, which are sent as-is, or plain
+    JSON-compatible data, which is encoded with `dumps`.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,319 @@
+"""Durable storage for TaskManager: a write-ahead log plus compacted snapshots.
+
+Every TaskChange is appended to the current log segment as one JSON line. A
+background thread group-commits the log: the pending lines are written and
+fsynced together once `commit_interval` seconds have passed since the first of
+them (or as soon as `commit_batch` lines are waiting). Mutations queue their
+line without waiting, since they hold the manager lock; before acknowledging a
+write, call `wait_for_commit()`, which returns once the group holding it is
+fsynced (backend/main.py does this for every mutating request), so a crash
+loses no acknowledged change. `flush()` commits right away instead.
+
+Every `snapshot_every` changes a new log segment is started and the task set is
+written to a snapshot in the background; the segments the snapshot covers are
+then deleted. Recovery maps the snapshot (see backend.snapshot), so tasks are
+only read from it when first accessed, and replays the remaining segments.
+Changes are idempotent upserts by id, so a snapshot may safely include effects
+that are replayed again from the log.
+
+Data directory layout:
+    snapshot.bin        fixed-layout binary snapshot, see backend.snapshot
+    wal-<version>.log   one JSON array per change, starting at <version>:
+                        [version, "a", id, description, priority, created_ts]
+                        [version, "c", id] or [version, "r", id]
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import gc
+import os
+from pathlib import Path
+import threading
+
+from backend.serialization import dumps, loads
+from backend.snapshot import MmapTaskSnapshot, SnapshotRow, capture_rows, write_snapshot
+from backend.tasks import Task, TaskChange, TaskManager
+from commons.logger import sentry_logger as logger
+
+SNAPSHOT_NAME = "snapshot.bin"
+_OP_CODES = {"add": "a", "complete": "c", "remove": "r"}
+_OP_NAMES = {code: op for op, code in _OP_CODES.items()}
+
+
+def encode_record(change: TaskChange) -> bytes:
+    """Encode a change as one log line."""
+    if change.op == "add":
+        task = change.task
+        record = [change.version, "a", task.id, task.description, task.priority, task.created_ts]
+    else:
+        record = [change.version, _OP_CODES[change.op], change.task_id]
+    return dumps(record) + b"\n"
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """Pause the cyclic GC while building millions of acyclic objects.
+
+    Otherwise every allocation threshold triggers a collection that walks all the
+    objects created so far, which makes recovery several times slower.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def _fsync_directory(directory: Path) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class _GroupCommitLog:
+    """Append-only file whose writes are batched and fsynced by a background thread."""
+
+    def __init__(self, path: Path, commit_interval: float, commit_batch: int):
+        self.commits = 0
+        self._interval = commit_interval
+        self._batch = commit_batch
+        self._file = open(path, "ab")  # noqa: SIM115 - open for the log's lifetime, closed in close()
+        # Log lines, and the paths of segments to continue in after the lines before them.
+        self._pending: list[bytes | Path] = []
+        self._closed = False
+        self._cond = threading.Condition()
+        # Set once the pending lines are fsynced; `_last` belongs to the latest line.
+        self._pending_done = threading.Event()
+        self._last = threading.Event()
+        self._last.set()
+        self._error: Exception | None = None
+        # Held while writing, so batches reach the file in the order they were taken.
+        self._io_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="wal-group-commit", daemon=True)
+        self._thread.start()
+
+    def append(self, line: bytes, sync: bool = True) -> threading.Event:
+        """Queue `line`; unless `sync` is False, return only once its group is fsynced.
+
+        The returned event is set when the line is on disk.
+        """
+        with self._cond:
+            self._pending.append(line)
+            done = self._last = self._pending_done
+            if len(self._pending) == 1 or len(self._pending) >= self._batch:
+                self._cond.notify()
+        if sync:
+            self.wait(done)
+        return done
+
+    def wait(self, done: threading.Event | None = None) -> None:
+        """Block until `done` is set, by default until every line appended so far is on disk."""
+        (done or self._last).wait()
+        if self._error is not None:
+            raise OSError("Write-ahead log commit failed") from self._error
+
+    def flush(self) -> None:
+        """Write and fsync everything appended so far."""
+        with self._io_lock:
+            self._commit_pending()
+
+    def rotate(self, path: Path) -> None:
+        """Continue in `path` after the lines appended so far.
+
+        Only queued here, so it is cheap to call inside a mutation; the commit
+        thread (or the next `flush`) writes the earlier lines and switches files.
+        """
+        with self._cond:
+            self._pending.append(path)
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+        self._file.close()
+
+    def _commit_pending(self) -> None:
+        with self._cond:
+            batch, self._pending = self._pending, []
+            done, self._pending_done = self._pending_done, threading.Event()
+        try:
+            lines: list[bytes] = []
+            for item in batch:
+                if isinstance(item, Path):
+                    self._write(lines)
+                    lines = []
+                    self._file.close()
+                    self._file = open(item, "ab")  # noqa: SIM115 - replaces the segment closed above
+                else:
+                    lines.append(item)
+            self._write(lines)
+        except Exception as e:
+            # Waiters must not be left hanging, nor acknowledge a line that may be lost.
+            self._error = e
+            raise
+        finally:
+            done.set()
+
+    def _write(self, lines: list[bytes]) -> None:
+        if lines:
+            self._file.write(b"".join(lines))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.commits += 1
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._closed and len(self._pending) < self._batch:
+                    self._cond.wait(self._interval)  # let the group fill up
+                closed = self._closed
+            if closed:
+                return
+            self.flush()
+
+
+class WALTaskStorage:
+    """Persists a TaskManager to `directory` and restores it on `open`."""
+
+    def __init__(
+        self,
+        directory: str | os.PathLike,
+        commit_interval: float = 0.005,
+        commit_batch: int = 10_000,
+        snapshot_every: int = 100_000,
+    ):
+        self.directory = Path(directory)
+        self.commit_interval = commit_interval
+        self.commit_batch = commit_batch
+        self.snapshot_every = snapshot_every
+        self._manager: TaskManager | None = None
+        self._log: _GroupCommitLog | None = None
+        self._changes_since_snapshot = 0
+        self._snapshot_thread: threading.Thread | None = None
+
+    def __enter__(self) -> "WALTaskStorage":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def open(self, manager: TaskManager) -> None:
+        """Load the persisted state into `manager` and log its changes from now on."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with _gc_paused():
+            self._recover(manager)
+        version = manager.version
+        # Always start a fresh segment, so nothing is appended after a torn tail.
+        self._log = _GroupCommitLog(self._segment_path(version + 1), self.commit_interval, self.commit_batch)
+        self._manager = manager
+        manager.add_listener(self._on_change)
+        logger.info(f"Task storage opened at {self.directory}: {len(manager.tasks):,} tasks, version {version:,}")
+
+    def flush(self) -> None:
+        """Commit every change so far now, and block until it is on disk."""
+        if self._log is not None:
+            self._log.flush()
+
+    def wait_for_commit(self) -> None:
+        """Block until every change so far is on disk, as part of its group commit.
+
+        Raises OSError if the commit failed.
+        """
+        if self._log is not None:
+            self._log.wait()
+
+    def snapshot(self) -> None:
+        """Write a snapshot now and wait for it.
+
+        Without thread_safe, call it from the thread that mutates the manager.
+        """
+        self._begin_snapshot()
+        self._wait_for_snapshot()
+
+    def close(self) -> None:
+        if self._manager is not None:
+            self._manager.remove_listener(self._on_change)
+            self._manager = None
+        self._wait_for_snapshot()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def _segment_path(self, first_version: int) -> Path:
+        return self.directory / f"wal-{first_version:020d}.log"
+
+    def _segments(self) -> list[tuple[int, Path]]:
+        return sorted((int(path.stem[4:]), path) for path in self.directory.glob("wal-*.log"))
+
+    def _on_change(self, change: TaskChange) -> None:
+        self._log.append(encode_record(change), sync=False)  # the caller waits, outside the manager lock
+        self._changes_since_snapshot += 1
+        if self._changes_since_snapshot >= self.snapshot_every and not self._snapshot_running():
+            self._begin_snapshot()
+
+    def _begin_snapshot(self) -> None:
+        """Capture the task set and switch log segments; the file is written in the background.
+
+        Runs inside a mutation (or with the manager lock held), so the task list,
+        version and segment switch are consistent with each other. Nothing here
+        touches the disk: the segment switch is queued on the log.
+        """
+        self._wait_for_snapshot()
+        manager = self._manager
+        with manager.locked():
+            rows = capture_rows(manager.tasks)
+            version, next_id = manager.version, manager.next_id
+            self._log.rotate(self._segment_path(version + 1))
+            self._changes_since_snapshot = 0
+        self._snapshot_thread = threading.Thread(
+            target=self._write_snapshot, args=(rows, next_id, version), name="task-snapshot", daemon=True
+        )
+        self._snapshot_thread.start()
+
+    def _snapshot_running(self) -> bool:
+        return self._snapshot_thread is not None and self._snapshot_thread.is_alive()
+
+    def _wait_for_snapshot(self) -> None:
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+            self._snapshot_thread = None
+
+    def _write_snapshot(self, rows: Iterator[SnapshotRow], next_id: int, version: int) -> None:
+        self._log.flush()  # carry out the queued segment switch before covered segments are deleted
+        count = write_snapshot(self.directory / SNAPSHOT_NAME, rows, version, next_id)
+        _fsync_directory(self.directory)
+        for first_version, path in self._segments():
+            if first_version <= version:
+                path.unlink()
+        logger.info(f"Task snapshot written: {count:,} tasks at version {version:,}")
+
+    def _recover(self, manager: TaskManager) -> None:
+        """Restore `manager` from the snapshot, then replay the newer log records into it."""
+        snapshot_path = self.directory / SNAPSHOT_NAME
+        if snapshot_path.exists():
+            manager.restore_snapshot(MmapTaskSnapshot(snapshot_path))
+        else:
+            manager.restore((), 1, 0)
+
+        version = manager.version
+        for _, path in self._segments():
+            data = path.read_bytes()
+            lines = data.split(b"\n")
+            if lines[-1]:
+                logger.warning(f"Ignoring torn record at the end of {path.name}")
+            for line in lines[:-1]:
+                record = loads(line)
+                if record[0] <= version:
+                    continue
+                version, op, task_id = record[0], record[1], record[2]
+                task = Task.restore(task_id, record[3], record[4], False, record[5]) if op == "a" else None
+                manager.replay(TaskChange(version, _OP_NAMES[op], task_id, task))
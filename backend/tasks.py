@@ -1,6 +1,22 @@
-from typing import Optional
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, MutableMapping
+from contextlib import AbstractContextManager, nullcontext
 from datetime import datetime
 from enum import Enum
+from functools import partial
+from heapq import merge
+from itertools import islice, product
+import secrets
+import sys
+from threading import RLock
+import time
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+from backend.serialization import dumps
+
+if TYPE_CHECKING:
+    from backend.snapshot import MmapTaskSnapshot
 
 
 class TaskPriority(Enum):
@@ -10,26 +26,122 @@ class TaskPriority(Enum):
     LOW = "low"
 
 
+PRIORITY_VALUES: tuple[str, ...] = tuple(sys.intern(p.value) for p in TaskPriority)
+
+# Every accepted spelling (any letter case) mapped to its interned canonical value,
+# so validation is a single dict lookup with no per-call allocation.
+_PRIORITY_LOOKUP: dict[str, str] = {
+    "".join(chars): value
+    for value in PRIORITY_VALUES
+    for chars in product(*((c, c.upper()) for c in value))
+}
+
+
+def normalize_priority(priority: str) -> str:
+    """Return the canonical priority for any letter case, or raise ValueError."""
+    try:
+        return _PRIORITY_LOOKUP[priority]
+    except (KeyError, TypeError):
+        raise ValueError(f"Priority must be one of: {', '.join(PRIORITY_VALUES)}") from None
+
+
 class Task:
-    """Represents a single task with id, description, priority, and completion status."""
+    """Represents a single task with id, description, priority, and completion status.
+
+    Slotted to keep per-task memory low: no instance __dict__, the priority is an
+    interned shared string from `normalize_priority` and the creation time is kept
+    as an epoch float that `created_at` converts back to a datetime on access.
+
+    `to_json()` caches the encoded API representation. The API fields are
+    properties over private slots so that assigning any of them drops that cache.
+    """
+
+    __slots__ = ("_completed", "_created_ts", "_description", "_id", "_json", "_priority")
     
     def __init__(self, task_id: int, description: str, priority: str = "medium"):
-        self.id = task_id
-        self.description = description
-        self.priority = self._validate_priority(priority)
-        self.completed = False
-        self.created_at = datetime.now()
-    
-    def _validate_priority(self, priority: str) -> str:
-        """Validate priority value and return normalized priority."""
-        valid_priorities = [p.value for p in TaskPriority]
-        if priority.lower() not in valid_priorities:
-            raise ValueError(f"Priority must be one of: {', '.join(valid_priorities)}")
-        return priority.lower()
+        self._id = task_id
+        self._description = description
+        self._priority = normalize_priority(priority)
+        self._completed = False
+        self._created_ts = time.time()
+        self._json: bytes | None = None
+
+    @classmethod
+    def restore(
+        cls, task_id: int, description: str, priority: str, completed: bool, created_ts: float
+    ) -> "Task":
+        """Rebuild a task with its persisted id, completion state and creation time."""
+        task = cls.__new__(cls)
+        task._id = task_id
+        task._description = description
+        task._priority = normalize_priority(priority)
+        task._completed = completed
+        task._created_ts = created_ts
+        task._json = None
+        return task
+
+    @property
+    def id(self) -> int:
+        return self._id
+
+    @id.setter
+    def id(self, value: int) -> None:
+        self._id = value
+        self._json = None
+
+    @property
+    def description(self) -> str:
+        return self._description
+
+    @description.setter
+    def description(self, value: str) -> None:
+        self._description = value
+        self._json = None
+
+    @property
+    def priority(self) -> str:
+        return self._priority
+
+    @priority.setter
+    def priority(self, value: str) -> None:
+        self._priority = normalize_priority(value)
+        self._json = None
+
+    @property
+    def completed(self) -> bool:
+        return self._completed
+
+    @completed.setter
+    def completed(self, value: bool) -> None:
+        self._completed = value
+        self._json = None
+
+    @property
+    def created_ts(self) -> float:
+        """Creation time as seconds since the epoch."""
+        return self._created_ts
+
+    @property
+    def created_at(self) -> datetime:
+        return datetime.fromtimestamp(self._created_ts)
+
+    @created_at.setter
+    def created_at(self, value: datetime) -> None:
+        self._created_ts = value.timestamp()
     
     def mark_completed(self) -> None:
         """Mark this task as completed."""
         self.completed = True
+
+    def to_dict(self) -> dict:
+        """Return the API representation of this task."""
+        return {"id": self.id, "description": self.description, "priority": self.priority, "completed": self.completed}
+
+    def to_json(self) -> bytes:
+        """Return the API representation encoded as JSON, cached until the next mutation."""
+        if self._json is None:
+            self._json = dumps(self.to_dict())
+        return self._json
     
     def __repr__(self) -> str:
         status = "✓" if self.completed else "○"
@@ -38,60 +150,384 @@ class Task:
         return f"[{status}] {priority_symbol} {self.description} ({self.priority})"
 
 
-class TaskManager:
-    """Manages a collection of tasks with CRUD operations."""
+class _IdBucket:
+    """Task ids in ascending order with O(1) membership.
+
+    Removals only drop the id from the membership set; the ordered list keeps a
+    tombstone until tombstones outnumber live ids, then it is compacted.
+
+    A bucket created with a `loader` (returning ascending ids) stays empty until
+    it is first used, so restoring from a snapshot does not pay for indexes
+    nobody has queried yet.
+    """
+
+    __slots__ = ("_loader", "_members", "_order")
+
+    def __init__(self, loader: Callable[[], list[int]] | None = None):
+        self._members: set[int] = set()
+        self._order: list[int] = []
+        self._loader = loader
+
+    def _load(self) -> None:
+        self._order = self._loader()
+        self._members = set(self._order)
+        self._loader = None
+
+    def __len__(self) -> int:
+        if self._loader is not None:
+            self._load()
+        return len(self._members)
+
+    def __contains__(self, task_id: int) -> bool:
+        if self._loader is not None:
+            self._load()
+        return task_id in self._members
+
+    def __iter__(self) -> Iterator[int]:
+        if self._loader is not None:
+            self._load()
+        members = self._members
+        return (task_id for task_id in self._order if task_id in members)
+
+    def iter_after(self, after_id: int) -> Iterator[int]:
+        """Iterate live ids strictly greater than `after_id`."""
+        if self._loader is not None:
+            self._load()
+        members = self._members
+        order = self._order
+        return (
+            order[i] for i in range(bisect_right(order, after_id), len(order)) if order[i] in members
+        )
+
+    def add(self, task_id: int) -> None:
+        if self._loader is not None:
+            self._load()
+        if task_id in self._members:
+            return
+        self._members.add(task_id)
+        order = self._order
+        if not order or task_id > order[-1]:
+            order.append(task_id)
+            return
+        i = bisect_left(order, task_id)
+        if i == len(order) or order[i] != task_id:
+            insort(order, task_id)
+
+    def discard(self, task_id: int) -> None:
+        if self._loader is not None:
+            self._load()
+        if task_id not in self._members:
+            return
+        self._members.discard(task_id)
+        if len(self._order) > 2 * len(self._members) + 64:
+            self._order = [i for i in self._order if i in self._members]
+
+
+class TaskChange(NamedTuple):
+    """One recorded mutation: the version it produced, its kind and the task it touched."""
+
+    version: int
+    op: str  # "add", "complete" or "remove"
+    task_id: int
+    task: Task | None  # None for "remove"
+
+
+class TaskChangeFeed:
+    """Version counter, recent-change log and listeners shared by the task stores.
+
+    Subclasses call `_record` after each applied mutation, with the lock held.
+    """
+
+    def __init__(self, change_log_size: int = 10_000, thread_safe: bool = False):
+        self._lock: AbstractContextManager = RLock() if thread_safe else nullcontext()
+        # Bumped by every state change; lets readers cheaply tell whether anything moved.
+        self.version = 0
+        # Random per boot (and per restore): versions only compare within one epoch, since
+        # another process, or this one after a restart, may reach the same version with other data.
+        self.epoch = secrets.token_hex(4)
+        # The most recent changes, oldest first, for delta sync by version.
+        self._changes: deque[TaskChange] = deque(maxlen=change_log_size)
+        self._listeners: list[Callable[[TaskChange], None]] = []
+
+    def _record(self, op: str, task_id: int, task: Task | None) -> None:
+        """Bump the version, log the change that produced it and notify listeners."""
+        self.version += 1
+        change = TaskChange(self.version, op, task_id, task)
+        self._changes.append(change)
+        for listener in self._listeners:
+            listener(change)
+
+    def locked(self) -> AbstractContextManager:
+        """Hold the manager lock across several calls (a no-op unless thread_safe)."""
+        return self._lock
+
+    def add_listener(self, listener: Callable[[TaskChange], None]) -> None:
+        """Call `listener` with every TaskChange, synchronously, after it is applied."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[TaskChange], None]) -> None:
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def changes_since(self, version: int) -> list[TaskChange] | None:
+        """Return the changes made after `version`, oldest first.
+
+        Returns None when that history is no longer (or was never) in the change
+        log, in which case the caller must resync from a full listing.
+        """
+        with self._lock:
+            if version == self.version:
+                return []
+            oldest_known = self.version - len(self._changes)
+            if not oldest_known <= version < self.version:
+                return None
+            return list(islice(self._changes, version - oldest_known, None))
+
+
+class TaskManager(TaskChangeFeed):
+    """Manages a collection of tasks with CRUD operations.
     
-    def __init__(self):
-        self.tasks: list[Task] = []
+    With `thread_safe=True` every public method runs under one re-entrant lock,
+    so the manager can be shared by threaded request handlers or free-threaded
+    Python. Listeners are then called while the lock is held and must not block.
+    The default mode uses a no-op context manager and pays almost nothing.
+    """
+
+    # Calls never wait on I/O, so async handlers may call them directly.
+    blocking = False
+
+    def __init__(self, change_log_size: int = 10_000, thread_safe: bool = False):
+        super().__init__(change_log_size, thread_safe)
+        # Keyed by id and iterated in id order: a dict (insertion order is id
+        # order) or, after restore_snapshot, a LazyTaskMap over the snapshot.
+        self.tasks: MutableMapping[int, Task] = {}
         self._next_id = 1
+        # Secondary indexes, kept in step with self.tasks by every mutation.
+        self._by_priority: dict[str, _IdBucket] = {value: _IdBucket() for value in PRIORITY_VALUES}
+        self._pending = _IdBucket()
+        self._completed = _IdBucket()
     
     def add_task(self, description: str, priority: str = "medium") -> Task:
         """Add a new task and return it."""
-        task = Task(self._next_id, description, priority)
-        self.tasks.append(task)
-        self._next_id += 1
+        with self._lock:
+            task = Task(self._next_id, description, priority)
+            self._store(task)
+            return task
+
+    def _store(self, task: Task) -> None:
+        """Insert a new task into the primary store and the secondary indexes.
+
+        `next_id` moves past the task before the change is recorded, so listeners
+        (a storage snapshot in particular) never see it lag behind the tasks.
+        """
+        self.tasks[task.id] = task
+        self._by_priority[task.priority].add(task.id)
+        self._pending.add(task.id)
+        self._next_id = task.id + 1
+        self._record("add", task.id, task)
+
+    @property
+    def next_id(self) -> int:
+        """The id the next added task will get."""
+        return self._next_id
+
+    def restore(self, tasks: Iterable[Task], next_id: int, version: int) -> None:
+        """Replace the whole state with persisted tasks, given in ascending id order.
+
+        Nothing is recorded or sent to listeners; the change log restarts empty
+        at `version`, so older delta cursors resync from a full listing.
+        """
+        with self._lock:
+            self.tasks = {}
+            self._by_priority = {value: _IdBucket() for value in PRIORITY_VALUES}
+            self._pending = _IdBucket()
+            self._completed = _IdBucket()
+            for task in tasks:
+                self._index(task)
+            self._next_id = next_id
+            self.version = version
+            self.epoch = secrets.token_hex(4)
+            self._changes.clear()
+
+    def restore_snapshot(self, snapshot: "MmapTaskSnapshot") -> None:
+        """Replace the whole state with a mapped snapshot, without reading its tasks.
+
+        Tasks are materialized on first access and each index is built the first
+        time it is used, so this returns in milliseconds at any size. Like
+        `restore`, nothing is recorded and the change log restarts empty.
+        """
+        with self._lock:
+            self.tasks = snapshot.task_map()
+            self._by_priority = {
+                value: _IdBucket(partial(snapshot.ids_with_priority, value)) for value in PRIORITY_VALUES
+            }
+            self._pending = _IdBucket(partial(snapshot.ids_with_completed, False))
+            self._completed = _IdBucket(partial(snapshot.ids_with_completed, True))
+            self._next_id = snapshot.next_id
+            self.version = snapshot.version
+            self.epoch = secrets.token_hex(4)
+            self._changes.clear()
+
+    def replay(self, change: TaskChange) -> None:
+        """Re-apply a change read back from storage, keeping its version.
+
+        The change is logged for delta sync but listeners are not called.
+        Replays are idempotent: re-adding a known id replaces it, completing a
+        completed task or removing a missing one does nothing.
+        """
+        with self._lock:
+            task = None
+            if change.op == "add":
+                task = change.task
+                self._unindex(task.id)
+                self._index(task)
+                self._next_id = max(self._next_id, task.id + 1)
+            elif change.op == "complete":
+                task = self.tasks.get(change.task_id)
+                if task is not None and not task.completed:
+                    self._mark_completed(task)
+            else:
+                self._unindex(change.task_id)
+            self.version = change.version
+            self._changes.append(change._replace(task=task))
+
+    def _index(self, task: Task) -> None:
+        """Insert a task, in whatever state it is, into the store and the indexes."""
+        self.tasks[task.id] = task
+        self._by_priority[task.priority].add(task.id)
+        (self._completed if task.completed else self._pending).add(task.id)
+
+    def _unindex(self, task_id: int) -> Task | None:
+        """Drop a task from the store and the indexes; returns it, or None if unknown."""
+        task = self.tasks.pop(task_id, None)
+        if task is not None:
+            self._by_priority[task.priority].discard(task_id)
+            self._pending.discard(task_id)
+            self._completed.discard(task_id)
         return task
+
+    def _mark_completed(self, task: Task) -> None:
+        task.mark_completed()
+        self._pending.discard(task.id)
+        self._completed.add(task.id)
+
+    def add_tasks(self, items: Iterable[tuple[str, str]]) -> list[Task]:
+        """Add (description, priority) pairs and return the new tasks.
+
+        All items are validated before any is stored, so an invalid priority
+        leaves the manager unchanged.
+        """
+        with self._lock:
+            first_id = self._next_id
+            new_tasks = [
+                Task(task_id, description, priority)
+                for task_id, (description, priority) in enumerate(items, start=first_id)
+            ]
+            for task in new_tasks:
+                self._store(task)
+            return new_tasks
     
     def list_tasks(self) -> list[Task]:
-        """Return all tasks."""
-        return self.tasks.copy()
+        """Return all tasks in insertion order."""
+        with self._lock:
+            return list(self.tasks.values())
     
     def get_task(self, task_id: int) -> Optional[Task]:
         """Get a task by its ID."""
-        for task in self.tasks:
-            if task.id == task_id:
-                return task
-        return None
+        return self.tasks.get(task_id)
     
     def complete_task(self, task_id: int) -> bool:
         """Mark a task as completed. Returns True if task was found."""
-        task = self.get_task(task_id)
-        if task:
-            task.mark_completed()
-            return True
-        return False
+        with self._lock:
+            task = self.get_task(task_id)
+            if task:
+                if not task.completed:
+                    self._mark_completed(task)
+                    self._record("complete", task_id, task)
+                return True
+            return False
     
     def remove_task(self, task_id: int) -> bool:
         """Remove a task. Returns True if task was found and removed."""
-        for i, task in enumerate(self.tasks):
-            if task.id == task_id:
-                self.tasks.pop(i)
-                return True
-        return False
+        with self._lock:
+            if self._unindex(task_id) is None:
+                return False
+            self._record("remove", task_id, None)
+            return True
+
+    def complete_tasks(self, task_ids: Iterable[int]) -> list[bool]:
+        """Complete several tasks; one found/not-found flag per id, in order."""
+        with self._lock:
+            return [self.complete_task(task_id) for task_id in task_ids]
+
+    def remove_tasks(self, task_ids: Iterable[int]) -> list[bool]:
+        """Remove several tasks; one found/not-found flag per id, in order."""
+        with self._lock:
+            return [self.remove_task(task_id) for task_id in task_ids]
+
+    def _resolve(self, bucket: _IdBucket) -> list[Task]:
+        """Materialize the tasks of an index bucket, in id order."""
+        tasks = self.tasks
+        return [tasks[task_id] for task_id in bucket]
     
     def get_pending_tasks(self) -> list[Task]:
         """Return only incomplete tasks."""
-        return [task for task in self.tasks if not task.completed]
+        with self._lock:
+            return self._resolve(self._pending)
     
     def get_completed_tasks(self) -> list[Task]:
         """Return only completed tasks."""
-        return [task for task in self.tasks if task.completed]
+        with self._lock:
+            return self._resolve(self._completed)
     
     def get_tasks_by_priority(self, priority: str) -> list[Task]:
         """Return tasks filtered by priority level."""
-        return [task for task in self.tasks if task.priority == priority.lower()]
+        with self._lock:
+            bucket = self._by_priority.get(_PRIORITY_LOOKUP.get(priority))
+            return self._resolve(bucket) if bucket is not None else []
     
+    def page_tasks(
+        self,
+        after_id: int = 0,
+        limit: int = 100,
+        priority: str | None = None,
+        completed: bool | None = None,
+    ) -> tuple[list[Task], int | None]:
+        """Return up to `limit` tasks with id > `after_id`, in id order, plus the next cursor.
+
+        The cursor is the id of the last returned task, or None when there are no
+        more matches. Ids are never reused, so a cursor stays valid while tasks are
+        added or removed between pages.
+        """
+        with self._lock:
+            if limit < 1:
+                raise ValueError("limit must be at least 1")
+            candidates: list[_IdBucket] = []
+            if priority is not None:
+                bucket = self._by_priority.get(_PRIORITY_LOOKUP.get(priority))
+                if bucket is None:
+                    return [], None
+                candidates.append(bucket)
+            if completed is not None:
+                candidates.append(self._completed if completed else self._pending)
+
+            if candidates:
+                # Walk the smallest bucket and probe the other one.
+                candidates.sort(key=len)
+                ids = candidates[0].iter_after(after_id)
+                if len(candidates) > 1:
+                    other = candidates[1]
+                    ids = (task_id for task_id in ids if task_id in other)
+            else:
+                ids = merge(self._pending.iter_after(after_id), self._completed.iter_after(after_id))
+
+            page_ids = list(islice(ids, limit + 1))
+            next_cursor = page_ids[limit - 1] if len(page_ids) > limit else None
+            tasks = self.tasks
+            return [tasks[task_id] for task_id in page_ids[:limit]], next_cursor
+
     def get_priority_sorted_tasks(self) -> list[Task]:
         """Return all tasks sorted by priority (high -> medium -> low)."""
-        priority_order = {"high": 0, "medium": 1, "low": 2}
-        return sorted(self.tasks, key=lambda task: priority_order.get(task.priority, 3))
\ No newline at end of file
+        with self._lock:
+            return [task for bucket in self._by_priority.values() for task in self._resolve(bucket)]
@@ -0,0 +1 @@
+"""Micro and load benchmarks. Run each one as a module, e.g. `python -m benchmarks.bench_task_store`."""
@@ -0,0 +1,71 @@
+"""
+Throughput benchmark: single-item task routes vs the batch routes.
+Requests go through the full ASGI stack (routing, pydantic validation, JSON)
+via FastAPI's TestClient, so the comparison reflects per-request overhead.
+Run: python -m benchmarks.bench_batch_api [--tasks 5000] [--batch-size 1000]
+"""
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+import backend.main as main
+from backend.tasks import TaskManager
+from commons.logger import sentry_logger as logger
+
+
+def chunks(items: list, size: int) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def run_single(client: TestClient, payloads: list[dict]) -> tuple[float, float, float]:
+    start = time.perf_counter()
+    ids = [client.post("/tasks", json=p).json()["id"] for p in payloads]
+    created = time.perf_counter()
+    for task_id in ids:
+        client.put(f"/tasks/{task_id}")
+    completed = time.perf_counter()
+    for task_id in ids:
+        client.delete(f"/tasks/{task_id}")
+    deleted = time.perf_counter()
+    return created - start, completed - created, deleted - completed
+
+
+def run_batch(client: TestClient, payloads: list[dict], batch_size: int) -> tuple[float, float, float]:
+    start = time.perf_counter()
+    ids = []
+    for chunk in chunks(payloads, batch_size):
+        ids.extend(t["id"] for t in client.post("/tasks/batch", json={"tasks": chunk}).json()["items"])
+    created = time.perf_counter()
+    for chunk in chunks(ids, batch_size):
+        client.post("/tasks/batch/complete", json={"ids": chunk})
+    completed = time.perf_counter()
+    for chunk in chunks(ids, batch_size):
+        client.post("/tasks/batch/delete", json={"ids": chunk})
+    deleted = time.perf_counter()
+    return created - start, completed - created, deleted - completed
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=5_000)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    args = parser.parse_args()
+
+    payloads = [{"desc": f"Imported task {i}", "priority": ("high", "medium", "low")[i % 3]} for i in range(args.tasks)]
+    client = TestClient(main.app)
+
+    main.manager = TaskManager()
+    single = run_single(client, payloads)
+    main.manager = TaskManager()
+    batch = run_batch(client, payloads, args.batch_size)
+
+    for name, single_s, batch_s in zip(("create", "complete", "delete"), single, batch, strict=True):
+        logger.info(
+            f"{name:<8} {args.tasks:,} tasks | single {args.tasks / single_s:9,.0f} tasks/s | "
+            f"batch({args.batch_size}) {args.tasks / batch_s:11,.0f} tasks/s | x{single_s / batch_s:,.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,54 @@
+"""
+Throughput of a shared thread-safe TaskManager as the number of threads grows.
+Each thread runs the API's mix of add / complete / page / remove operations.
+On a GIL build the lock mostly costs a little single-thread speed; on a
+free-threaded build it is what keeps the shared state consistent.
+Run: python -m benchmarks.bench_concurrent_manager [--threads 1 2 4 8] [--ops 20000]
+"""
+import argparse
+import sys
+import threading
+import time
+
+from backend.tasks import TaskManager
+from commons.logger import sentry_logger as logger
+
+
+def worker(manager: TaskManager, ops: int, barrier: threading.Barrier) -> None:
+    barrier.wait()
+    for i in range(ops):
+        task = manager.add_task(f"Task {i}", ("high", "medium", "low")[i % 3])
+        manager.complete_task(task.id)
+        manager.page_tasks(after_id=max(0, task.id - 50), limit=20)
+        manager.remove_task(task.id)
+
+
+def ops_per_second(manager: TaskManager, threads: int, ops: int) -> float:
+    barrier = threading.Barrier(threads + 1)
+    pool = [threading.Thread(target=worker, args=(manager, ops, barrier)) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return threads * ops * 4 / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--ops", type=int, default=20_000, help="operation rounds per thread")
+    args = parser.parse_args()
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    logger.info(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+    unlocked = ops_per_second(TaskManager(), 1, args.ops)
+    logger.info(f"unlocked manager, 1 thread   {unlocked:12,.0f} ops/s")
+    for threads in args.threads:
+        rate = ops_per_second(TaskManager(thread_safe=True), threads, args.ops)
+        logger.info(f"thread-safe manager, {threads} thread(s) {rate:12,.0f} ops/s  (x{rate / unlocked:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Polling benchmark for GET /tasks with and without ETag revalidation.
+Simulates clients re-polling an unchanged task list, as App.jsx does after
+every action, and reports bytes on the wire and latency per poll.
+Run: python -m benchmarks.bench_conditional_get [--tasks 1000] [--polls 2000]
+"""
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+
+import backend.main as main
+from backend.tasks import TaskManager
+from commons.logger import sentry_logger as logger
+
+
+def poll(client: TestClient, polls: int, limit: int, etag: str | None) -> tuple[list[float], int]:
+    headers = {"If-None-Match": etag} if etag else {}
+    latencies, total_bytes = [], 0
+    for _ in range(polls):
+        start = time.perf_counter()
+        response = client.get("/tasks", params={"limit": limit}, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1e3)
+        total_bytes += len(response.content)
+    return latencies, total_bytes
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1_000)
+    parser.add_argument("--polls", type=int, default=2_000)
+    args = parser.parse_args()
+
+    main.manager = TaskManager()
+    main.manager.add_tasks((f"Polled task {i}", ("high", "medium", "low")[i % 3]) for i in range(args.tasks))
+    client = TestClient(main.app)
+    limit = min(args.tasks, main.MAX_PAGE_SIZE)
+    etag = client.get("/tasks", params={"limit": limit}).headers["etag"]
+
+    for label, tag in (("full GET", None), ("If-None-Match", etag)):
+        latencies, total_bytes = poll(client, args.polls, limit, tag)
+        logger.info(
+            f"{label:<14} | {args.polls:,} polls of {limit:,} tasks | "
+            f"{total_bytes / args.polls:9,.0f} B/poll | p50 {statistics.median(latencies):6.3f} ms | "
+            f"mean {statistics.fmean(latencies):6.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,77 @@
+"""
+Load test for the SSE push channel: fan-out latency to many local subscribers.
+Each subscriber is a consumer coroutine draining its own Subscription, as one
+/tasks/events connection would. Latency is measured from the TaskManager
+mutation to the moment each subscriber has the frame in hand.
+Run: python -m benchmarks.bench_event_fanout [--subscribers 1000] [--events 200]
+"""
+import argparse
+import asyncio
+import time
+
+from backend.events import TaskEventBroadcaster
+from backend.tasks import TaskManager
+from commons.latency import summarize_ms
+from commons.logger import sentry_logger as logger
+
+
+async def consume(broadcaster: TaskEventBroadcaster, expected: int, sent_at: dict[int, float],
+                  latencies: list[float], ready: asyncio.Event) -> int:
+    subscription = broadcaster.subscribe()
+    ready.set()
+    received = 0
+    try:
+        while received < expected:
+            frames = await subscription.drain(5.0)
+            if not frames:
+                break
+            now = time.perf_counter()
+            for frame in frames:
+                if frame.startswith(b"id: "):
+                    version = int(frame[4:frame.index(b"\n")])
+                    latencies.append((now - sent_at[version]) * 1e3)
+                    received += 1
+        return subscription.dropped
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+async def run(subscribers: int, events: int, interval: float, max_buffered: int) -> None:
+    manager = TaskManager()
+    broadcaster = TaskEventBroadcaster(max_buffered=max_buffered)
+    manager.add_listener(broadcaster.publish)
+
+    sent_at: dict[int, float] = {}
+    latencies: list[float] = []
+    ready = [asyncio.Event() for _ in range(subscribers)]
+    consumers = [
+        asyncio.create_task(consume(broadcaster, events, sent_at, latencies, ready[i]))
+        for i in range(subscribers)
+    ]
+    await asyncio.gather(*(event.wait() for event in ready))
+
+    start = time.perf_counter()
+    for i in range(events):
+        sent_at[manager.version + 1] = time.perf_counter()
+        manager.add_task(f"Pushed task {i}")
+        await asyncio.sleep(interval)
+    dropped = sum(await asyncio.gather(*consumers))
+    elapsed = time.perf_counter() - start
+
+    logger.info(f"{subscribers:,} subscribers x {events:,} events in {elapsed:.2f}s "
+                f"({len(latencies) / elapsed:,.0f} deliveries/s, {dropped:,} dropped)")
+    logger.info(f"fan-out latency: {summarize_ms(latencies)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=1_000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.001, help="seconds between mutations")
+    parser.add_argument("--max-buffered", type=int, default=1_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.subscribers, args.events, args.interval, args.max_buffered))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark for the demo_queries.py reports and the health check's performance query.
+Each query gets warm-up runs and then timed iterations (perf_counter_ns around
+execute + fetchall). Results are p50/p95/p99 and rows/s per query. The JSON
+report can be kept and passed back as --baseline: the run then exits 1 when a
+query's chosen percentile is more than --tolerance percent (and --min-delta-ms)
+slower than in the baseline.
+Connection settings come from the environment (see commons/database.py).
+Run: python -m benchmarks.bench_queries [--iterations 50] [--output bench.json] [--baseline bench.json]
+"""
+import argparse
+from pathlib import Path
+import sys
+
+from commons.database import ConnectionPool, DatabaseConfig
+from commons.logger import sentry_logger as logger
+from commons.query_bench import (
+    METRICS,
+    BenchmarkReport,
+    compare,
+    log_comparison,
+    log_report,
+    run_benchmark,
+)
+from commons.workload import WORKLOAD
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    parser.add_argument("--baseline", type=Path, help="JSON report of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="allowed slowdown in percent")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="slowdowns below this never fail")
+    parser.add_argument("--metric", choices=METRICS, default="p50_ms")
+    args = parser.parse_args()
+
+    with ConnectionPool(DatabaseConfig.from_env(min_size=0, max_size=1)) as pool:
+        conn = pool.getconn()
+        try:
+            report = run_benchmark(conn, WORKLOAD, args.warmup, args.iterations)
+        finally:
+            pool.putconn(conn)
+    log_report(report)
+    if args.output:
+        report.save(args.output)
+        logger.info(f"📝 Report written to {args.output}")
+    if args.baseline:
+        comparisons = compare(BenchmarkReport.load(args.baseline), report, args.tolerance, args.metric, args.min_delta_ms)
+        log_comparison(comparisons, args.metric)
+        if any(c.regressed for c in comparisons):
+            logger.error(f"❌ Regression beyond {args.tolerance:g}% against {args.baseline}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
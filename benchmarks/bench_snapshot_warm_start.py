@@ -0,0 +1,56 @@
+"""
+Warm start from a memory-mapped binary snapshot vs. materializing every task up front.
+Times how long until the manager answers its first point lookup and first page,
+then how long a full materialization (list_tasks) takes for comparison.
+Run: python -m benchmarks.bench_snapshot_warm_start [--tasks 1000000]
+"""
+import argparse
+from pathlib import Path
+import tempfile
+import time
+
+from backend.snapshot import MmapTaskSnapshot, capture_rows, write_snapshot
+from backend.tasks import TaskManager
+from commons.logger import sentry_logger as logger
+
+
+def build(tasks: int) -> TaskManager:
+    manager = TaskManager()
+    manager.add_tasks((f"Task number {i}", ("high", "medium", "low")[i % 3]) for i in range(tasks))
+    manager.complete_tasks(range(1, tasks + 1, 10))
+    return manager
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    source = build(args.tasks)
+    with tempfile.TemporaryDirectory(prefix="tasks-snapshot-") as directory:
+        path = Path(directory) / "snapshot.bin"
+        start = time.perf_counter()
+        write_snapshot(path, capture_rows(source.tasks), source.version, source.next_id)
+        logger.info(f"wrote {args.tasks:,} tasks in {time.perf_counter() - start:.2f}s "
+                    f"({path.stat().st_size / 1e6:.1f} MB)")
+        del source
+
+        manager = TaskManager()
+        start = time.perf_counter()
+        manager.restore_snapshot(MmapTaskSnapshot(path))
+        restored = time.perf_counter()
+        manager.get_task(args.tasks // 2)
+        first_lookup = time.perf_counter()
+        manager.page_tasks(limit=100, completed=False)
+        first_page = time.perf_counter()
+        logger.info(f"restore_snapshot: {(restored - start) * 1e3:.2f} ms, "
+                    f"+first lookup: {(first_lookup - start) * 1e3:.2f} ms, "
+                    f"+first filtered page: {(first_page - start) * 1e3:.2f} ms")
+
+        start = time.perf_counter()
+        manager.list_tasks()
+        logger.info(f"materializing all {len(manager.tasks):,} tasks: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Microbenchmark of Task construction rate and of priority validation alone.
+The baseline re-creates the previous validation: a fresh list built from the
+TaskPriority enum plus two lower() calls per construction.
+Run: python -m benchmarks.bench_task_creation [--tasks 1000000]
+"""
+import argparse
+import time
+
+from backend.tasks import Task, TaskPriority, normalize_priority
+from commons.logger import sentry_logger as logger
+
+
+def enum_scan_priority(priority: str) -> str:
+    valid_priorities = [p.value for p in TaskPriority]
+    if priority.lower() not in valid_priorities:
+        raise ValueError(f"Priority must be one of: {', '.join(valid_priorities)}")
+    return priority.lower()
+
+
+def rate(label: str, n: int, fn, inputs: list[str]) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        fn(inputs[i % len(inputs)])
+    per_second = n / (time.perf_counter() - start)
+    logger.info(f"{label:<28} {per_second:12,.0f} /s")
+    return per_second
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    args = parser.parse_args()
+    n = args.tasks
+    inputs = ["high", "medium", "low", "HIGH", "Medium"]
+
+    old = rate("validate (enum scan)", n, enum_scan_priority, inputs)
+    new = rate("validate (lookup)", n, normalize_priority, inputs)
+    logger.info(f"validation speedup x{new / old:.1f}")
+    rate("Task() construction", n, lambda p: Task(1, "Task", p), inputs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Memory benchmark: bytes per task for the slotted Task vs the previous dict-backed Task.
+Allocations are measured with tracemalloc, so the numbers include the instance,
+its attribute storage, the timestamp and the per-task priority string.
+The description strings are built up front and excluded from both sides.
+Run: python -m benchmarks.bench_task_memory [--tasks 1000000]
+"""
+import argparse
+from collections.abc import Callable
+from datetime import datetime
+import gc
+import tracemalloc
+
+from backend.tasks import Task, TaskManager
+from commons.logger import sentry_logger as logger
+
+
+class DictTask:
+    """The pre-slots Task: per-instance __dict__, datetime and a fresh lowercase priority."""
+
+    def __init__(self, task_id: int, description: str, priority: str = "medium"):
+        self.id = task_id
+        self.description = description
+        self.priority = priority.lower()
+        self.completed = False
+        self.created_at = datetime.now()
+
+
+def bytes_per_item(build: Callable[[], object], count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    args = parser.parse_args()
+    n = args.tasks
+    descriptions = [f"Task {i}" for i in range(n)]
+    priorities = ("high", "medium", "low")
+
+    def build_dict_tasks() -> list[DictTask]:
+        return [DictTask(i, descriptions[i], priorities[i % 3]) for i in range(n)]
+
+    def build_slotted_tasks() -> list[Task]:
+        return [Task(i, descriptions[i], priorities[i % 3]) for i in range(n)]
+
+    def build_manager() -> TaskManager:
+        manager = TaskManager()
+        for i in range(n):
+            manager.add_task(descriptions[i], priorities[i % 3])
+        return manager
+
+    before = bytes_per_item(build_dict_tasks, n)
+    after = bytes_per_item(build_slotted_tasks, n)
+    logger.info(f"{n:,} tasks | dict-backed Task {before:6.1f} B/task | slotted Task {after:6.1f} B/task "
+                f"| saved {1 - after / before:.0%}")
+    logger.info(f"{n:,} tasks | TaskManager incl. id dict + indexes {bytes_per_item(build_manager, n):6.1f} B/task")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Scaling benchmark for TaskManager lookups, completions and deletions.
+Compares the id-indexed store against the previous linear-scan list store.
+Run: python -m benchmarks.bench_task_store [--sizes 10000 100000 1000000]
+"""
+import argparse
+from collections.abc import Callable
+import random
+import time
+
+from backend.tasks import Task, TaskManager
+from commons.logger import sentry_logger as logger
+
+
+class LinearScanTaskStore:
+    """The pre-index store: a list of tasks scanned on every lookup."""
+
+    def __init__(self, manager: TaskManager):
+        self.tasks: list[Task] = manager.list_tasks()
+
+    def get_task(self, task_id: int) -> Task | None:
+        for task in self.tasks:
+            if task.id == task_id:
+                return task
+        return None
+
+    def complete_task(self, task_id: int) -> bool:
+        task = self.get_task(task_id)
+        if task:
+            task.mark_completed()
+            return True
+        return False
+
+    def remove_task(self, task_id: int) -> bool:
+        for i, task in enumerate(self.tasks):
+            if task.id == task_id:
+                self.tasks.pop(i)
+                return True
+        return False
+
+
+def time_per_op(op: Callable[[int], object], ids: list[int]) -> float:
+    """Return the mean cost of `op` in microseconds over `ids`."""
+    start = time.perf_counter()
+    for task_id in ids:
+        op(task_id)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def bench_size(size: int, ops: int, linear_ops: int) -> None:
+    manager = TaskManager()
+    for i in range(size):
+        manager.add_task(f"Task {i}", ("high", "medium", "low")[i % 3])
+    linear = LinearScanTaskStore(manager)
+
+    rng = random.Random(size)
+    ids = rng.sample(range(1, size + 1), ops)
+    linear_ids = ids[:linear_ops]
+
+    results = {
+        "get": (time_per_op(manager.get_task, ids), time_per_op(linear.get_task, linear_ids)),
+        "complete": (
+            time_per_op(manager.complete_task, ids),
+            time_per_op(linear.complete_task, linear_ids),
+        ),
+        "remove": (
+            time_per_op(manager.remove_task, ids),
+            time_per_op(linear.remove_task, linear_ids),
+        ),
+    }
+    for name, (indexed_us, linear_us) in results.items():
+        logger.info(
+            f"{size:>9,} tasks | {name:<8} | indexed {indexed_us:8.3f} µs/op | "
+            f"linear {linear_us:10.1f} µs/op | x{linear_us / indexed_us:,.0f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--ops", type=int, default=5_000, help="operations timed on the indexed store")
+    parser.add_argument("--linear-ops", type=int, default=50, help="operations timed on the linear store")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        bench_size(size, min(args.ops, size), min(args.linear_ops, size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark for TaskManager's filtered and priority-ordered views.
+The index-backed views should scale with the result size, not the store size,
+so each store holds a fixed number of completed tasks and a growing pending tail.
+Run: python -m benchmarks.bench_task_views [--sizes 10000 100000 1000000]
+"""
+import argparse
+from collections.abc import Callable
+import time
+
+from backend.tasks import Task, TaskManager
+from commons.logger import sentry_logger as logger
+
+
+def full_scan_views(manager: TaskManager) -> dict[str, Callable[[], list[Task]]]:
+    """The pre-index implementations: a full pass over every task per call."""
+    tasks = manager.tasks
+    priority_order = {"high": 0, "medium": 1, "low": 2}
+    return {
+        "completed": lambda: [t for t in tasks.values() if t.completed],
+        "high": lambda: [t for t in tasks.values() if t.priority == "high"],
+        "sorted": lambda: sorted(tasks.values(), key=lambda t: priority_order.get(t.priority, 3)),
+    }
+
+
+def indexed_views(manager: TaskManager) -> dict[str, Callable[[], list[Task]]]:
+    return {
+        "completed": manager.get_completed_tasks,
+        "high": lambda: manager.get_tasks_by_priority("high"),
+        "sorted": manager.get_priority_sorted_tasks,
+    }
+
+
+def mean_ms(view: Callable[[], list[Task]], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        view()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def bench_size(size: int, selective: int, repeat: int) -> None:
+    manager = TaskManager()
+    for i in range(size):
+        # Only the first `selective` tasks are high priority and completed.
+        priority = "high" if i < selective else ("medium", "low")[i % 2]
+        task = manager.add_task(f"Task {i}", priority)
+        if i < selective:
+            manager.complete_task(task.id)
+
+    scan, indexed = full_scan_views(manager), indexed_views(manager)
+    for name in indexed:
+        scan_ms, indexed_ms = mean_ms(scan[name], repeat), mean_ms(indexed[name], repeat)
+        logger.info(
+            f"{size:>9,} tasks | {name:<9} | indexed {indexed_ms:9.3f} ms | "
+            f"scan {scan_ms:9.3f} ms | x{scan_ms / indexed_ms:,.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--selective", type=int, default=1_000, help="completed/high tasks per store")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        bench_size(size, min(args.selective, size), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
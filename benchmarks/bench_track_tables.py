@@ -0,0 +1,82 @@
+"""
+Hasura metadata bootstrap: one request per command vs. track_tables.bootstrap.
+Runs against commons.mock_hasura with --latency-ms added to every request,
+standing in for the network round trip and Hasura's metadata rebuild. Compares:
+- the previous script: a new connection (bare requests.post) per source, table and relationship
+- the same calls over one keep-alive requests.Session
+- bootstrap: export_metadata + one bulk request for what is missing
+- a bootstrap re-run that finds everything in place
+Run: python -m benchmarks.bench_track_tables [--latency-ms 20] [--runs 5]
+"""
+import argparse
+from collections.abc import Callable
+import statistics
+import time
+
+import requests
+
+from commons.logger import sentry_logger as logger
+from commons.mock_hasura import MockHasura
+import track_tables
+
+
+def all_commands() -> list[dict]:
+    return track_tables.missing_commands(False, set(), set())
+
+
+def per_call(post: Callable, url: str) -> None:
+    for command in all_commands():
+        post(f"{url}/v1/metadata", json=command, headers=track_tables.HEADERS, timeout=60)
+
+
+def timed(mock: MockHasura, setup: Callable[[], None], run: Callable[[], None], runs: int) -> tuple[float, int, int]:
+    """(median ms, requests, connections) of `run`, with `setup` before each untimed run."""
+    samples = []
+    for _ in range(runs):
+        setup()
+        mock.reset_counters()
+        started = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), mock.requests, mock.connections
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="delay the mock adds to every request")
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per variant (median is reported)")
+    args = parser.parse_args()
+
+    with MockHasura(args.latency_ms) as mock:
+        def empty() -> None:
+            mock.sources = {}
+
+        def configured() -> None:
+            mock.sources = {}
+            mock.metadata({"type": "bulk", "args": all_commands()})
+
+        def session_per_call() -> None:
+            with requests.Session() as session:
+                per_call(session.post, mock.url)
+
+        def bootstrap() -> None:
+            with requests.Session() as session:
+                track_tables.bootstrap(session, mock.url)
+
+        variants = [
+            ("new connection per call", empty, lambda: per_call(requests.post, mock.url)),
+            ("keep-alive session per call", empty, session_per_call),
+            ("export + bulk", empty, bootstrap),
+            ("re-run, nothing missing", configured, bootstrap),
+        ]
+        logger.info(f"{len(all_commands())} metadata commands, mock latency {args.latency_ms:g} ms per request")
+        baseline = None
+        for label, setup, run in variants:
+            median_ms, requests_made, connections = timed(mock, setup, run, args.runs)
+            baseline = baseline or median_ms
+            logger.info(f"  {label:<28} {median_ms:>9.1f} ms | {requests_made:>3} requests | "
+                        f"{connections:>3} connections | x{baseline / median_ms:,.1f}")
+
+
+if __name__ == "__main__":
+    main()
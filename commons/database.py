@@ -0,0 +1,370 @@
+"""
+Pooled Postgres connections shared by the database scripts and the Postgres task store.
+
+`DatabaseConfig.from_env()` reads DATABASE_URL, or the libpq variables
+(PGHOST, PGPORT, PGDATABASE, PGUSER, PGPASSWORD), and falls back to the
+docker-compose demo database. `ConnectionPool` lends psycopg2 connections to
+threads. It checks an idle connection before lending it, replaces connections
+older than `max_lifetime`, and counts what it does in `metrics()`.
+`AsyncConnectionPool` runs pooled work on its own threads, so coroutines can
+keep up to `max_size` queries in flight without blocking the event loop.
+"""
+import asyncio
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import os
+import threading
+import time
+from typing import Any, TypeVar
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, parse_dsn
+from psycopg2.extensions import connection as Connection
+from psycopg2.extensions import cursor as Cursor
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
+
+_CONNECT_FIELDS = ("host", "port", "dbname", "user", "password", "connect_timeout", "options")
+_ENV_VARS = {
+    "host": "PGHOST",
+    "port": "PGPORT",
+    "dbname": "PGDATABASE",
+    "user": "PGUSER",
+    "password": "PGPASSWORD",
+    "min_size": "DB_POOL_MIN_SIZE",
+    "max_size": "DB_POOL_MAX_SIZE",
+    "max_lifetime": "DB_POOL_MAX_LIFETIME",
+}
+# Errors after which a connection cannot be trusted and is closed instead of reused.
+_BROKEN = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+class PoolTimeout(TimeoutError):
+    """No connection became free within `checkout_timeout`."""
+
+
+class DatabaseConfig(BaseModel):
+    """Where to connect and how to size and maintain the pool."""
+
+    host: str = "localhost"
+    port: int = 5432
+    dbname: str = "demo"
+    user: str = "demo"
+    password: str = "demo"
+    connect_timeout: int = 3
+    options: str | None = None  # server settings, e.g. "-c search_path=app,public"
+    extra: dict[str, str] = Field(default_factory=dict)  # other libpq parameters (sslmode, ...)
+    min_size: int = Field(1, ge=0)
+    max_size: int = Field(10, ge=1)
+    max_lifetime: float = 3600.0  # seconds before a connection is closed and replaced
+    health_check_after: float = 5.0  # idle seconds after which checkout runs SELECT 1 (0: always)
+    checkout_timeout: float = 30.0
+
+    @classmethod
+    def from_dsn(cls, dsn: str, **overrides: Any) -> "DatabaseConfig":
+        """Build a config from a libpq URL or keyword string."""
+        params = parse_dsn(dsn)
+        known = {name: params.pop(name) for name in _CONNECT_FIELDS if name in params}
+        return cls(**{**known, "extra": params, **overrides})
+
+    @classmethod
+    def from_env(cls, **overrides: Any) -> "DatabaseConfig":
+        url = os.environ.get("DATABASE_URL")
+        if url:
+            return cls.from_dsn(url, **overrides)
+        env = {field: os.environ[var] for field, var in _ENV_VARS.items() if var in os.environ}
+        return cls(**{**env, **overrides})
+
+    def connect_kwargs(self) -> dict[str, Any]:
+        """Keyword arguments for psycopg2.connect."""
+        kwargs = {name: getattr(self, name) for name in _CONNECT_FIELDS if getattr(self, name) is not None}
+        return {**kwargs, **self.extra}
+
+
+class PoolMetrics(BaseModel):
+    """Point-in-time pool counters."""
+
+    size: int  # open connections, idle and in use
+    idle: int
+    in_use: int
+    waiting: int
+    checkouts: int
+    timeouts: int
+    connections_created: int
+    connections_recycled: int  # closed for exceeding max_lifetime
+    connections_failed_check: int  # found closed or failing SELECT 1 at checkout
+    wait_ms_total: float
+    wait_ms_max: float
+
+
+class _Entry:
+    __slots__ = ("conn", "created", "last_used")
+
+    def __init__(self, conn: Connection):
+        self.conn = conn
+        self.created = self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections; checkout waits when all are in use.
+
+    `configure` is called with every new connection before it is first lent,
+    e.g. to prepare statements.
+    """
+
+    def __init__(
+        self,
+        config: DatabaseConfig | None = None,
+        configure: Callable[[Connection], None] | None = None,
+    ):
+        self.config = config or DatabaseConfig.from_env()
+        self._configure = configure
+        self._idle: deque[_Entry] = deque()
+        self._in_use: dict[int, _Entry] = {}
+        self._size = 0  # open connections plus connections being opened
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._checkouts = self._timeouts = 0
+        self._created = self._recycled = self._failed_check = 0
+        self._wait_total = self._wait_max = 0.0
+
+    def __enter__(self) -> "ConnectionPool":
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def open(self) -> None:
+        """Open `min_size` connections up front, so connection errors surface here."""
+        while True:
+            # One slot at a time: a failed connect releases its own slot, and no other is held.
+            with self._cond:
+                if self._size >= self.config.min_size:
+                    return
+                self._size += 1
+            entry = self._connect_reserved()
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def close(self) -> None:
+        """Close idle connections now and borrowed ones as they are returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            entry.conn.close()
+
+    def getconn(self) -> Connection:
+        """Borrow a connection; give it back with `putconn`. Prefer `connection()`."""
+        start = time.monotonic()
+        deadline = start + self.config.checkout_timeout
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed")
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.config.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"No connection free after {self.config.checkout_timeout}s "
+                            f"(max_size={self.config.max_size})"
+                        )
+                    self._waiting += 1
+                    self._cond.wait(remaining)
+                    self._waiting -= 1
+            if entry is None:
+                entry = self._connect_reserved()
+            elif not self._usable(entry):
+                self._discard(entry)
+                continue
+            waited = (time.monotonic() - start) * 1000
+            with self._cond:
+                self._in_use[id(entry.conn)] = entry
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return entry.conn
+
+    def putconn(self, conn: Connection, discard: bool = False) -> None:
+        """Return a borrowed connection; an open transaction is rolled back."""
+        with self._cond:
+            entry = self._in_use.pop(id(conn))
+        if not discard and not conn.closed and conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        if discard or conn.closed or self._closed or self._expired(entry):
+            self._discard(entry)
+            return
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        """Borrow a connection; committed on normal exit, rolled back on error."""
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+            conn.commit()
+        except _BROKEN:
+            discard = True
+            raise
+        finally:
+            self.putconn(conn, discard)
+
+    @contextmanager
+    def cursor(self, **kwargs: Any) -> Iterator[Cursor]:
+        """A cursor on a borrowed connection, in a transaction committed on exit."""
+        with self.connection() as conn, conn.cursor(**kwargs) as cursor:
+            yield cursor
+
+    def metrics(self) -> PoolMetrics:
+        with self._cond:
+            return PoolMetrics(
+                size=self._size,
+                idle=len(self._idle),
+                in_use=len(self._in_use),
+                waiting=self._waiting,
+                checkouts=self._checkouts,
+                timeouts=self._timeouts,
+                connections_created=self._created,
+                connections_recycled=self._recycled,
+                connections_failed_check=self._failed_check,
+                wait_ms_total=self._wait_total,
+                wait_ms_max=self._wait_max,
+            )
+
+    def _connect_reserved(self) -> _Entry:
+        """Open a connection for a slot already counted in `_size`."""
+        try:
+            conn = psycopg2.connect(**self.config.connect_kwargs())
+            try:
+                if self._configure is not None:
+                    self._configure(conn)
+                    conn.commit()
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created += 1
+        return _Entry(conn)
+
+    def _expired(self, entry: _Entry) -> bool:
+        if time.monotonic() - entry.created < self.config.max_lifetime:
+            return False
+        with self._cond:
+            self._recycled += 1
+        return True
+
+    def _usable(self, entry: _Entry) -> bool:
+        """Health check for an idle connection about to be lent."""
+        if self._expired(entry):
+            return False
+        conn = entry.conn
+        healthy = not conn.closed
+        if healthy and time.monotonic() - entry.last_used >= self.config.health_check_after:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                healthy = False
+        if not healthy:
+            with self._cond:
+                self._failed_check += 1
+        return healthy
+
+    def _discard(self, entry: _Entry) -> None:
+        try:
+            entry.conn.close()
+        finally:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+
+
+class AsyncConnectionPool:
+    """asyncio front end to a ConnectionPool.
+
+    psycopg2 has no asyncio support, so each call borrows a connection on one of
+    `max_size` worker threads and the coroutine awaits the result.
+    """
+
+    def __init__(
+        self,
+        config: DatabaseConfig | None = None,
+        configure: Callable[[Connection], None] | None = None,
+    ):
+        self.pool = ConnectionPool(config, configure)
+        self._executor = ThreadPoolExecutor(self.pool.config.max_size, thread_name_prefix="db-pool")
+
+    async def __aenter__(self) -> "AsyncConnectionPool":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.pool.open)
+
+    async def close(self) -> None:
+        self.pool.close()
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Await `func(connection, *args)` run on a pooled connection, committed if it returns."""
+        def call() -> T:
+            with self.pool.connection() as conn:
+                return func(conn, *args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    async def execute(self, query: str, params: Any = None) -> int:
+        """Run a statement and return its row count."""
+        def execute(conn: Connection) -> int:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                return cursor.rowcount
+        return await self.run(execute)
+
+    async def fetchall(self, query: str, params: Any = None) -> list[tuple]:
+        def fetchall(conn: Connection) -> list[tuple]:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+        return await self.run(fetchall)
+
+    async def fetchone(self, query: str, params: Any = None) -> tuple | None:
+        def fetchone(conn: Connection) -> tuple | None:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchone()
+        return await self.run(fetchone)
+
+    def metrics(self) -> PoolMetrics:
+        return self.pool.metrics()
@@ -0,0 +1,45 @@
+"""
+Latency distribution helpers shared by the benchmarks and load tests.
+"""
+from collections.abc import Iterable
+import math
+
+from pydantic import BaseModel
+
+
+class LatencySummary(BaseModel):
+    """Distribution of a set of latency samples, in milliseconds."""
+
+    count: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+    def __str__(self) -> str:
+        return (
+            f"n={self.count:,} mean={self.mean_ms:.3f}ms p50={self.p50_ms:.3f}ms "
+            f"p95={self.p95_ms:.3f}ms p99={self.p99_ms:.3f}ms max={self.max_ms:.3f}ms"
+        )
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile (0 < q <= 100) of an already sorted, non-empty list."""
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_ms(samples_ms: Iterable[float]) -> LatencySummary:
+    """Summarize latency samples given in milliseconds."""
+    values = sorted(samples_ms)
+    if not values:
+        raise ValueError("Cannot summarize an empty set of samples")
+    return LatencySummary(
+        count=len(values),
+        mean_ms=sum(values) / len(values),
+        p50_ms=percentile(values, 50),
+        p95_ms=percentile(values, 95),
+        p99_ms=percentile(values, 99),
+        max_ms=values[-1],
+    )
@@ -0,0 +1,234 @@
+"""
+Local stand-in for the Hasura endpoints the scripts call, for tests and benchmarks.
+Serves /healthz, /v1/metadata and /v1/graphql over HTTP/1.1 keep-alive from a
+background thread. Metadata is held in memory in the shape of export_metadata.
+It accepts pg_add_source, pg_track_table, pg_create_object_relationship,
+pg_create_array_relationship and bulk (all or nothing), with Hasura's error
+bodies for duplicates and missing sources. GraphQL queries get an empty list
+per tracked root field. Every request can be delayed by `latency_ms`, standing
+in for the network round trip and Hasura's metadata rebuild. The server also
+counts requests and TCP connections, so callers can check how many of each
+they used, and the most requests that were in their delay at once.
+Run: python -m commons.mock_hasura [--port 8080] [--latency-ms 20]
+"""
+import argparse
+from contextlib import suppress
+import copy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+import threading
+import time
+from typing import Any
+
+from commons.logger import sentry_logger as logger
+
+_ROOT_FIELDS = re.compile(r"^\s*(?:query\b[^{]*)?\{\s*(.*)\}\s*$", re.S)
+
+
+class MetadataError(Exception):
+    """A metadata command Hasura would reject; becomes a 400 response."""
+
+    def __init__(self, code: str, error: str, path: str = "$.args"):
+        super().__init__(error)
+        self.body = {"code": code, "error": error, "path": path}
+
+
+class MockHasura:
+    """In-memory Hasura metadata and GraphQL endpoints on a local port (0: any free port)."""
+
+    def __init__(self, latency_ms: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.latency_ms = latency_ms
+        self.sources: dict[str, dict[str, Any]] = {}
+        self.requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockHasura":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-hasura", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockHasura":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests = self.connections = self.peak_in_flight = 0
+
+    def export_metadata(self) -> dict:
+        with self._lock:
+            return {"version": 3, "sources": [self._export_source(name, source) for name, source in self.sources.items()]}
+
+    @staticmethod
+    def _export_source(name: str, source: dict) -> dict:
+        tables = []
+        for (schema, table), relationships in source["tables"].items():
+            entry = {"table": {"schema": schema, "name": table}}
+            for kind in ("object_relationships", "array_relationships"):
+                if relationships[kind]:
+                    entry[kind] = [{"name": rel, "using": using} for rel, using in relationships[kind].items()]
+            tables.append(entry)
+        return {"name": name, "kind": "postgres", "tables": tables, "configuration": source["configuration"]}
+
+    def metadata(self, command: dict) -> dict:
+        """Apply one metadata command (bulk ones atomically); raises MetadataError like Hasura's 400s."""
+        if command.get("type") == "export_metadata":
+            return self.export_metadata()
+        with self._lock:
+            sources = copy.deepcopy(self.sources)
+            if command.get("type") == "bulk":
+                for index, item in enumerate(command.get("args", [])):
+                    try:
+                        self._apply(sources, item)
+                    except MetadataError as exc:
+                        exc.body["path"] = f"$.args[{index}].args"
+                        raise
+                result = [{"message": "success"} for _ in command.get("args", [])]
+            else:
+                result = self._apply(sources, command)
+            self.sources = sources
+            return result
+
+    @staticmethod
+    def _apply(sources: dict, command: dict) -> dict:
+        kind, args = command.get("type"), command.get("args", {})
+        if kind == "pg_add_source":
+            if args["name"] in sources:
+                raise MetadataError("already-exists", f"source with name \"{args['name']}\" already exists")
+            sources[args["name"]] = {"configuration": args["configuration"], "tables": {}}
+            return {"message": "success"}
+        source_name = args.get("source", "default")
+        if source_name not in sources:
+            raise MetadataError("not-exists", f"source with name \"{source_name}\" does not exist")
+        tables = sources[source_name]["tables"]
+        key = (args["table"].get("schema", "public"), args["table"]["name"])
+        if kind == "pg_track_table":
+            if key in tables:
+                raise MetadataError("already-tracked", f"view/table already tracked: \"{key[1]}\"")
+            tables[key] = {"object_relationships": {}, "array_relationships": {}}
+            return {"message": "success"}
+        if kind in ("pg_create_object_relationship", "pg_create_array_relationship"):
+            if key not in tables:
+                raise MetadataError("not-exists", f"table \"{key[1]}\" does not exist in source: {source_name}")
+            if args["name"] in tables[key]["object_relationships"] or args["name"] in tables[key]["array_relationships"]:
+                raise MetadataError("already-exists", f"field with name \"{args['name']}\" already exists in table \"{key[1]}\"")
+            tables[key][kind.removeprefix("pg_create_") + "s"][args["name"]] = args["using"]
+            return {"message": "success"}
+        raise MetadataError("invalid-params", f"unknown metadata command \"{kind}\"", "$.type")
+
+    def graphql(self, body: dict) -> dict:
+        """Empty result lists for the query's tracked root fields, Hasura's error for the others."""
+        match = _ROOT_FIELDS.match(body.get("query", ""))
+        fields = re.findall(r"(\w+)\s*(?:\([^)]*\))?\s*\{", _outer_level(match.group(1))) if match else []
+        with self._lock:
+            tracked = {table for source in self.sources.values() for _, table in source["tables"]}
+        for field in fields:
+            if field not in tracked:
+                return {"errors": [{"extensions": {"code": "validation-failed", "path": f"$.selectionSet.{field}"},
+                                    "message": f"field '{field}' not found in type: 'query_root'"}]}
+        return {"data": {field: [] for field in fields}}
+
+
+def _outer_level(selection: str) -> str:
+    """The selection set with nested braces removed, leaving `field {` markers at the top level."""
+    depth, kept = 0, []
+    for char in selection:
+        if char == "{":
+            if depth == 0:
+                kept.append(char)
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        elif depth == 0:
+            kept.append(char)
+    return "".join(kept)
+
+
+def _handler(mock: MockHasura) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse can be counted
+        disable_nagle_algorithm = True  # headers and body are separate writes; no delayed-ACK stall between them
+
+        def setup(self) -> None:
+            super().setup()
+            with mock._lock:
+                mock.connections += 1
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+        def _reply(self, status: int, body: Any) -> None:
+            payload = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain" if isinstance(body, str) else "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _count(self) -> None:
+            with mock._lock:
+                mock.requests += 1
+                mock.in_flight += 1
+                mock.peak_in_flight = max(mock.peak_in_flight, mock.in_flight)
+            try:
+                if mock.latency_ms:
+                    time.sleep(mock.latency_ms / 1000)
+            finally:
+                # Before the reply, so a client waiting on it never sees its own request still counted.
+                with mock._lock:
+                    mock.in_flight -= 1
+
+        def do_GET(self) -> None:
+            self._count()
+            if self.path == "/healthz":
+                self._reply(200, "OK")
+            else:
+                self._reply(404, {"code": "not-found", "error": "resource does not exist", "path": "$"})
+
+        def do_POST(self) -> None:
+            self._count()
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.path == "/v1/metadata":
+                try:
+                    self._reply(200, mock.metadata(body))
+                except MetadataError as exc:
+                    self._reply(400, exc.body)
+            elif self.path == "/v1/graphql":
+                self._reply(200, mock.graphql(body))
+            else:
+                self._reply(404, {"code": "not-found", "error": "resource does not exist", "path": "$"})
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every request")
+    args = parser.parse_args()
+    with MockHasura(args.latency_ms, port=args.port) as mock:
+        logger.info(f"🧪 Mock Hasura on {mock.url} ({args.latency_ms:g} ms per request), Ctrl+C to stop")
+        with suppress(KeyboardInterrupt):
+            threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
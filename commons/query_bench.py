@@ -0,0 +1,126 @@
+"""
+Query benchmark harness: warm-up runs, then timed iterations (perf_counter_ns
+around execute + fetchall) reported as p50/p95/p99 and rows/s per query. A
+BenchmarkReport round-trips through JSON so that a later run can be compared
+against it as a baseline.
+"""
+from datetime import datetime
+from pathlib import Path
+import time
+
+from pydantic import BaseModel, Field
+
+from commons.latency import LatencySummary, summarize_ms
+from commons.logger import sentry_logger as logger
+from commons.workload import WORKLOAD
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+class QueryResult(BaseModel):
+    """Timed iterations of one query."""
+
+    rows: int
+    latency: LatencySummary
+    rows_per_sec: float
+
+
+class BenchmarkReport(BaseModel):
+    """A benchmark run, as written to and read from JSON."""
+
+    created_at: datetime = Field(default_factory=datetime.now)
+    server_version: str
+    table_rows: dict[str, int]  # planner estimates, to tell runs on different data sizes apart
+    warmup: int
+    iterations: int
+    queries: dict[str, QueryResult]
+
+    def save(self, path: Path) -> None:
+        path.write_text(self.model_dump_json(indent=2))
+
+    @classmethod
+    def load(cls, path: Path) -> "BenchmarkReport":
+        return cls.model_validate_json(path.read_text())
+
+
+class Comparison(BaseModel):
+    """One query's chosen percentile, against the baseline."""
+
+    name: str
+    baseline_ms: float
+    current_ms: float
+    regressed: bool
+
+    @property
+    def change_pct(self) -> float:
+        return 100 * (self.current_ms - self.baseline_ms) / self.baseline_ms if self.baseline_ms else 0.0
+
+
+def time_query(cursor, query: str, warmup: int = 3, iterations: int = 20) -> QueryResult:
+    """Run `query` `warmup` times untimed, then `iterations` timed runs of execute + fetchall."""
+    for _ in range(warmup):
+        cursor.execute(query)
+        cursor.fetchall()
+    samples_ns, rows = [], 0
+    for _ in range(iterations):
+        started = time.perf_counter_ns()
+        cursor.execute(query)
+        rows = len(cursor.fetchall())
+        samples_ns.append(time.perf_counter_ns() - started)
+    total_s = sum(samples_ns) / 1e9
+    return QueryResult(
+        rows=rows,
+        latency=summarize_ms(ns / 1e6 for ns in samples_ns),
+        rows_per_sec=rows * iterations / total_s if total_s else 0.0,
+    )
+
+
+def run_benchmark(conn, workload: list[tuple[str, str]] = WORKLOAD,
+                  warmup: int = 3, iterations: int = 20) -> BenchmarkReport:
+    """Benchmark every (name, query) of `workload`; the transaction is rolled back afterwards."""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SHOW server_version")
+            server_version = cursor.fetchone()[0]
+            cursor.execute(
+                "SELECT relname, GREATEST(reltuples, 0)::bigint FROM pg_class "
+                "WHERE relkind IN ('r', 'p') AND relnamespace = current_schema()::regnamespace ORDER BY relname"
+            )
+            table_rows = dict(cursor.fetchall())
+            queries = {name: time_query(cursor, query, warmup, iterations) for name, query in workload}
+    finally:
+        conn.rollback()
+    return BenchmarkReport(server_version=server_version, table_rows=table_rows,
+                           warmup=warmup, iterations=iterations, queries=queries)
+
+
+def compare(baseline: BenchmarkReport, current: BenchmarkReport, tolerance_pct: float = 20.0,
+            metric: str = "p50_ms", min_delta_ms: float = 1.0) -> list[Comparison]:
+    """Queries present in both reports; a regression is slower by both `tolerance_pct` and `min_delta_ms`.
+
+    The absolute floor keeps sub-millisecond queries from failing on scheduler jitter.
+    """
+    comparisons = []
+    for name, result in current.queries.items():
+        if name not in baseline.queries:
+            continue
+        before = getattr(baseline.queries[name].latency, metric)
+        after = getattr(result.latency, metric)
+        regressed = after > before * (1 + tolerance_pct / 100) and after - before > min_delta_ms
+        comparisons.append(Comparison(name=name, baseline_ms=before, current_ms=after, regressed=regressed))
+    return comparisons
+
+
+def log_report(report: BenchmarkReport) -> None:
+    logger.info(f"PostgreSQL {report.server_version}, {report.warmup} warm-up + {report.iterations} timed runs per query")
+    for name, result in report.queries.items():
+        latency = result.latency
+        logger.info(f"  {name:<36} p50 {latency.p50_ms:>9.3f} ms  p95 {latency.p95_ms:>9.3f} ms  "
+                    f"p99 {latency.p99_ms:>9.3f} ms  {result.rows:>7,} rows  {result.rows_per_sec:>12,.0f} rows/s")
+
+
+def log_comparison(comparisons: list[Comparison], metric: str) -> None:
+    for c in comparisons:
+        logger.log("ERROR" if c.regressed else "INFO",
+                   f"  {'❌' if c.regressed else '✅'} {c.name:<36} {metric} {c.baseline_ms:>9.3f} → "
+                   f"{c.current_ms:>9.3f} ms ({c.change_pct:+.1f}%)")
@@ -0,0 +1,154 @@
+"""
+The known query workload: the demo_queries.py reports and the health check's
+performance query. Shared by the demo, the query benchmark, the enhanced
+health check and the index advisor, so they all time the same SQL.
+"""
+
+# (title, query, headers) of the demonstration queries, in display order.
+DEMO_QUERIES = [
+    # 1. Show all users with their role status
+    (
+        "Users Overview",
+        """
+        SELECT
+            username,
+            CONCAT(first_name, ' ', last_name) as full_name,
+            email,
+            CASE WHEN is_admin THEN 'Admin' ELSE 'User' END as role,
+            CASE WHEN is_active THEN 'Active' ELSE 'Inactive' END as status
+        FROM users
+        ORDER BY is_admin DESC, username;
+        """,
+        ['Username', 'Full Name', 'Email', 'Role', 'Status'],
+    ),
+    # 2. Task assignment overview with workload (from the user_status_counts rollup)
+    (
+        "Task Assignment & Workload",
+        """
+        SELECT
+            u.username,
+            COALESCE(SUM(s.task_count), 0) as total_tasks,
+            COALESCE(SUM(s.task_count) FILTER (WHERE s.status = 'pending'), 0) as pending,
+            COALESCE(SUM(s.task_count) FILTER (WHERE s.status = 'in_progress'), 0) as in_progress,
+            COALESCE(SUM(s.task_count) FILTER (WHERE s.status = 'completed'), 0) as completed
+        FROM users u
+        LEFT JOIN user_status_counts s ON u.id = s.user_id
+        GROUP BY u.id, u.username
+        ORDER BY total_tasks DESC;
+        """,
+        ['User', 'Total', 'Pending', 'In Progress', 'Completed'],
+    ),
+    # 3. Tasks with categories and priorities
+    (
+        "Tasks by Category & Priority",
+        """
+        SELECT
+            t.title,
+            t.priority,
+            t.status,
+            STRING_AGG(c.name, ', ') as categories,
+            u.username as assigned_to
+        FROM tasks t
+        LEFT JOIN task_categories tc ON t.id = tc.task_id
+        LEFT JOIN categories c ON tc.category_id = c.id
+        LEFT JOIN users u ON t.assigned_to = u.id
+        GROUP BY t.id, t.title, t.priority, t.status, u.username
+        ORDER BY
+            CASE t.priority
+                WHEN 'urgent' THEN 1
+                WHEN 'high' THEN 2
+                WHEN 'medium' THEN 3
+                WHEN 'low' THEN 4
+            END;
+        """,
+        ['Title', 'Priority', 'Status', 'Categories', 'Assigned To'],
+    ),
+    # 4. Comment activity by task (from the task_comment_stats rollup)
+    (
+        "Comment Activity & Collaboration",
+        """
+        SELECT
+            t.title,
+            s.comment_count,
+            s.unique_commenters,
+            s.last_comment_at as last_comment
+        FROM task_comment_stats s
+        JOIN tasks t ON t.id = s.task_id
+        WHERE s.comment_count > 0
+        ORDER BY s.comment_count DESC;
+        """,
+        ['Task', 'Comments', 'Commenters', 'Last Comment'],
+    ),
+    # 5. Category usage statistics
+    (
+        "Category Usage Statistics",
+        """
+        SELECT
+            c.name,
+            c.color,
+            COUNT(tc.task_id) as task_count,
+            ROUND(COUNT(tc.task_id) * 100.0 /
+                  (SELECT COUNT(*) FROM task_categories), 2) as percentage
+        FROM categories c
+        LEFT JOIN task_categories tc ON c.id = tc.category_id
+        GROUP BY c.id, c.name, c.color
+        ORDER BY task_count DESC;
+        """,
+        ['Category', 'Color', 'Tasks', 'Percentage'],
+    ),
+    # 6. Advanced: Task timeline with durations
+    (
+        "Task Timeline & Duration Analysis",
+        """
+        SELECT
+            t.title,
+            t.created_at::date as created_date,
+            t.due_date::date as due_date,
+            CASE
+                WHEN t.due_date IS NOT NULL
+                THEN EXTRACT(days FROM t.due_date - t.created_at)
+                ELSE NULL
+            END as days_allocated,
+            t.estimated_hours,
+            creator.username as created_by,
+            assignee.username as assigned_to
+        FROM tasks t
+        LEFT JOIN users creator ON t.created_by = creator.id
+        LEFT JOIN users assignee ON t.assigned_to = assignee.id
+        ORDER BY t.created_at DESC;
+        """,
+        ['Title', 'Created', 'Due Date', 'Days', 'Est Hours', 'Creator', 'Assignee'],
+    ),
+    # 7. Database statistics
+    (
+        "Database Statistics",
+        """
+        SELECT
+            'Users' as table_name, COUNT(*) as record_count FROM users
+        UNION ALL
+        SELECT 'Tasks', COUNT(*) FROM tasks
+        UNION ALL
+        SELECT 'Categories', COUNT(*) FROM categories
+        UNION ALL
+        SELECT 'Comments', COUNT(*) FROM comments
+        UNION ALL
+        SELECT 'Task-Categories', COUNT(*) FROM task_categories
+        ORDER BY record_count DESC;
+        """,
+        ['Table', 'Records'],
+    ),
+]
+
+# Hot path of the task views: pending high-priority tasks with assignee and categories.
+PERFORMANCE_QUERY = """
+    SELECT t.title, u.username, c.name
+    FROM tasks t
+    JOIN users u ON t.assigned_to = u.id
+    JOIN task_categories tc ON t.id = tc.task_id
+    JOIN categories c ON tc.category_id = c.id
+    WHERE t.status = 'pending'
+    AND t.priority = 'high'
+"""
+
+# (name, query) pairs benchmarked and advised on by default.
+WORKLOAD = [("Pending High-Priority Tasks", PERFORMANCE_QUERY)] + [(title, query) for title, query, _ in DEMO_QUERIES]
@@ -1,22 +1,17 @@
 """
 Quick connectivity check for the demo Postgres.
+Connection settings come from the environment (see commons/database.py).
 Run: python db_health.py   (requires psycopg2-binary)
 """
-import psycopg2
 import sys
+
+from commons.database import ConnectionPool, DatabaseConfig
 from commons.logger import sentry_logger as logger
 
 try:
-    conn = psycopg2.connect(
-        host="localhost",
-        port=5432,
-        dbname="demo",
-        user="demo",
-        password="demo",
-        connect_timeout=3,
-    )
-    conn.close()
+    with ConnectionPool(DatabaseConfig.from_env(min_size=1, max_size=1)) as pool, pool.cursor() as cursor:
+        cursor.execute("SELECT 1")
     logger.info("✅  Postgres is reachable.")
 except Exception as exc:
     logger.error(f"❌  Postgres connection failed: {exc}")
-    sys.exit(1) 
\ No newline at end of file
+    sys.exit(1)
@@ -1,24 +1,24 @@
 """
 Enhanced connectivity and schema validation check for the demo Postgres.
 Validates both connection and database schema integrity.
-Run: python db_health_enhanced.py
+Connection settings come from the environment (see commons/database.py).
+Run: python db_health_enhanced.py [--baseline bench.json] [--tolerance 20]
 """
-import psycopg2
+import argparse
+from pathlib import Path
 import sys
+
+from commons.database import ConnectionPool, DatabaseConfig
 from commons.logger import sentry_logger as logger
+from commons.query_bench import BenchmarkReport, compare, log_comparison, log_report, run_benchmark
+from commons.workload import WORKLOAD
+
 
-def check_connection():
-    """Test basic database connectivity."""
+def check_connection(pool):
+    """Test basic database connectivity; returns a connection borrowed from `pool`."""
     logger.info("🔍 Testing database connection...")
     try:
-        conn = psycopg2.connect(
-            host="localhost",
-            port=5432,
-            dbname="demo",
-            user="demo",
-            password="demo",
-            connect_timeout=3,
-        )
+        conn = pool.getconn()
         logger.info("✅ Database connection successful")
         return conn
     except Exception as exc:
@@ -170,52 +170,41 @@ def check_sample_data(conn):
     finally:
         cursor.close()
 
-def check_performance(conn):
-    """Test query performance with indexes."""
-    print("\n🔍 Testing query performance...")
-    
-    cursor = conn.cursor()
+def check_performance(conn, baseline=None, tolerance=20.0, iterations=10):
+    """Benchmark the query workload; fails on a regression against a `baseline` report."""
+    logger.info("🔍 Benchmarking query performance...")
     
     try:
-        # Test indexed queries
-        import time
-        
-        # Query that should use indexes
-        start_time = time.time()
-        cursor.execute("""
-            SELECT t.title, u.username, c.name
-            FROM tasks t
-            JOIN users u ON t.assigned_to = u.id
-            JOIN task_categories tc ON t.id = tc.task_id
-            JOIN categories c ON tc.category_id = c.id
-            WHERE t.status = 'pending' 
-            AND t.priority = 'high'
-        """)
-        results = cursor.fetchall()
-        end_time = time.time()
-        
-        query_time = (end_time - start_time) * 1000  # Convert to ms
-        
-        if query_time > 100:  # Should be very fast for small dataset
-            print(f"⚠️  Query performance concern: {query_time:.2f}ms")
-        else:
-            print(f"✅ Query performance: {query_time:.2f}ms")
-        
+        report = run_benchmark(conn, WORKLOAD, warmup=2, iterations=iterations)
+        log_report(report)
+        if baseline is None:
+            return True
+
+        comparisons = compare(BenchmarkReport.load(baseline), report, tolerance)
+        log_comparison(comparisons, "p50_ms")
+        if any(c.regressed for c in comparisons):
+            logger.error(f"❌ Queries slower than {baseline} by more than {tolerance:g}%")
+            return False
         return True
         
     except Exception as exc:
-        print(f"❌ Performance test failed: {exc}")
+        logger.error(f"❌ Performance test failed: {exc}")
         return False
-    finally:
-        cursor.close()
 
 def main():
     """Run comprehensive database health check."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--baseline", type=Path, help="benchmark report to compare against (see benchmarks/bench_queries.py)")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="allowed query slowdown in percent")
+    parser.add_argument("--iterations", type=int, default=10, help="timed runs per query")
+    args = parser.parse_args()
+
     print("🎯 Enhanced Database Health Check")
     print("=================================")
     
     # Test connection
-    conn = check_connection()
+    pool = ConnectionPool(DatabaseConfig.from_env(min_size=0, max_size=1))
+    conn = check_connection(pool)
     if not conn:
         sys.exit(1)
     
@@ -233,7 +222,7 @@ def main():
             sys.exit(1)
         
         # Test performance
-        perf_ok = check_performance(conn)
+        perf_ok = check_performance(conn, args.baseline, args.tolerance, args.iterations)
         if not perf_ok:
             print("\n❌ Performance test failed")
             sys.exit(1)
@@ -252,7 +241,9 @@ def main():
         print(f"\n❌ Health check failed: {exc}")
         sys.exit(1)
     finally:
-        conn.close()
+        pool.putconn(conn)
+        logger.info(f"Connection pool: {pool.metrics()}")
+        pool.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,210 +1,187 @@
 """
 Demonstration queries for the demo database schema.
 Shows various relationships and advanced SQL features.
+The queries run concurrently over a connection pool. Each one streams its
+rows from a server-side cursor in fetchmany batches into a small bounded
+queue, while the results are printed in display order. With --bench the
+output is skipped and the workload runs --repeat times at each --concurrency
+level, reporting throughput and per-query latency percentiles.
+Connection settings come from the environment (see commons/database.py).
+Run: python demo_queries.py [--concurrency 4] [--bench --repeat 5 --concurrency 1 2 4 8]
 """
-import psycopg2
+import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import queue
 import sys
-from datetime import datetime
+import threading
+import time
+from typing import NamedTuple
+import uuid
 
-def connect_db():
-    """Connect to the demo database."""
-    try:
-        conn = psycopg2.connect(
-            host="localhost",
-            port=5432,
-            dbname="demo",
-            user="demo",
-            password="demo",
-            connect_timeout=3,
-        )
-        return conn
-    except Exception as exc:
-        print(f"❌ Database connection failed: {exc}")
-        sys.exit(1)
+from commons.database import ConnectionPool, DatabaseConfig
+from commons.latency import summarize_ms
+from commons.workload import DEMO_QUERIES
+
+FETCH_SIZE = 2000  # rows per fetchmany round trip
+QUEUE_BATCHES = 4  # batches buffered per query ahead of the printer
+TIMESTAMP_OIDS = {1114, 1184}  # timestamp, timestamptz
+
+def _format_value(value):
+    return 'NULL' if value is None else str(value)
+
+def _format_timestamp(value):
+    return 'NULL' if value is None else value.strftime('%Y-%m-%d %H:%M')
+
+def column_formatters(description):
+    """One value-to-text function per column, picked once from the column types."""
+    return [_format_timestamp if column.type_code in TIMESTAMP_OIDS else _format_value for column in description]
+
+def stream_query(pool, query, fetch_size=FETCH_SIZE):
+    """Yield (description, rows) batches from a server-side cursor; the first batch may be empty."""
+    with pool.cursor(name=f"demo_{uuid.uuid4().hex[:12]}") as cursor:
+        cursor.execute(query)
+        rows = cursor.fetchmany(fetch_size)
+        yield cursor.description, rows
+        while rows:
+            rows = cursor.fetchmany(fetch_size)
+            if rows:
+                yield cursor.description, rows
 
-def run_query(cursor, title, query, headers=None):
-    """Run a query and display formatted results."""
+def prefetch(executor, pool, query, fetch_size=FETCH_SIZE, cancelled=None):
+    """Stream `query` on `executor` into a bounded queue; None ends it, an exception is passed on.
+
+    Setting `cancelled` makes a producer blocked on a full queue give up (closing its cursor).
+    """
+    batches = queue.Queue(maxsize=QUEUE_BATCHES)
+
+    def put(item):
+        while not (cancelled and cancelled.is_set()):
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for batch in stream_query(pool, query, fetch_size):
+                if not put(batch):
+                    return
+            put(None)
+        except Exception as exc:
+            put(exc)
+
+    executor.submit(produce)
+    return batches
+
+def print_results(title, batches, headers=None):
+    """Print batches from `prefetch` as they arrive."""
     print(f"\n🔍 {title}")
     print("=" * len(title))
     
-    cursor.execute(query)
-    results = cursor.fetchall()
-    
     if headers:
         print(f"{'  '.join(f'{h:<15}' for h in headers)}")
         print("-" * (16 * len(headers)))
     
-    for row in results:
-        formatted_row = []
-        for item in row:
-            if isinstance(item, datetime):
-                formatted_row.append(item.strftime('%Y-%m-%d %H:%M'))
-            elif item is None:
-                formatted_row.append('NULL')
-            else:
-                formatted_row.append(str(item))
-        
-        if headers:
-            print(f"{'  '.join(f'{item:<15}' for item in formatted_row)}")
-        else:
-            print(f"  {' | '.join(formatted_row)}")
+    count = 0
+    formatters = None
+    while (batch := batches.get()) is not None:
+        if isinstance(batch, Exception):
+            raise batch
+        description, rows = batch
+        if formatters is None:
+            formatters = column_formatters(description)
+            template = '  '.join(['{:<15}'] * len(formatters)) if headers else '  ' + ' | '.join(['{}'] * len(formatters))
+        if rows:
+            print("\n".join(template.format(*[f(v) for f, v in zip(formatters, row, strict=True)]) for row in rows))
+        count += len(rows)
     
-    print(f"📊 Found {len(results)} record(s)")
+    print(f"📊 Found {count} record(s)")
+    return count
+
+def run_queries(pool, concurrency, queries=DEMO_QUERIES, fetch_size=FETCH_SIZE):
+    """Print every (title, query, headers); up to `concurrency` queries are fetched ahead of the printer."""
+    cancelled = threading.Event()
+    with ThreadPoolExecutor(concurrency) as executor:
+        # Submitted in display order, so the query being printed always has a worker.
+        pending = [(title, headers, prefetch(executor, pool, query, fetch_size, cancelled))
+                   for title, query, headers in queries]
+        try:
+            return [print_results(title, batches, headers) for title, headers, batches in pending]
+        except BaseException:
+            cancelled.set()
+            executor.shutdown(cancel_futures=True)
+            raise
+
+class MatrixResult(NamedTuple):
+    concurrency: int
+    seconds: float
+    queries: int
+    rows: int
+    latency: dict  # title -> LatencySummary of time to last row
+
+def time_stream(pool, query, fetch_size=FETCH_SIZE):
+    """Stream `query` to the end, discarding rows; returns (ms to last row, rows)."""
+    started = time.perf_counter_ns()
+    rows = sum(len(batch) for _, batch in stream_query(pool, query, fetch_size))
+    return (time.perf_counter_ns() - started) / 1e6, rows
+
+def run_matrix(config, levels, repeat, queries=DEMO_QUERIES, fetch_size=FETCH_SIZE):
+    """Run every query `repeat` times at each concurrency level, on a pool of that size."""
+    results = []
+    for concurrency in levels:
+        pool_config = config.model_copy(update={"min_size": concurrency, "max_size": concurrency})
+        with ConnectionPool(pool_config) as pool, ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(lambda q: time_stream(pool, q[1], fetch_size), queries))  # warm-up pass
+            jobs = [(title, query) for _ in range(repeat) for title, query, _ in queries]
+            started = time.perf_counter()
+            futures = [(title, executor.submit(time_stream, pool, query, fetch_size)) for title, query in jobs]
+            samples, rows = defaultdict(list), 0
+            for title, future in futures:
+                ms, count = future.result()
+                samples[title].append(ms)
+                rows += count
+            seconds = time.perf_counter() - started
+        latency = {title: summarize_ms(values) for title, values in samples.items()}
+        results.append(MatrixResult(concurrency, seconds, len(jobs), rows, latency))
+    return results
+
+def print_matrix(results):
+    for result in results:
+        print(f"\n⏱️  concurrency={result.concurrency}: {result.queries} queries in {result.seconds:.2f}s "
+              f"→ {result.queries / result.seconds:,.1f} queries/s, {result.rows / result.seconds:,.0f} rows/s")
+        for title, latency in result.latency.items():
+            print(f"  {title:<36} {latency}")
 
 def main():
     """Run demonstration queries."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4], help="queries in flight (several with --bench)")
+    parser.add_argument("--bench", action="store_true", help="measure throughput and latency instead of printing rows")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each query per concurrency level with --bench")
+    parser.add_argument("--fetch-size", type=int, default=FETCH_SIZE, help="rows per fetchmany")
+    args = parser.parse_args()
+    config = DatabaseConfig.from_env(min_size=0)
+
+    if args.bench:
+        print("🎯 Demo Query Workload Benchmark")
+        print("================================")
+        try:
+            print_matrix(run_matrix(config, args.concurrency, args.repeat, fetch_size=args.fetch_size))
+        except Exception as e:
+            print(f"❌ Benchmark failed: {e}")
+            sys.exit(1)
+        return
+
     print("🎯 Database Schema Demonstration")
     print("================================")
     
-    conn = connect_db()
-    cursor = conn.cursor()
-    
+    concurrency = max(args.concurrency)
+    pool = ConnectionPool(config.model_copy(update={"max_size": concurrency}))
     try:
-        # 1. Show all users with their role status
-        run_query(
-            cursor,
-            "Users Overview",
-            """
-            SELECT 
-                username,
-                CONCAT(first_name, ' ', last_name) as full_name,
-                email,
-                CASE WHEN is_admin THEN 'Admin' ELSE 'User' END as role,
-                CASE WHEN is_active THEN 'Active' ELSE 'Inactive' END as status
-            FROM users 
-            ORDER BY is_admin DESC, username;
-            """,
-            ['Username', 'Full Name', 'Email', 'Role', 'Status']
-        )
-        
-        # 2. Task assignment overview with workload
-        run_query(
-            cursor,
-            "Task Assignment & Workload",
-            """
-            SELECT 
-                u.username,
-                COUNT(t.id) as total_tasks,
-                COUNT(CASE WHEN t.status = 'pending' THEN 1 END) as pending,
-                COUNT(CASE WHEN t.status = 'in_progress' THEN 1 END) as in_progress,
-                COUNT(CASE WHEN t.status = 'completed' THEN 1 END) as completed
-            FROM users u
-            LEFT JOIN tasks t ON u.id = t.assigned_to
-            GROUP BY u.id, u.username
-            ORDER BY total_tasks DESC;
-            """,
-            ['User', 'Total', 'Pending', 'In Progress', 'Completed']
-        )
-        
-        # 3. Tasks with categories and priorities
-        run_query(
-            cursor,
-            "Tasks by Category & Priority",
-            """
-            SELECT 
-                t.title,
-                t.priority,
-                t.status,
-                STRING_AGG(c.name, ', ') as categories,
-                u.username as assigned_to
-            FROM tasks t
-            LEFT JOIN task_categories tc ON t.id = tc.task_id
-            LEFT JOIN categories c ON tc.category_id = c.id
-            LEFT JOIN users u ON t.assigned_to = u.id
-            GROUP BY t.id, t.title, t.priority, t.status, u.username
-            ORDER BY 
-                CASE t.priority 
-                    WHEN 'urgent' THEN 1 
-                    WHEN 'high' THEN 2 
-                    WHEN 'medium' THEN 3 
-                    WHEN 'low' THEN 4 
-                END;
-            """,
-            ['Title', 'Priority', 'Status', 'Categories', 'Assigned To']
-        )
-        
-        # 4. Comment activity by task
-        run_query(
-            cursor,
-            "Comment Activity & Collaboration",
-            """
-            SELECT 
-                t.title,
-                COUNT(co.id) as comment_count,
-                COUNT(DISTINCT co.user_id) as unique_commenters,
-                MAX(co.created_at) as last_comment
-            FROM tasks t
-            LEFT JOIN comments co ON t.id = co.task_id
-            GROUP BY t.id, t.title
-            HAVING COUNT(co.id) > 0
-            ORDER BY comment_count DESC;
-            """,
-            ['Task', 'Comments', 'Commenters', 'Last Comment']
-        )
-        
-        # 5. Category usage statistics
-        run_query(
-            cursor,
-            "Category Usage Statistics",
-            """
-            SELECT 
-                c.name,
-                c.color,
-                COUNT(tc.task_id) as task_count,
-                ROUND(COUNT(tc.task_id) * 100.0 / 
-                      (SELECT COUNT(*) FROM task_categories), 2) as percentage
-            FROM categories c
-            LEFT JOIN task_categories tc ON c.id = tc.category_id
-            GROUP BY c.id, c.name, c.color
-            ORDER BY task_count DESC;
-            """,
-            ['Category', 'Color', 'Tasks', 'Percentage']
-        )
-        
-        # 6. Advanced: Task timeline with durations
-        run_query(
-            cursor,
-            "Task Timeline & Duration Analysis",
-            """
-            SELECT 
-                t.title,
-                t.created_at::date as created_date,
-                t.due_date::date as due_date,
-                CASE 
-                    WHEN t.due_date IS NOT NULL 
-                    THEN EXTRACT(days FROM t.due_date - t.created_at)
-                    ELSE NULL 
-                END as days_allocated,
-                t.estimated_hours,
-                creator.username as created_by,
-                assignee.username as assigned_to
-            FROM tasks t
-            LEFT JOIN users creator ON t.created_by = creator.id
-            LEFT JOIN users assignee ON t.assigned_to = assignee.id
-            ORDER BY t.created_at DESC;
-            """,
-            ['Title', 'Created', 'Due Date', 'Days', 'Est Hours', 'Creator', 'Assignee']
-        )
-        
-        # 7. Database statistics
-        run_query(
-            cursor,
-            "Database Statistics",
-            """
-            SELECT 
-                'Users' as table_name, COUNT(*) as record_count FROM users
-            UNION ALL
-            SELECT 'Tasks', COUNT(*) FROM tasks
-            UNION ALL  
-            SELECT 'Categories', COUNT(*) FROM categories
-            UNION ALL
-            SELECT 'Comments', COUNT(*) FROM comments
-            UNION ALL
-            SELECT 'Task-Categories', COUNT(*) FROM task_categories
-            ORDER BY record_count DESC;
-            """,
-            ['Table', 'Records']
-        )
+        run_queries(pool, concurrency, fetch_size=args.fetch_size)
         
         print("\n✅ Database demonstration complete!")
         print("\n🎯 Schema Features Demonstrated:")
@@ -221,8 +198,7 @@ def main():
         print(f"❌ Query execution failed: {e}")
         sys.exit(1)
     finally:
-        cursor.close()
-        conn.close()
+        pool.close()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
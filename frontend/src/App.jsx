@@ -1,15 +1,44 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
+
+// Apply a /tasks/changes delta: "add"/"complete" upsert the task, "remove" drops it.
+function applyChanges(tasks, changes) {
+  const byId = new Map(tasks.map((task) => [task.id, task]));
+  for (const change of changes) {
+    if (change.op === 'remove') {
+      byId.delete(change.id);
+    } else {
+      byId.set(change.id, change.task);
+    }
+  }
+  return [...byId.values()];
+}
 
 function App() {
   const [tasks, setTasks] = useState([]);
   const [newTask, setNewTask] = useState('');
   const [newTaskPriority, setNewTaskPriority] = useState('medium');
 
+  // Version of the server state reflected in `tasks`, within the server's epoch
+  // (which changes on every restart); no epoch means nothing loaded yet.
+  const versionRef = useRef(0);
+  const epochRef = useRef('');
+
   const fetchTasks = async () => {
     try {
-      const response = await fetch('http://localhost:8000/tasks');
-      const data = await response.json();
-      setTasks(data);
+      const response = await fetch(
+        `http://localhost:8000/tasks/changes?since=${versionRef.current}&epoch=${epochRef.current}`
+      );
+      const feed = await response.json();
+      if (feed.reset) {
+        // Our version fell out of the server's change log (or the server restarted).
+        epochRef.current = feed.epoch;
+        versionRef.current = feed.version;
+        setTasks(feed.tasks);
+      } else if (feed.epoch === epochRef.current && feed.version > versionRef.current) {
+        // Older replies that arrive late are skipped so they cannot undo newer changes.
+        versionRef.current = feed.version;
+        setTasks((current) => applyChanges(current, feed.changes));
+      }
     } catch (error) {
       console.error('Error fetching tasks:', error);
     }
@@ -30,7 +59,6 @@ function App() {
       if (response.ok) {
         setNewTask('');
         setNewTaskPriority('medium');
-        await fetchTasks();
       }
     } catch (error) {
       console.error('Error adding task:', error);
@@ -39,13 +67,9 @@ function App() {
 
   const completeTask = async (id) => {
     try {
-      const response = await fetch(`http://localhost:8000/tasks/${id}`, {
+      await fetch(`http://localhost:8000/tasks/${id}`, {
         method: 'PUT',
       });
-      
-      if (response.ok) {
-        await fetchTasks();
-      }
     } catch (error) {
       console.error('Error completing task:', error);
     }
@@ -53,20 +77,36 @@ function App() {
 
   const deleteTask = async (id) => {
     try {
-      const response = await fetch(`http://localhost:8000/tasks/${id}`, {
+      await fetch(`http://localhost:8000/tasks/${id}`, {
         method: 'DELETE',
       });
-      
-      if (response.ok) {
-        await fetchTasks();
-      }
     } catch (error) {
       console.error('Error deleting task:', error);
     }
   };
 
+  // Changes are pushed over server-sent events, so actions don't refetch.
+  // Every (re)connect catches up through /tasks/changes, which also does the initial load.
   useEffect(() => {
-    fetchTasks();
+    const events = new EventSource('http://localhost:8000/tasks/events');
+    const onChange = (event) => {
+      const change = JSON.parse(event.data);
+      if (!event.lastEventId.startsWith(`${epochRef.current}.`)) {
+        fetchTasks(); // the server restarted since our last load
+        return;
+      }
+      if (change.version <= versionRef.current) return;
+      if (change.version !== versionRef.current + 1) {
+        fetchTasks(); // we missed something; catch up from the change feed
+        return;
+      }
+      versionRef.current = change.version;
+      setTasks((current) => applyChanges(current, [change]));
+    };
+    events.addEventListener('open', fetchTasks);
+    events.addEventListener('reset', fetchTasks);
+    ['add', 'complete', 'remove'].forEach((op) => events.addEventListener(op, onChange));
+    return () => events.close();
   }, []);
 
   return (
@@ -1,195 +1,235 @@
 """
 GraphQL Health Check Script for Hasura
 Tests the Hasura endpoint and validates that all schema relationships work correctly.
-Run: python graphql_health.py
+Every query of the basic, relationship and complex suites runs --repeat
+times, with up to --concurrency requests in flight over one shared
+keep-alive client. Each query is reported with its p50/p95/p99 latency
+and response size. A query passes only if every run returned data
+without GraphQL errors.
+Run: python graphql_health.py [--url http://localhost:8080] [--concurrency 8] [--repeat 5]
+Try it without Hasura: python -m commons.mock_hasura --port 8080
 """
-import requests
-import json
-import sys
+import argparse
+import asyncio
+from collections import defaultdict
 from datetime import datetime
+import sys
+import time
+from typing import NamedTuple
+
+import httpx
+
+from commons.latency import summarize_ms
 
 HASURA_URL = "http://localhost:8080"
 HEADERS = {
     "Content-Type": "application/json"
 }
 
-def test_hasura_connection():
+# (query, description) of the basic table queries.
+BASIC_QUERIES = [
+    ("{ users { id username email is_admin } }", "Users table access"),
+    ("{ tasks { id title status priority } }", "Tasks table access"),
+    ("{ categories { id name color } }", "Categories table access"),
+    ("{ comments { id content created_at } }", "Comments table access"),
+    ("{ attachments { id filename file_size } }", "Attachments table access"),
+    ("{ task_history { id action created_at } }", "Task history table access"),
+    ("{ task_categories { task_id category_id } }", "Task categories junction table"),
+]
+
+# (query, description) of the relationship queries.
+RELATIONSHIP_QUERIES = [
+    ("""{
+        users {
+            username
+            assigned_tasks { title status }
+            created_tasks { title }
+            comments { content }
+        }
+    }""", "Users with tasks and comments relationships"),
+
+    ("""{
+        tasks {
+            title
+            assigned_user { username first_name }
+            creator { username }
+            comments { content user { username } }
+            attachments { filename }
+            history { action user { username } }
+        }
+    }""", "Tasks with all related data"),
+
+    ("""{
+        categories {
+            name
+            creator { username }
+            task_categories { task { title assigned_user { username } } }
+        }
+    }""", "Categories with tasks through junction table"),
+
+    ("""{
+        comments {
+            content
+            task { title }
+            user { username }
+        }
+    }""", "Comments with task and user relationships"),
+]
+
+# (query, description) of the complex queries, with filtering and aggregation.
+COMPLEX_QUERIES = [
+    ("""{
+        users(where: {is_admin: {_eq: true}}) {
+            username
+            assigned_tasks_aggregate {
+                aggregate { count }
+            }
+        }
+    }""", "Filter users by admin status with aggregation"),
+
+    ("""{
+        tasks(where: {status: {_eq: "in_progress"}}) {
+            title
+            priority
+            assigned_user { username }
+            comments_aggregate {
+                aggregate { count }
+            }
+        }
+    }""", "Filter tasks by status with comment count"),
+
+    ("""{
+        categories(order_by: {name: asc}) {
+            name
+            task_categories_aggregate {
+                aggregate { count }
+            }
+        }
+    }""", "Ordered categories with task count"),
+
+    ("""{
+        tasks(where: {priority: {_in: ["high", "urgent"]}}) {
+            title
+            priority
+            due_date
+            assigned_user {
+                username
+                assigned_tasks_aggregate {
+                    aggregate { count }
+                }
+            }
+        }
+    }""", "High priority tasks with assignee workload"),
+]
+
+# (header, summary label, queries) of the suites, in report order.
+SUITES = [
+    ("📋 Basic Table Queries", "Basic queries", BASIC_QUERIES),
+    ("🔗 Relationship Queries", "Relationship queries", RELATIONSHIP_QUERIES),
+    ("🎯 Complex Queries", "Complex queries", COMPLEX_QUERIES),
+]
+
+class QueryResult(NamedTuple):
+    suite: str
+    description: str
+    runs: int
+    failures: int
+    error: str  # first failure, "" when every run passed
+    latency: object  # LatencySummary over every run, failed ones included
+    size_bytes: int  # largest response body
+
+    @property
+    def passed(self):
+        return self.failures == 0
+
+def create_client(url=HASURA_URL, concurrency=8, timeout=10.0):
+    """One keep-alive client for the whole run, with a connection per request in flight."""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    return httpx.AsyncClient(base_url=url, headers=HEADERS, limits=limits, timeout=timeout)
+
+async def check_connection(client):
     """Test basic Hasura endpoint connectivity."""
     print("🔍 Testing Hasura connectivity...")
     try:
-        response = requests.get(f"{HASURA_URL}/healthz", timeout=5)
+        response = await client.get("/healthz", timeout=5)
         if response.status_code == 200:
             print("✅ Hasura endpoint is healthy")
             return True
         else:
             print(f"❌ Hasura health check failed: {response.status_code}")
             return False
-    except Exception as e:
+    except httpx.HTTPError as e:
         print(f"❌ Cannot connect to Hasura: {e}")
         return False
 
-def run_graphql_query(query, description):
-    """Run a GraphQL query and return results."""
-    print(f"\n🔍 Testing: {description}")
-    
-    payload = {"query": query}
-    
+async def run_graphql_query(client, query):
+    """Run a GraphQL query once; returns (ms, response bytes, error or "")."""
+    started = time.perf_counter_ns()
     try:
-        response = requests.post(f"{HASURA_URL}/v1/graphql", 
-                               headers=HEADERS,
-                               data=json.dumps(payload),
-                               timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if 'errors' in data:
-                print(f"❌ GraphQL errors: {data['errors']}")
-                return None
-            else:
-                print("✅ Query successful")
-                return data['data']
-        else:
-            print(f"❌ HTTP error: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"❌ Query failed: {e}")
-        return None
+        response = await client.post("/v1/graphql", json={"query": query})
+        body = response.content
+    except httpx.HTTPError as e:
+        return (time.perf_counter_ns() - started) / 1e6, 0, f"request failed: {e!r}"
+    elapsed = (time.perf_counter_ns() - started) / 1e6
+    if response.status_code != 200:
+        return elapsed, len(body), f"HTTP error: {response.status_code}"
+    try:
+        data = response.json()
+    except ValueError:
+        return elapsed, len(body), f"invalid JSON response: {body[:80]!r}"
+    if 'errors' in data:
+        return elapsed, len(body), f"GraphQL errors: {data['errors']}"
+    return elapsed, len(body), ""
 
-def test_basic_queries():
-    """Test basic table queries."""
-    print("\n📋 Testing Basic Table Queries")
-    print("=" * 35)
+async def run_suites(client, suites=SUITES, concurrency=8, repeat=5):
+    """Run every query of every suite `repeat` times, at most `concurrency` at once; results in suite order."""
+    semaphore = asyncio.Semaphore(concurrency)
     
-    queries = [
-        ("{ users { id username email is_admin } }", "Users table access"),
-        ("{ tasks { id title status priority } }", "Tasks table access"), 
-        ("{ categories { id name color } }", "Categories table access"),
-        ("{ comments { id content created_at } }", "Comments table access"),
-        ("{ attachments { id filename file_size } }", "Attachments table access"),
-        ("{ task_history { id action created_at } }", "Task history table access"),
-        ("{ task_categories { task_id category_id } }", "Task categories junction table"),
-    ]
+    async def run(query):
+        async with semaphore:
+            return await run_graphql_query(client, query)
     
-    success_count = 0
-    for query, description in queries:
-        result = run_graphql_query(query, description)
-        if result:
-            success_count += 1
+    jobs = [(header, query, description)
+            for header, _, queries in suites for query, description in queries]
+    outcomes = await asyncio.gather(*(run(query) for _ in range(repeat) for _, query, _ in jobs))
     
-    print(f"\n📊 Basic queries: {success_count}/{len(queries)} successful")
-    return success_count == len(queries)
+    runs = defaultdict(list)
+    for index, outcome in enumerate(outcomes):
+        runs[index % len(jobs)].append(outcome)
+    results = []
+    for index, (header, _, description) in enumerate(jobs):
+        samples = runs[index]
+        errors = [error for _, _, error in samples if error]
+        results.append(QueryResult(header, description, len(samples), len(errors), errors[0] if errors else "",
+                                   summarize_ms(ms for ms, _, _ in samples), max(size for _, size, _ in samples)))
+    return results
 
-def test_relationship_queries():
-    """Test relationship queries."""
-    print("\n🔗 Testing Relationship Queries")
-    print("=" * 32)
-    
-    queries = [
-        ("""{ 
-            users { 
-                username 
-                assigned_tasks { title status }
-                created_tasks { title }
-                comments { content }
-            } 
-        }""", "Users with tasks and comments relationships"),
-        
-        ("""{ 
-            tasks { 
-                title 
-                assigned_user { username first_name }
-                creator { username }
-                comments { content user { username } }
-                attachments { filename }
-                history { action user { username } }
-            } 
-        }""", "Tasks with all related data"),
-        
-        ("""{ 
-            categories { 
-                name 
-                creator { username }
-                task_categories { task { title assigned_user { username } } }
-            } 
-        }""", "Categories with tasks through junction table"),
-        
-        ("""{ 
-            comments { 
-                content 
-                task { title }
-                user { username }
-            } 
-        }""", "Comments with task and user relationships"),
-    ]
-    
-    success_count = 0
-    for query, description in queries:
-        result = run_graphql_query(query, description)
-        if result:
-            success_count += 1
-    
-    print(f"\n📊 Relationship queries: {success_count}/{len(queries)} successful")
-    return success_count == len(queries)
+def print_results(results, suites=SUITES):
+    """Print each suite's queries with latency and size; returns {summary label: all passed}."""
+    summary = {}
+    for header, label, _ in suites:
+        suite_results = [r for r in results if r.suite == header]
+        print(f"\n{header}")
+        print("=" * 35)
+        print(f"  {'':<2} {'Query':<46} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'bytes':>9}")
+        for r in suite_results:
+            print(f"  {'✅' if r.passed else '❌'} {r.description:<46} {r.latency.p50_ms:>8.2f} "
+                  f"{r.latency.p95_ms:>8.2f} {r.latency.p99_ms:>8.2f} {r.size_bytes:>9,}")
+            if not r.passed:
+                print(f"     {r.failures}/{r.runs} runs failed, first: {r.error}")
+        passed = sum(r.passed for r in suite_results)
+        print(f"\n📊 {label}: {passed}/{len(suite_results)} successful")
+        summary[label] = passed == len(suite_results)
+    return summary
 
-def test_complex_queries():
-    """Test complex queries with filtering and aggregation."""
-    print("\n🎯 Testing Complex Queries")
-    print("=" * 27)
-    
-    queries = [
-        ("""{ 
-            users(where: {is_admin: {_eq: true}}) { 
-                username 
-                assigned_tasks_aggregate { 
-                    aggregate { count }
-                }
-            } 
-        }""", "Filter users by admin status with aggregation"),
-        
-        ("""{ 
-            tasks(where: {status: {_eq: "in_progress"}}) { 
-                title 
-                priority 
-                assigned_user { username }
-                comments_aggregate { 
-                    aggregate { count }
-                }
-            } 
-        }""", "Filter tasks by status with comment count"),
-        
-        ("""{ 
-            categories(order_by: {name: asc}) { 
-                name 
-                task_categories_aggregate { 
-                    aggregate { count }
-                }
-            } 
-        }""", "Ordered categories with task count"),
-        
-        ("""{ 
-            tasks(where: {priority: {_in: ["high", "urgent"]}}) { 
-                title 
-                priority 
-                due_date 
-                assigned_user { 
-                    username 
-                    assigned_tasks_aggregate { 
-                        aggregate { count }
-                    }
-                }
-            } 
-        }""", "High priority tasks with assignee workload"),
-    ]
-    
-    success_count = 0
-    for query, description in queries:
-        result = run_graphql_query(query, description)
-        if result:
-            success_count += 1
-    
-    print(f"\n📊 Complex queries: {success_count}/{len(queries)} successful")
-    return success_count == len(queries)
+async def run_health_check(url=HASURA_URL, concurrency=8, repeat=5, timeout=10.0):
+    """Connectivity, then the query suites; returns (connected, results, seconds for the suites)."""
+    async with create_client(url, concurrency, timeout) as client:
+        if not await check_connection(client):
+            return False, [], 0.0
+        started = time.perf_counter()
+        results = await run_suites(client, concurrency=concurrency, repeat=repeat)
+        return True, results, time.perf_counter() - started
 
 def test_mutations():
     """Test basic mutation operations."""
@@ -269,25 +309,36 @@ def print_sample_queries():
         print(f"\n💡 {description}")
         print(f"   {query}")
 
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
 def main():
     """Run comprehensive GraphQL health check."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=HASURA_URL, help="Hasura base URL")
+    parser.add_argument("--concurrency", type=positive_int, default=8, help="requests in flight on the shared client")
+    parser.add_argument("--repeat", type=positive_int, default=5, help="runs of each query")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds per request")
+    args = parser.parse_args()
+
     print("🎯 Hasura GraphQL Health Check")
     print("==============================")
     print(f"🕐 Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    # Test connectivity
-    if not test_hasura_connection():
-        print("\n❌ Cannot connect to Hasura. Check if it's running on port 8080.")
+    connected, results, seconds = asyncio.run(run_health_check(args.url, args.concurrency, args.repeat, args.timeout))
+    if not connected:
+        print(f"\n❌ Cannot connect to Hasura. Check if it's running at {args.url}.")
         sys.exit(1)
     
-    # Test basic queries
-    basic_success = test_basic_queries()
-    
-    # Test relationships  
-    relationship_success = test_relationship_queries()
-    
-    # Test complex queries
-    complex_success = test_complex_queries()
+    # Query suites, run together
+    suites = print_results(results)
+    requests_sent = sum(r.runs for r in results)
+    print(f"\n⏱️  {requests_sent} requests in {seconds:.2f}s at concurrency {args.concurrency} "
+          f"→ {requests_sent / seconds:,.1f} requests/s")
     
     # Test mutations
     mutation_success = test_mutations()
@@ -295,13 +346,12 @@ def main():
     # Summary
     print("\n🎉 HEALTH CHECK SUMMARY")
     print("=" * 24)
-    print(f"✅ Hasura connectivity: {'PASS' if True else 'FAIL'}")
-    print(f"✅ Basic table access: {'PASS' if basic_success else 'FAIL'}")
-    print(f"✅ Relationship queries: {'PASS' if relationship_success else 'FAIL'}")
-    print(f"✅ Complex queries: {'PASS' if complex_success else 'FAIL'}")
+    print("✅ Hasura connectivity: PASS")
+    for label, success in suites.items():
+        print(f"{'✅' if success else '❌'} {label}: {'PASS' if success else 'FAIL'}")
     print(f"✅ Mutation support: {'PASS' if mutation_success else 'FAIL'}")
     
-    all_tests_passed = all([basic_success, relationship_success, complex_success, mutation_success])
+    all_tests_passed = all(suites.values()) and mutation_success
     
     if all_tests_passed:
         print("\n🎊 ALL TESTS PASSED!")
@@ -312,8 +362,8 @@ def main():
         
         print_sample_queries()
         
-        print(f"\n🌐 Access Hasura Console: {HASURA_URL}/console")
-        print(f"🔗 GraphQL Playground: {HASURA_URL}/v1/graphql")
+        print(f"\n🌐 Access Hasura Console: {args.url}/console")
+        print(f"🔗 GraphQL Playground: {args.url}/v1/graphql")
         
     else:
         print("\n❌ Some tests failed. Check Hasura configuration.")
@@ -0,0 +1,136 @@
+"""
+Maintenance job for the monthly task_history partitions (setup_database.HISTORY_PARTITIONING).
+Rollover creates the coming months' partitions, moves rows that landed in
+the default partition into their own, and drops partitions past the
+retention period. Compaction then rewrites closed partitions (months before
+the current one) so that old_values/new_values keep only the keys that
+changed. Unchanged keys are dropped from both sides. A partition that
+changed is rewritten with VACUUM FULL to give the space back, which locks
+that partition (not the table) while it runs. Already compacted rows are
+not touched again, so the job can run daily from cron.
+Connection settings come from the environment (see commons/database.py).
+Run: python history_maintenance.py [--ahead 3] [--keep-months 24] [--skip-compact]
+"""
+import argparse
+from datetime import datetime
+import sys
+
+from psycopg2 import sql
+from pydantic import BaseModel
+
+from commons.database import ConnectionPool, DatabaseConfig
+from commons.logger import sentry_logger as logger
+
+# Keys with the same value before and after the change are removed from both snapshots.
+COMPACT_SQL = """
+    UPDATE {partition} h
+    SET old_values = h.old_values - d.same, new_values = h.new_values - d.same
+    FROM (
+        SELECT id, created_at,
+               ARRAY(SELECT o.key FROM jsonb_each(old_values) o WHERE new_values -> o.key = o.value) AS same
+        FROM {partition}
+        WHERE jsonb_typeof(old_values) = 'object' AND jsonb_typeof(new_values) = 'object'
+    ) d
+    WHERE h.id = d.id AND h.created_at = d.created_at AND cardinality(d.same) > 0
+"""
+
+
+class Partition(BaseModel):
+    """A task_history partition; NULL bounds are MINVALUE (legacy) or the default partition."""
+
+    name: str
+    lower_bound: datetime | None
+    upper_bound: datetime | None
+    total_bytes: int
+
+
+class Compaction(BaseModel):
+    """Rows rewritten as diffs in one partition, and its size around the rewrite."""
+
+    partition: str
+    rows: int
+    bytes_before: int
+    bytes_after: int
+
+
+def partitions(conn) -> list[Partition]:
+    with conn, conn.cursor() as cursor:
+        cursor.execute("SELECT p.*, pg_total_relation_size(p.name::regclass) FROM task_history_partitions() p")
+        return [Partition(name=name, lower_bound=lower, upper_bound=upper, total_bytes=size)
+                for name, lower, upper, size in cursor.fetchall()]
+
+
+def rollover(conn, ahead: int = 3, keep_months: int = 24) -> list[str]:
+    """Create partitions `ahead` months out and drop those older than `keep_months`; returns what changed."""
+    with conn, conn.cursor() as cursor:
+        cursor.execute("SET LOCAL lock_timeout = '5s'")  # DROP TABLE of a partition locks task_history
+        cursor.execute("SELECT * FROM rollover_task_history(%s, %s)", (ahead, keep_months))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def compact_partition(conn, name: str) -> Compaction:
+    """Rewrite one partition's snapshots as diffs, then VACUUM FULL it if any row changed."""
+    partition = sql.Identifier(name)
+    with conn, conn.cursor() as cursor:
+        cursor.execute("SELECT pg_total_relation_size(%s::regclass)", (name,))
+        bytes_before = cursor.fetchone()[0]
+        cursor.execute(sql.SQL(COMPACT_SQL).format(partition=partition))
+        rows = cursor.rowcount
+    if rows:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL("VACUUM (FULL, ANALYZE) {}").format(partition))
+        finally:
+            conn.autocommit = False
+    with conn, conn.cursor() as cursor:
+        cursor.execute("SELECT pg_total_relation_size(%s::regclass)", (name,))
+        bytes_after = cursor.fetchone()[0]
+    return Compaction(partition=name, rows=rows, bytes_before=bytes_before, bytes_after=bytes_after)
+
+
+def compact(conn) -> list[Compaction]:
+    """Compact every closed partition: those ending at or before the start of the current month."""
+    with conn, conn.cursor() as cursor:
+        cursor.execute("SELECT date_trunc('month', LOCALTIMESTAMP)")
+        this_month = cursor.fetchone()[0]
+    return [compact_partition(conn, p.name) for p in partitions(conn)
+            if p.upper_bound is not None and p.upper_bound <= this_month]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ahead", type=int, default=3, help="months of partitions to create ahead of time")
+    parser.add_argument("--keep-months", type=int, default=24, help="retention: older partitions are dropped")
+    parser.add_argument("--skip-compact", action="store_true", help="only roll partitions over")
+    args = parser.parse_args()
+
+    pool = ConnectionPool(DatabaseConfig.from_env(min_size=0, max_size=1))
+    try:
+        conn = pool.getconn()
+    except Exception as exc:
+        logger.error(f"❌ Database connection failed: {exc}")
+        sys.exit(1)
+    try:
+        changes = rollover(conn, args.ahead, args.keep_months)
+        for change in changes:
+            logger.info(f"🗂️ {change}")
+        if not changes:
+            logger.info(f"✅ Partitions cover the next {args.ahead} months, nothing past {args.keep_months} months")
+        if not args.skip_compact:
+            for result in compact(conn):
+                if result.rows:
+                    logger.info(f"🗜️ {result.partition}: {result.rows:,} rows compacted, "
+                                f"{result.bytes_before / 2**20:,.1f} → {result.bytes_after / 2**20:,.1f} MiB")
+        for partition in partitions(conn):
+            logger.info(f"  {partition.name:<24} {partition.total_bytes / 2**20:>10,.1f} MiB")
+    except Exception as exc:
+        logger.error(f"❌ History maintenance failed: {exc}")
+        sys.exit(1)
+    finally:
+        pool.putconn(conn)
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""
+Index advisor for the known query workload (commons/workload.py WORKLOAD):
+the health check's performance query and the demo_queries.py reports.
+Each query runs under EXPLAIN (ANALYZE, BUFFERS). The plans are read for
+equality filters, join keys and the columns each table has to supply, and
+these become composite, partial and covering index candidates. Each
+candidate is built inside a transaction, the queries that touch its table
+are measured again, and the transaction is rolled back. The reported gains
+are therefore measured, not estimated by the planner. The trial build holds
+a SHARE lock on the table, which blocks writes, so run it against a copy or
+off-peak. With --apply the recommended indexes are built CONCURRENTLY and
+the whole workload is measured again.
+Connection settings come from the environment (see commons/database.py).
+Run: python index_advisor.py [--apply] [--repeat 3] [--min-gain 10]
+"""
+import argparse
+import hashlib
+import re
+import statistics
+import sys
+import time
+
+from pydantic import BaseModel
+
+from commons.database import ConnectionPool, DatabaseConfig
+from commons.logger import sentry_logger as logger
+from commons.workload import WORKLOAD
+import setup_database
+
+MAX_INCLUDE = 4  # wider covering indexes cost more to maintain than they save
+SCAN_NODES = {"Seq Scan", "Index Scan", "Index Only Scan", "Bitmap Heap Scan", "Bitmap Index Scan"}
+
+_COLUMN_REF = re.compile(r"\b([a-z_][a-z0-9_]*)\.([a-z_][a-z0-9_]*)\b")
+# "((t.status)::text = 'pending'::text)" or "(t.done = true)"
+_EQUALITY = re.compile(r"\(?\b([a-z_][a-z0-9_]*)\.([a-z_][a-z0-9_]*)\)?(?:::[a-z ]+)? = ('(?:[^']|'')*'|true|false|\d+)")
+
+
+class Measurement(BaseModel):
+    """Median execution time of a query and the buffers its last run touched."""
+
+    name: str
+    execution_ms: float
+    shared_hit: int
+    shared_read: int
+    tables: list[str]
+    indexes: list[str]
+
+
+class IndexCandidate(BaseModel):
+    """A proposed index and why it was proposed."""
+
+    kind: str  # composite | partial | covering
+    table: str
+    columns: list[str]
+    include: list[str] = []
+    where: str | None = None
+    reason: str
+
+    @property
+    def name(self) -> str:
+        parts = [self.table, *self.columns]
+        if self.include:
+            parts.extend(["incl", *self.include])
+        if self.where:
+            parts.extend(re.findall(r"[a-z0-9]+", self.where.lower()))
+        name = "idx_" + "_".join(parts)
+        if len(name) > 63:  # Postgres truncates identifiers; keep long names distinct
+            name = f"{name[:54]}_{hashlib.md5(name.encode()).hexdigest()[:8]}"
+        return name
+
+    @property
+    def suffix(self) -> str:
+        """Everything after the key columns: INCLUDE and WHERE clauses."""
+        clauses = []
+        if self.include:
+            clauses.append(f"INCLUDE ({', '.join(self.include)})")
+        if self.where:
+            clauses.append(f"WHERE {self.where}")
+        return " ".join(clauses)
+
+    @property
+    def entry(self) -> tuple:
+        """The candidate as a setup_database.WORKLOAD_INDEXES entry."""
+        return (self.name, self.table, ", ".join(self.columns), self.suffix)
+
+    def sql(self, concurrently: bool = False) -> str:
+        return setup_database.index_sql(*self.entry, concurrently=concurrently)
+
+
+class CandidateResult(BaseModel):
+    """Timings of the queries that use a candidate index, with and without it."""
+
+    candidate: IndexCandidate
+    before_ms: dict[str, float]
+    after_ms: dict[str, float]
+    size_bytes: int
+    build_ms: float
+
+    @property
+    def gain_ms(self) -> float:
+        return sum(self.before_ms.values()) - sum(self.after_ms.values())
+
+    @property
+    def gain_pct(self) -> float:
+        before = sum(self.before_ms.values())
+        return 100 * self.gain_ms / before if before else 0.0
+
+    def improved(self, min_gain_pct: float) -> set[str]:
+        """Queries at least `min_gain_pct` faster with the index."""
+        return {name for name, before in self.before_ms.items()
+                if before and 100 * (before - self.after_ms[name]) / before >= min_gain_pct}
+
+
+def explain(cursor, query: str) -> dict:
+    """EXPLAIN (ANALYZE, BUFFERS, VERBOSE) result as a dict; the query is executed."""
+    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, VERBOSE, TIMING OFF, FORMAT JSON) {query}")
+    return cursor.fetchone()[0][0]
+
+
+def _nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def measure(cursor, workload: list[tuple[str, str]], repeat: int = 3) -> dict[str, Measurement]:
+    """Measure each query `repeat` times after a warm-up run; keeps the median."""
+    results = {}
+    for name, query in workload:
+        explain(cursor, query)
+        runs = [explain(cursor, query) for _ in range(repeat)]
+        plan = runs[-1]["Plan"]
+        results[name] = Measurement(
+            name=name,
+            execution_ms=statistics.median(run["Execution Time"] for run in runs),
+            shared_hit=plan.get("Shared Hit Blocks", 0),
+            shared_read=plan.get("Shared Read Blocks", 0),
+            tables=sorted({node["Relation Name"] for node in _nodes(plan) if "Relation Name" in node}),
+            indexes=sorted({node["Index Name"] for node in _nodes(plan) if "Index Name" in node}),
+        )
+    return results
+
+
+def _n_distinct(cursor, table: str) -> dict[str, float]:
+    """Estimated distinct values per column, from pg_stats."""
+    cursor.execute(
+        "SELECT s.attname, CASE WHEN s.n_distinct < 0 THEN -s.n_distinct * GREATEST(c.reltuples, 1) "
+        "ELSE s.n_distinct END FROM pg_stats s JOIN pg_class c ON c.oid = to_regclass(s.tablename) "
+        "WHERE s.schemaname = current_schema() AND s.tablename = %s",
+        (table,),
+    )
+    return dict(cursor.fetchall())
+
+
+def _table_facts(plan: dict) -> dict[str, dict]:
+    """Per alias: table, equality filters {column: constant}, join columns, columns used above the scan."""
+    facts: dict[str, dict] = {}
+    for node in _nodes(plan):
+        if node["Node Type"] in SCAN_NODES and "Alias" in node and "Relation Name" in node:
+            facts.setdefault(node["Alias"], {"table": node["Relation Name"], "equal": {}, "join": set(),
+                                             "used": set(), "seq_scan": False})
+            facts[node["Alias"]]["seq_scan"] |= node["Node Type"] == "Seq Scan"
+    for node in _nodes(plan):
+        for key in ("Filter", "Index Cond", "Recheck Cond"):
+            for alias, column, constant in _EQUALITY.findall(node.get(key, "")):
+                if alias in facts:
+                    facts[alias]["equal"][column] = constant
+        for key in ("Hash Cond", "Merge Cond", "Join Filter"):
+            for alias, column in _COLUMN_REF.findall(node.get(key, "")):
+                if alias in facts:
+                    facts[alias]["join"].add(column)
+        # A scan's own Output can be the whole row; what its parents reference is what is needed.
+        texts = [] if node["Node Type"] in SCAN_NODES else node.get("Output", [])
+        texts = [*texts, *node.get("Group Key", []), *node.get("Sort Key", []),
+                 *(node.get(key, "") for key in ("Hash Cond", "Merge Cond", "Join Filter", "Filter"))]
+        for text in texts:
+            for alias, column in _COLUMN_REF.findall(text):
+                if alias in facts:
+                    facts[alias]["used"].add(column)
+    return facts
+
+
+def propose(cursor, plans: dict[str, dict]) -> list[IndexCandidate]:
+    """Composite, partial and covering candidates from the workload plans (deduplicated)."""
+    candidates: dict[str, IndexCandidate] = {}
+
+    def add(candidate: IndexCandidate) -> None:
+        candidates.setdefault(candidate.sql(), candidate)
+
+    for query_name, plan in plans.items():
+        for fact in _table_facts(plan).values():
+            table, equal, join, used = fact["table"], fact["equal"], fact["join"], fact["used"]
+            distinct = _n_distinct(cursor, table)
+            # Most selective column first.
+            keys = sorted(equal, key=lambda column: -distinct.get(column, 0))
+            if len(keys) >= 2:
+                add(IndexCandidate(kind="composite", table=table, columns=keys,
+                                   reason=f"{query_name}: equality filter on {', '.join(keys)}"))
+            if keys:
+                extra = sorted(used - set(keys))
+                if extra and len(extra) <= MAX_INCLUDE:
+                    add(IndexCandidate(kind="covering", table=table, columns=keys, include=extra,
+                                       reason=f"{query_name}: index-only scan for the filter"))
+                # Index the rest of the lookup under the least selective filter column's constant.
+                least = keys[-1]
+                partial_keys = keys[:-1] or sorted(join - {least}) or ["id"]
+                rest = sorted(used - set(partial_keys) - {least})
+                add(IndexCandidate(kind="partial", table=table, columns=partial_keys,
+                                   include=rest if len(rest) <= MAX_INCLUDE else [],
+                                   where=f"{least} = {equal[least]}",
+                                   reason=f"{query_name}: only rows with {least} = {equal[least]} are read"))
+            elif join and fact["seq_scan"]:
+                key = sorted(join)
+                extra = sorted(used - set(key))
+                if len(extra) <= MAX_INCLUDE:
+                    add(IndexCandidate(kind="covering", table=table, columns=key, include=extra,
+                                       reason=f"{query_name}: index-only scan for the join on {', '.join(key)}"))
+    return list(candidates.values())
+
+
+def trial(conn, candidate: IndexCandidate, workload: list[tuple[str, str]],
+          baseline: dict[str, Measurement], repeat: int = 3) -> CandidateResult | None:
+    """Build the candidate in a transaction, re-measure the queries on its table, roll back.
+
+    Only queries whose new plan uses the index are compared, and they are
+    measured again without it right afterwards, so timing noise elsewhere and
+    drift since the baseline do not count as gains.
+    Returns None when Postgres would not use an index built in the same transaction
+    (`indcheckxmin`, after recent updates); such a candidate cannot be measured this way.
+    """
+    affected = [(name, query) for name, query in workload if candidate.table in baseline[name].tables]
+    try:
+        with conn.cursor() as cursor:
+            started = time.perf_counter()
+            cursor.execute(candidate.sql())
+            build_ms = (time.perf_counter() - started) * 1000
+            cursor.execute(
+                "SELECT i.indcheckxmin, pg_relation_size(i.indexrelid) FROM pg_index i "
+                "WHERE i.indexrelid = to_regclass(%s)", (candidate.name,)
+            )
+            row = cursor.fetchone()
+            if row is None or row[0]:
+                return None
+            after = measure(cursor, affected, repeat)
+    finally:
+        conn.rollback()
+    used = [(name, query) for name, query in affected if candidate.name in after[name].indexes]
+    # Measure the same queries again without the index, so drift since the baseline cancels out.
+    with conn.cursor() as cursor:
+        before = measure(cursor, used, repeat)
+    conn.rollback()
+    return CandidateResult(
+        candidate=candidate,
+        before_ms={name: before[name].execution_ms for name, _ in used},
+        after_ms={name: after[name].execution_ms for name, _ in used},
+        size_bytes=row[1],
+        build_ms=build_ms,
+    )
+
+
+def recommend(results: list[CandidateResult], min_gain_pct: float = 10.0) -> list[CandidateResult]:
+    """Greedy pick by total gain; a candidate must speed up a query no better pick already has."""
+    chosen, covered = [], set()
+    for result in sorted(results, key=lambda r: r.gain_ms, reverse=True):
+        improved = result.improved(min_gain_pct)
+        if result.gain_pct >= min_gain_pct and improved - covered:
+            chosen.append(result)
+            covered |= improved
+    return chosen
+
+
+def apply(conn, candidates: list[IndexCandidate]) -> None:
+    """Build indexes CONCURRENTLY (writes continue) and refresh the tables' statistics."""
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            for candidate in candidates:
+                started = time.perf_counter()
+                cursor.execute(candidate.sql(concurrently=True))
+                logger.info(f"🔨 {candidate.name} built in {(time.perf_counter() - started) * 1000:,.0f} ms")
+            for table in sorted({candidate.table for candidate in candidates}):
+                cursor.execute(f"ANALYZE {table}")
+    finally:
+        conn.autocommit = False
+
+
+def prepare(conn, workload: list[tuple[str, str]]) -> None:
+    """VACUUM ANALYZE the workload tables, so statistics and visibility maps are current."""
+    with conn.cursor() as cursor:
+        tables = sorted({table for query in measure(cursor, workload, repeat=1).values() for table in query.tables})
+    conn.rollback()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            for table in tables:
+                cursor.execute(f"VACUUM (ANALYZE) {table}")
+    finally:
+        conn.autocommit = False
+
+
+def _report_baseline(baseline: dict[str, Measurement]) -> None:
+    for result in baseline.values():
+        logger.info(f"  {result.name:<36} {result.execution_ms:>10.2f} ms  "
+                    f"buffers hit={result.shared_hit:,} read={result.shared_read:,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apply", action="store_true", help="build the recommended indexes and re-measure")
+    parser.add_argument("--repeat", type=int, default=3, help="measured runs per query (median is kept)")
+    parser.add_argument("--min-gain", type=float, default=10.0, help="minimum gain in percent to recommend")
+    parser.add_argument("--skip-vacuum", action="store_true", help="do not VACUUM ANALYZE the tables first")
+    args = parser.parse_args()
+
+    pool = ConnectionPool(DatabaseConfig.from_env(min_size=0, max_size=1))
+    try:
+        conn = pool.getconn()
+    except Exception as exc:
+        logger.error(f"❌ Database connection failed: {exc}")
+        sys.exit(1)
+    try:
+        if not args.skip_vacuum:
+            prepare(conn, WORKLOAD)
+        with conn.cursor() as cursor:
+            baseline = measure(cursor, WORKLOAD, args.repeat)
+            plans = {name: explain(cursor, query)["Plan"] for name, query in WORKLOAD}
+            candidates = propose(cursor, plans)
+        conn.rollback()
+        logger.info("📏 Baseline:")
+        _report_baseline(baseline)
+
+        logger.info(f"🧪 Trying {len(candidates)} candidate indexes:")
+        results = []
+        for candidate in candidates:
+            result = trial(conn, candidate, WORKLOAD, baseline, args.repeat)
+            if result is None:
+                logger.warning(f"  {candidate.name}: not measurable in a transaction (recent updates), skipped")
+                continue
+            results.append(result)
+            logger.info(f"  {result.gain_pct:>6.1f}%  {result.gain_ms:>9.2f} ms  {result.size_bytes / 1024:>9,.0f} KiB  "
+                        f"[{candidate.kind}] {candidate.sql()}")
+
+        chosen = recommend(results, args.min_gain)
+        if not chosen:
+            logger.info("✅ No index speeds up the workload by the required margin")
+            return
+        logger.info("💡 Recommended:")
+        for result in chosen:
+            logger.info(f"  {result.candidate.sql()}  -- {result.candidate.reason}")
+            for name in sorted(result.improved(args.min_gain)):
+                logger.info(f"      {name}: {result.before_ms[name]:.2f} → {result.after_ms[name]:.2f} ms")
+        logger.info("📌 To keep them, add these setup_database.WORKLOAD_INDEXES entries and a migration:")
+        for result in chosen:
+            logger.info(f"  {result.candidate.entry!r},")
+        if args.apply:
+            apply(conn, [result.candidate for result in chosen])
+            with conn.cursor() as cursor:
+                after = measure(cursor, WORKLOAD, args.repeat)
+            conn.rollback()
+            logger.info("📏 After:")
+            for name, result in after.items():
+                before = baseline[name].execution_ms
+                logger.info(f"  {name:<36} {before:>10.2f} → {result.execution_ms:>10.2f} ms "
+                            f"({before / max(result.execution_ms, 1e-6):.1f}x)")
+    finally:
+        pool.putconn(conn)
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,768 @@
+"""
+Versioned schema migrations for the demo database.
+Each migration's SQL is frozen below as it shipped, so editing setup_database.py
+(which builds fresh databases) never changes a migration that already ran.
+Applied versions are recorded in `schema_migrations` (in the current schema), so
+each migration runs once. Each one runs in its own transaction, together with
+its bookkeeping row. The exception is index builds on tables larger than
+--concurrent-min-bytes: they use CREATE INDEX CONCURRENTLY outside a
+transaction, so writes to the table are not blocked during the build.
+Every step runs under --lock-timeout, so a migration blocked by a long-running
+transaction fails instead of queueing the application's queries behind it.
+Every step is idempotent, so a migration interrupted halfway can be run again.
+Connection settings come from the environment (see commons/database.py).
+Run: python migrate.py [--dry-run] [--target VERSION] [--concurrent-min-bytes 10485760]
+"""
+import argparse
+from collections.abc import Callable
+import sys
+import time
+from typing import NamedTuple
+
+from pydantic import BaseModel, Field
+
+from commons.database import ConnectionPool, DatabaseConfig
+from commons.logger import sentry_logger as logger
+
+
+class MigrationOptions(BaseModel):
+    """How migrations are planned and applied."""
+
+    concurrent_min_bytes: int = Field(10 * 1024 * 1024, ge=0)  # tables at least this big get CONCURRENTLY index builds
+    lock_timeout: str = "5s"  # give up instead of queueing other sessions behind a blocked DDL lock
+
+
+class Step(NamedTuple):
+    sql: str
+    transactional: bool = True  # False: run in autocommit (CREATE/DROP INDEX CONCURRENTLY)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    plan: Callable  # (cursor, MigrationOptions) -> list[Step], planned just before it runs
+
+
+# The SQL of each migration, frozen as it shipped. setup_database.py builds fresh
+# databases and may change; a change to its lists needs a new migration here instead.
+
+# Migration 1: the tables as setup_database.py first created them.
+BASELINE_SCHEMA = [
+    'CREATE EXTENSION IF NOT EXISTS "uuid-ossp";',
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+        username VARCHAR(50) UNIQUE NOT NULL,
+        email VARCHAR(255) UNIQUE NOT NULL,
+        password_hash VARCHAR(255) NOT NULL,
+        first_name VARCHAR(100),
+        last_name VARCHAR(100),
+        is_active BOOLEAN DEFAULT TRUE,
+        is_admin BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_login TIMESTAMP
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS categories (
+        id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+        name VARCHAR(100) UNIQUE NOT NULL,
+        description TEXT,
+        color VARCHAR(7) NOT NULL,
+        created_by UUID REFERENCES users(id) ON DELETE SET NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+        title VARCHAR(255) NOT NULL,
+        description TEXT,
+        status VARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'in_progress', 'completed', 'cancelled')),
+        priority VARCHAR(20) DEFAULT 'medium' CHECK (priority IN ('low', 'medium', 'high', 'urgent')),
+        due_date TIMESTAMP,
+        completed_at TIMESTAMP,
+        estimated_hours DECIMAL(5,2),
+        actual_hours DECIMAL(5,2),
+        assigned_to UUID REFERENCES users(id) ON DELETE SET NULL,
+        created_by UUID REFERENCES users(id) ON DELETE SET NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS task_categories (
+        task_id UUID REFERENCES tasks(id) ON DELETE CASCADE,
+        category_id UUID REFERENCES categories(id) ON DELETE CASCADE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (task_id, category_id)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS comments (
+        id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+        task_id UUID REFERENCES tasks(id) ON DELETE CASCADE,
+        user_id UUID REFERENCES users(id) ON DELETE SET NULL,
+        content TEXT NOT NULL,
+        is_internal BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS attachments (
+        id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+        task_id UUID REFERENCES tasks(id) ON DELETE CASCADE,
+        uploaded_by UUID REFERENCES users(id) ON DELETE SET NULL,
+        filename VARCHAR(255) NOT NULL,
+        file_size INTEGER,
+        mime_type VARCHAR(100),
+        file_path VARCHAR(500),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS task_history (
+        id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+        task_id UUID REFERENCES tasks(id) ON DELETE CASCADE,
+        user_id UUID REFERENCES users(id) ON DELETE SET NULL,
+        action VARCHAR(50) NOT NULL,
+        old_values JSONB,
+        new_values JSONB,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+]
+
+# Migration 3: (name, table, columns) of the performance indexes.
+PERFORMANCE_INDEXES = [
+    ('idx_users_username', 'users', 'username'),
+    ('idx_users_email', 'users', 'email'),
+    ('idx_users_active', 'users', 'is_active'),
+    ('idx_tasks_status', 'tasks', 'status'),
+    ('idx_tasks_priority', 'tasks', 'priority'),
+    ('idx_tasks_assigned_to', 'tasks', 'assigned_to'),
+    ('idx_tasks_created_by', 'tasks', 'created_by'),
+    ('idx_tasks_due_date', 'tasks', 'due_date'),
+    ('idx_comments_task_id', 'comments', 'task_id'),
+    ('idx_comments_user_id', 'comments', 'user_id'),
+    ('idx_attachments_task_id', 'attachments', 'task_id'),
+    ('idx_task_history_task_id', 'task_history', 'task_id'),
+]
+
+# Migration 4: updated_at maintenance for users, categories, tasks and comments.
+UPDATED_AT_TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION update_updated_at_column()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        NEW.updated_at = CURRENT_TIMESTAMP;
+        RETURN NEW;
+    END;
+    $$ language 'plpgsql';
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trigger_update_users_updated_at
+    BEFORE UPDATE ON users
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trigger_update_categories_updated_at
+    BEFORE UPDATE ON categories
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trigger_update_tasks_updated_at
+    BEFORE UPDATE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trigger_update_comments_updated_at
+    BEFORE UPDATE ON comments
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+    """,
+]
+
+# Migration 5: (name, table, columns, suffix) from index_advisor.py.
+WORKLOAD_INDEXES = [
+    ('idx_tasks_status_priority_covering', 'tasks', 'status, priority', 'INCLUDE (assigned_to, id, title)'),
+]
+
+# Migration 6: rollup tables, their statement-level triggers, then the backfill.
+REPORT_ROLLUPS = [
+    """
+    CREATE TABLE IF NOT EXISTS user_status_counts (
+        user_id UUID NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        task_count BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, status)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS task_commenters (
+        task_id UUID NOT NULL,
+        user_id UUID NOT NULL,
+        comment_count BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (task_id, user_id)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS task_comment_stats (
+        task_id UUID PRIMARY KEY,
+        comment_count BIGINT NOT NULL DEFAULT 0,
+        unique_commenters INTEGER NOT NULL DEFAULT 0,
+        last_comment_at TIMESTAMP
+    );
+    """,
+    """
+    CREATE OR REPLACE FUNCTION rollup_tasks_insert()
+    RETURNS TRIGGER AS $$
+    BEGIN
+
+        INSERT INTO user_status_counts AS c (user_id, status, task_count)
+        SELECT assigned_to, status, sum(n) FROM (SELECT assigned_to, status, 1 AS n FROM new_rows) d
+        WHERE assigned_to IS NOT NULL
+        GROUP BY assigned_to, status HAVING sum(n) <> 0
+        ON CONFLICT (user_id, status) DO UPDATE SET task_count = c.task_count + EXCLUDED.task_count;
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION rollup_tasks_update()
+    RETURNS TRIGGER AS $$
+    BEGIN
+
+        INSERT INTO user_status_counts AS c (user_id, status, task_count)
+        SELECT assigned_to, status, sum(n) FROM (SELECT assigned_to, status, 1 AS n FROM new_rows UNION ALL SELECT assigned_to, status, -1 FROM old_rows) d
+        WHERE assigned_to IS NOT NULL
+        GROUP BY assigned_to, status HAVING sum(n) <> 0
+        ON CONFLICT (user_id, status) DO UPDATE SET task_count = c.task_count + EXCLUDED.task_count;
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION rollup_tasks_delete()
+    RETURNS TRIGGER AS $$
+    BEGIN
+
+        INSERT INTO user_status_counts AS c (user_id, status, task_count)
+        SELECT assigned_to, status, sum(n) FROM (SELECT assigned_to, status, -1 AS n FROM old_rows) d
+        WHERE assigned_to IS NOT NULL
+        GROUP BY assigned_to, status HAVING sum(n) <> 0
+        ON CONFLICT (user_id, status) DO UPDATE SET task_count = c.task_count + EXCLUDED.task_count;
+        -- Comment rollups of deleted tasks
+        DELETE FROM task_comment_stats WHERE task_id IN (SELECT id FROM old_rows);
+        DELETE FROM task_commenters WHERE task_id IN (SELECT id FROM old_rows);
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION rollup_comments_insert()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        affected UUID[];
+    BEGIN
+
+        WITH d AS (
+            SELECT task_id, user_id, created_at, sum(n) AS n FROM (SELECT task_id, user_id, created_at, 1 AS n FROM new_rows) raw
+            WHERE EXISTS (SELECT 1 FROM tasks t WHERE t.id = raw.task_id)  -- not cascading from a task delete
+            GROUP BY task_id, user_id, created_at HAVING sum(n) <> 0
+        ), commenters AS (
+            INSERT INTO task_commenters AS c (task_id, user_id, comment_count)
+            SELECT task_id, user_id, sum(n) FROM d WHERE user_id IS NOT NULL GROUP BY task_id, user_id
+            ON CONFLICT (task_id, user_id) DO UPDATE SET comment_count = c.comment_count + EXCLUDED.comment_count
+        ), stats AS (
+            INSERT INTO task_comment_stats AS s (task_id, comment_count, last_comment_at)
+            SELECT task_id, sum(n), max(created_at) FILTER (WHERE n > 0) FROM d GROUP BY task_id
+            ON CONFLICT (task_id) DO UPDATE SET
+                comment_count = s.comment_count + EXCLUDED.comment_count,
+                last_comment_at = GREATEST(s.last_comment_at, EXCLUDED.last_comment_at)
+            RETURNING task_id
+        )
+        SELECT array_agg(task_id) INTO affected FROM stats;
+        -- Needs the commenter counts written above; removed comments may have been the latest
+        UPDATE task_comment_stats s SET
+            unique_commenters = (SELECT count(*) FROM task_commenters c WHERE c.task_id = s.task_id AND c.comment_count > 0),
+            last_comment_at = CASE WHEN TG_OP = 'INSERT' THEN s.last_comment_at
+                                   ELSE (SELECT max(created_at) FROM comments c WHERE c.task_id = s.task_id) END
+        WHERE s.task_id = ANY(affected);
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION rollup_comments_update()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        affected UUID[];
+    BEGIN
+
+        WITH d AS (
+            SELECT task_id, user_id, created_at, sum(n) AS n FROM (SELECT task_id, user_id, created_at, 1 AS n FROM new_rows UNION ALL SELECT task_id, user_id, created_at, -1 FROM old_rows) raw
+            WHERE EXISTS (SELECT 1 FROM tasks t WHERE t.id = raw.task_id)  -- not cascading from a task delete
+            GROUP BY task_id, user_id, created_at HAVING sum(n) <> 0
+        ), commenters AS (
+            INSERT INTO task_commenters AS c (task_id, user_id, comment_count)
+            SELECT task_id, user_id, sum(n) FROM d WHERE user_id IS NOT NULL GROUP BY task_id, user_id
+            ON CONFLICT (task_id, user_id) DO UPDATE SET comment_count = c.comment_count + EXCLUDED.comment_count
+        ), stats AS (
+            INSERT INTO task_comment_stats AS s (task_id, comment_count, last_comment_at)
+            SELECT task_id, sum(n), max(created_at) FILTER (WHERE n > 0) FROM d GROUP BY task_id
+            ON CONFLICT (task_id) DO UPDATE SET
+                comment_count = s.comment_count + EXCLUDED.comment_count,
+                last_comment_at = GREATEST(s.last_comment_at, EXCLUDED.last_comment_at)
+            RETURNING task_id
+        )
+        SELECT array_agg(task_id) INTO affected FROM stats;
+        -- Needs the commenter counts written above; removed comments may have been the latest
+        UPDATE task_comment_stats s SET
+            unique_commenters = (SELECT count(*) FROM task_commenters c WHERE c.task_id = s.task_id AND c.comment_count > 0),
+            last_comment_at = CASE WHEN TG_OP = 'INSERT' THEN s.last_comment_at
+                                   ELSE (SELECT max(created_at) FROM comments c WHERE c.task_id = s.task_id) END
+        WHERE s.task_id = ANY(affected);
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION rollup_comments_delete()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        affected UUID[];
+    BEGIN
+
+        WITH d AS (
+            SELECT task_id, user_id, created_at, sum(n) AS n FROM (SELECT task_id, user_id, created_at, -1 AS n FROM old_rows) raw
+            WHERE EXISTS (SELECT 1 FROM tasks t WHERE t.id = raw.task_id)  -- not cascading from a task delete
+            GROUP BY task_id, user_id, created_at HAVING sum(n) <> 0
+        ), commenters AS (
+            INSERT INTO task_commenters AS c (task_id, user_id, comment_count)
+            SELECT task_id, user_id, sum(n) FROM d WHERE user_id IS NOT NULL GROUP BY task_id, user_id
+            ON CONFLICT (task_id, user_id) DO UPDATE SET comment_count = c.comment_count + EXCLUDED.comment_count
+        ), stats AS (
+            INSERT INTO task_comment_stats AS s (task_id, comment_count, last_comment_at)
+            SELECT task_id, sum(n), max(created_at) FILTER (WHERE n > 0) FROM d GROUP BY task_id
+            ON CONFLICT (task_id) DO UPDATE SET
+                comment_count = s.comment_count + EXCLUDED.comment_count,
+                last_comment_at = GREATEST(s.last_comment_at, EXCLUDED.last_comment_at)
+            RETURNING task_id
+        )
+        SELECT array_agg(task_id) INTO affected FROM stats;
+        -- Needs the commenter counts written above; removed comments may have been the latest
+        UPDATE task_comment_stats s SET
+            unique_commenters = (SELECT count(*) FROM task_commenters c WHERE c.task_id = s.task_id AND c.comment_count > 0),
+            last_comment_at = CASE WHEN TG_OP = 'INSERT' THEN s.last_comment_at
+                                   ELSE (SELECT max(created_at) FROM comments c WHERE c.task_id = s.task_id) END
+        WHERE s.task_id = ANY(affected);
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE TRIGGER rollup_tasks_insert
+    AFTER INSERT ON tasks
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_tasks_insert();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER rollup_tasks_update
+    AFTER UPDATE ON tasks
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_tasks_update();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER rollup_tasks_delete
+    AFTER DELETE ON tasks
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_tasks_delete();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER rollup_comments_insert
+    AFTER INSERT ON comments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_comments_insert();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER rollup_comments_update
+    AFTER UPDATE ON comments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_comments_update();
+    """,
+    """
+    CREATE OR REPLACE TRIGGER rollup_comments_delete
+    AFTER DELETE ON comments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_comments_delete();
+    """,
+    """
+    CREATE OR REPLACE FUNCTION refresh_rollups()
+    RETURNS VOID AS $$
+    BEGIN
+        -- Writers wait until commit, so no change falls between the rebuild and the triggers
+        LOCK TABLE tasks, comments IN SHARE MODE;
+        TRUNCATE user_status_counts, task_commenters, task_comment_stats;
+        INSERT INTO user_status_counts (user_id, status, task_count)
+        SELECT assigned_to, status, count(*) FROM tasks
+        WHERE assigned_to IS NOT NULL
+        GROUP BY assigned_to, status;
+        INSERT INTO task_commenters (task_id, user_id, comment_count)
+        SELECT task_id, user_id, count(*) FROM comments
+        WHERE task_id IS NOT NULL AND user_id IS NOT NULL
+        GROUP BY task_id, user_id;
+        INSERT INTO task_comment_stats (task_id, comment_count, unique_commenters, last_comment_at)
+        SELECT task_id, count(*), count(DISTINCT user_id), max(created_at) FROM comments
+        WHERE task_id IS NOT NULL
+        GROUP BY task_id;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    "SELECT refresh_rollups();",
+]
+
+# Migration 7: monthly task_history partitions, converting the existing table.
+PARTITIONED_TASK_HISTORY = [
+    """
+    CREATE OR REPLACE FUNCTION task_history_partitions()
+    RETURNS TABLE (name TEXT, lower_bound TIMESTAMP, upper_bound TIMESTAMP) AS $$
+        -- NULL bounds: MINVALUE below the first partition, both for the default partition
+        SELECT c.relname::TEXT,
+               (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'FROM \\(''([^'']+)''\\)'))[1]::TIMESTAMP,
+               (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \\(''([^'']+)''\\)'))[1]::TIMESTAMP
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'task_history'::regclass
+        ORDER BY 3 NULLS LAST;
+    $$ LANGUAGE sql STABLE;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION create_task_history_partition(month TIMESTAMP)
+    RETURNS TEXT AS $$
+    DECLARE
+        month_start TIMESTAMP := date_trunc('month', month);
+        month_end TIMESTAMP := date_trunc('month', month) + INTERVAL '1 month';
+        name TEXT := to_char(date_trunc('month', month), '"task_history_y"YYYY"m"MM');
+    BEGIN
+        IF EXISTS (SELECT 1 FROM task_history_partitions() p
+                   WHERE p.upper_bound > month_start AND (p.lower_bound IS NULL OR p.lower_bound < month_end)) THEN
+            RETURN NULL;
+        END IF;
+        -- Built detached and attached: ATTACH only takes SHARE UPDATE EXCLUSIVE on task_history
+        EXECUTE format('CREATE TABLE %I (LIKE task_history INCLUDING DEFAULTS)', name);
+        IF to_regclass('task_history_default') IS NOT NULL THEN
+            EXECUTE format('WITH moved AS (DELETE FROM task_history_default WHERE created_at >= $1 AND created_at < $2 RETURNING *) '
+                           'INSERT INTO %I SELECT * FROM moved', name) USING month_start, month_end;
+        END IF;
+        EXECUTE format('ALTER TABLE task_history ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                       name, month_start, month_end);
+        RETURN name;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION rollover_task_history(ahead INTEGER DEFAULT 3, keep_months INTEGER DEFAULT 24)
+    RETURNS SETOF TEXT AS $$
+    DECLARE
+        this_month TIMESTAMP := date_trunc('month', LOCALTIMESTAMP);
+        cutoff TIMESTAMP := date_trunc('month', LOCALTIMESTAMP) - make_interval(months => keep_months);
+        month TIMESTAMP;
+        created TEXT;
+        expired RECORD;
+        deleted BIGINT;
+    BEGIN
+        -- This month and the next `ahead` ones, plus months that landed in the default partition
+        FOR month IN
+            SELECT generate_series(this_month, this_month + make_interval(months => ahead), INTERVAL '1 month')
+            UNION
+            SELECT DISTINCT date_trunc('month', created_at) FROM task_history_default WHERE created_at >= cutoff
+            ORDER BY 1
+        LOOP
+            created := create_task_history_partition(month);
+            IF created IS NOT NULL THEN
+                RETURN NEXT 'created ' || created;
+            END IF;
+        END LOOP;
+        -- Retention: whole partitions are dropped, no row-by-row DELETE
+        FOR expired IN SELECT p.name FROM task_history_partitions() p WHERE p.upper_bound <= cutoff LOOP
+            EXECUTE format('DROP TABLE %I', expired.name);
+            RETURN NEXT 'dropped ' || expired.name;
+        END LOOP;
+        -- Older rows left can only be in the legacy or default partition
+        DELETE FROM task_history WHERE created_at < cutoff;
+        GET DIAGNOSTICS deleted = ROW_COUNT;
+        IF deleted > 0 THEN
+            RETURN NEXT format('deleted %s expired rows', deleted);
+        END IF;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION partition_task_history()
+    RETURNS VOID AS $$
+    DECLARE
+        legacy_end TIMESTAMP;
+        idx RECORD;
+        definitions TEXT[] := '{}';
+        definition TEXT;
+    BEGIN
+        IF (SELECT relkind FROM pg_class WHERE oid = 'task_history'::regclass) = 'p' THEN
+            RETURN;
+        END IF;
+        LOCK TABLE task_history IN ACCESS EXCLUSIVE MODE;
+        ALTER TABLE task_history RENAME TO task_history_legacy;
+        ALTER INDEX task_history_pkey RENAME TO task_history_legacy_pkey;
+        -- Secondary indexes are recreated on the parent under their own names
+        FOR idx IN SELECT c.relname, pg_get_indexdef(i.indexrelid) AS definition
+                   FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                   WHERE i.indrelid = 'task_history_legacy'::regclass AND NOT i.indisprimary LOOP
+            definitions := definitions || regexp_replace(idx.definition, ' ON \\S+ ', ' ON task_history ');
+            EXECUTE format('ALTER INDEX %I RENAME TO %I', idx.relname, left('legacy_' || idx.relname, 63));
+        END LOOP;
+        CREATE TABLE task_history (
+            id UUID NOT NULL DEFAULT uuid_generate_v4(),
+            task_id UUID CONSTRAINT task_history_task_id_fkey REFERENCES tasks(id) ON DELETE CASCADE,
+            user_id UUID CONSTRAINT task_history_user_id_fkey REFERENCES users(id) ON DELETE SET NULL,
+            action VARCHAR(50) NOT NULL,
+            old_values JSONB,
+            new_values JSONB,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+        CREATE INDEX idx_task_history_created_at_brin ON task_history USING brin (created_at);
+        IF EXISTS (SELECT 1 FROM task_history_legacy) THEN
+            -- Existing rows become one partition up to the end of their last month: no copy,
+            -- only scans to validate the new primary key, NOT NULL and partition bound
+            legacy_end := date_trunc('month', GREATEST(LOCALTIMESTAMP, (SELECT max(created_at) FROM task_history_legacy)))
+                           + INTERVAL '1 month';
+            -- Undated rows take their task's creation time (or now), so retention treats them like the rest
+            UPDATE task_history_legacy h
+            SET created_at = LEAST(COALESCE((SELECT t.created_at FROM tasks t WHERE t.id = h.task_id), LOCALTIMESTAMP),
+                                   LOCALTIMESTAMP)
+            WHERE created_at IS NULL;
+            ALTER TABLE task_history_legacy
+                ALTER COLUMN created_at SET NOT NULL,
+                DROP CONSTRAINT task_history_legacy_pkey,
+                ADD CONSTRAINT task_history_legacy_pkey PRIMARY KEY (id, created_at);
+            EXECUTE format('ALTER TABLE task_history ATTACH PARTITION task_history_legacy FOR VALUES FROM (MINVALUE) TO (%L)',
+                           legacy_end);
+        ELSE
+            DROP TABLE task_history_legacy;
+        END IF;
+        -- Matching indexes of the legacy partition are attached, not rebuilt
+        FOREACH definition IN ARRAY definitions LOOP
+            EXECUTE definition;
+        END LOOP;
+        CREATE TABLE task_history_default PARTITION OF task_history DEFAULT;
+        -- Partitions for this month and the next three; no retention here, that is
+        -- left to history_maintenance.py so that setup and migrate never delete rows
+        PERFORM create_task_history_partition(month)
+        FROM generate_series(date_trunc('month', LOCALTIMESTAMP), date_trunc('month', LOCALTIMESTAMP) + INTERVAL '3 months',
+                             INTERVAL '1 month') AS month;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    "SELECT partition_task_history();",
+]
+
+
+def _statements(*sql):
+    return lambda _cursor, _options: [Step(statement) for statement in sql]
+
+
+def index_sql(name, table, columns, suffix="", concurrently=False):
+    """CREATE INDEX statement for a (name, table, columns[, suffix]) entry."""
+    return f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name} ON {table}({columns}){' ' + suffix if suffix else ''};"
+
+
+def table_size(cursor, table):
+    """Total bytes of `table` with its indexes and TOAST, 0 if it does not exist yet."""
+    cursor.execute("SELECT COALESCE(pg_total_relation_size(to_regclass(%s)), 0)", (table,))
+    return cursor.fetchone()[0]
+
+
+def index_steps(cursor, options, indexes):
+    """Steps building (name, table, columns[, suffix]) indexes inline, or CONCURRENTLY on large tables.
+
+    A failed concurrent build leaves an INVALID index that IF NOT EXISTS would
+    skip, so one is dropped before it is rebuilt.
+    """
+    cursor.execute(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE NOT i.indisvalid AND c.relnamespace = current_schema()::regnamespace"
+    )
+    invalid = {row[0] for row in cursor.fetchall()}
+    steps = []
+    for name, table, columns, *suffix in indexes:
+        concurrently = table_size(cursor, table) >= options.concurrent_min_bytes
+        if name in invalid:
+            steps.append(Step(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {name};", not concurrently))
+        steps.append(Step(index_sql(name, table, columns, *suffix, concurrently=concurrently), not concurrently))
+    return steps
+
+
+# Append new migrations with the next version; never edit one that has shipped.
+MIGRATIONS = [
+    Migration(1, "baseline_schema", _statements(*BASELINE_SCHEMA)),
+    # Databases created before tasks.number existed (see backend/postgres.py).
+    Migration(2, "tasks_number", _statements("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS number BIGSERIAL UNIQUE NOT NULL;")),
+    Migration(3, "performance_indexes", lambda cursor, options: index_steps(cursor, options, PERFORMANCE_INDEXES)),
+    Migration(4, "updated_at_triggers", _statements(*UPDATED_AT_TRIGGERS)),
+    Migration(5, "workload_indexes", lambda cursor, options: index_steps(cursor, options, WORKLOAD_INDEXES)),
+    # Backfilled in the same transaction as the triggers, under a SHARE lock on tasks and comments.
+    Migration(6, "report_rollups", _statements(*REPORT_ROLLUPS)),
+    # Existing history is attached as one partition: no copy, but validation scans under an exclusive lock.
+    Migration(7, "partitioned_task_history", _statements(*PARTITIONED_TASK_HISTORY)),
+]
+
+
+def ensure_migrations_table(conn):
+    with conn, conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                duration_ms DOUBLE PRECISION NOT NULL
+            );
+        """)
+
+
+def applied_versions(conn):
+    with conn, conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+        if not cursor.fetchone()[0]:
+            return set()
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+
+
+def pending_migrations(conn, target=None, migrations=MIGRATIONS):
+    """Migrations not recorded yet, up to `target`, in version order."""
+    done = applied_versions(conn)
+    return [m for m in sorted(migrations) if m.version not in done and (target is None or m.version <= target)]
+
+
+def plan(conn, options=None, target=None, migrations=MIGRATIONS):
+    """[(migration, steps)] that `migrate` would run now, without changing anything."""
+    options = options or MigrationOptions()
+    pending = pending_migrations(conn, target, migrations)
+    with conn, conn.cursor() as cursor:
+        return [(m, m.plan(cursor, options)) for m in pending]
+
+
+def _run_migration(conn, migration, options):
+    """Run one migration's steps: consecutive transactional steps share a transaction."""
+    started = time.perf_counter()
+    with conn, conn.cursor() as cursor:
+        steps = migration.plan(cursor, options)
+    # Bookkeeping goes in the last transaction, so an all-transactional migration is atomic.
+    groups = []
+    for step in steps:
+        if step.transactional and groups and groups[-1][0]:
+            groups[-1][1].append(step.sql)
+        else:
+            groups.append((step.transactional, [step.sql]))
+    if not groups or not groups[-1][0]:
+        groups.append((True, []))
+    for index, (transactional, statements) in enumerate(groups):
+        if transactional:
+            with conn, conn.cursor() as cursor:
+                cursor.execute("SET LOCAL lock_timeout = %s", (options.lock_timeout,))
+                for sql in statements:
+                    cursor.execute(sql)
+                if index == len(groups) - 1:
+                    duration_ms = (time.perf_counter() - started) * 1000
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (version, name, duration_ms) VALUES (%s, %s, %s)",
+                        (migration.version, migration.name, duration_ms),
+                    )
+        else:
+            conn.autocommit = True
+            try:
+                with conn.cursor() as cursor:
+                    # Also bounds the build's waits for older transactions; a timed-out
+                    # build leaves an INVALID index, which the next run drops first.
+                    cursor.execute("SET lock_timeout = %s", (options.lock_timeout,))
+                    try:
+                        cursor.execute(statements[0])
+                    finally:
+                        cursor.execute("RESET lock_timeout")
+            finally:
+                conn.autocommit = False
+    return (time.perf_counter() - started) * 1000
+
+
+def migrate(conn, options=None, target=None, migrations=MIGRATIONS):
+    """Apply pending migrations in order; returns the versions applied.
+
+    A session advisory lock (per schema) keeps two migrators from interleaving.
+    """
+    options = options or MigrationOptions()
+    ensure_migrations_table(conn)
+    with conn, conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(hashtext(current_schema() || '.schema_migrations'))")
+    try:
+        applied = []
+        for migration in pending_migrations(conn, target, migrations):
+            duration_ms = _run_migration(conn, migration, options)
+            logger.info(f"✅ {migration.version:04d} {migration.name} ({duration_ms:,.1f} ms)")
+            applied.append(migration.version)
+        return applied
+    finally:
+        with conn, conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(current_schema() || '.schema_migrations'))")
+
+
+def format_plan(planned):
+    """Human-readable dry-run output."""
+    if not planned:
+        return "Schema is up to date."
+    lines = []
+    for migration, steps in planned:
+        lines.append(f"-- {migration.version:04d} {migration.name}")
+        for step in steps:
+            sql = " ".join(step.sql.split())
+            lines.append(f"   {'[tx]   ' if step.transactional else '[no tx]'} {sql}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="print the pending steps without running them")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    parser.add_argument("--concurrent-min-bytes", type=int, default=MigrationOptions().concurrent_min_bytes)
+    parser.add_argument("--lock-timeout", default=MigrationOptions().lock_timeout)
+    args = parser.parse_args()
+    options = MigrationOptions(concurrent_min_bytes=args.concurrent_min_bytes, lock_timeout=args.lock_timeout)
+
+    pool = ConnectionPool(DatabaseConfig.from_env(min_size=0, max_size=1))
+    try:
+        conn = pool.getconn()
+    except Exception as exc:
+        logger.error(f"❌ Database connection failed: {exc}")
+        sys.exit(1)
+    try:
+        if args.dry_run:
+            print(format_plan(plan(conn, options, args.target)))
+            return
+        applied = migrate(conn, options, args.target)
+        logger.info(f"🎉 Applied {len(applied)} migration(s)" if applied else "Schema is up to date.")
+    except Exception as exc:
+        logger.error(f"❌ Migration failed: {exc}")
+        sys.exit(1)
+    finally:
+        pool.putconn(conn)
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+import pytest
+import pytest_check as check
+
+from commons import database
+from commons.database import AsyncConnectionPool, ConnectionPool, DatabaseConfig, PoolTimeout
+
+
+class FakeConnection:
+    """Stands in for a psycopg2 connection: tracks transactions, can be made to fail."""
+
+    def __init__(self):
+        self.closed = 0
+        self.fail_queries = False
+        self.info = SimpleNamespace(transaction_status=TRANSACTION_STATUS_IDLE)
+        self.commits = self.rollbacks = 0
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            def execute(self, _query, _params=None):
+                if conn.fail_queries:
+                    raise psycopg2.OperationalError("server closed the connection unexpectedly")
+                conn.info.transaction_status = TRANSACTION_STATUS_INTRANS
+
+        return Cursor()
+
+    def commit(self):
+        self.commits += 1
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections(monkeypatch) -> list[FakeConnection]:
+    """Every connection the pool opens, in order."""
+    opened: list[FakeConnection] = []
+
+    def connect(**_kwargs):
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(database.psycopg2, "connect", connect)
+    return opened
+
+
+class TestDatabaseConfig:
+    """Test configuration parsing (environment variables are monkeypatched)."""
+
+    def test_from_dsn_keeps_unknown_parameters(self):
+        """Test that URL parts map to fields and the rest is passed through to libpq."""
+        config = DatabaseConfig.from_dsn("postgresql://app:secret@db:6543/tasks?sslmode=require", max_size=3)
+        check.equal((config.host, config.port, config.dbname, config.user, config.password), ("db", 6543, "tasks", "app", "secret"))
+        check.equal(config.connect_kwargs()["sslmode"], "require")
+        check.equal(config.max_size, 3)
+
+    def test_from_env_defaults_to_demo_database(self, monkeypatch):
+        """Test the docker-compose defaults and libpq variable overrides."""
+        for var in ("DATABASE_URL", "PGHOST", "PGPORT", "PGDATABASE", "PGUSER", "PGPASSWORD", "DB_POOL_MAX_SIZE"):
+            monkeypatch.delenv(var, raising=False)
+        check.equal(DatabaseConfig.from_env().connect_kwargs()["dbname"], "demo")
+        monkeypatch.setenv("PGDATABASE", "other")
+        monkeypatch.setenv("DB_POOL_MAX_SIZE", "7")
+        config = DatabaseConfig.from_env()
+        check.equal((config.dbname, config.max_size), ("other", 7))
+
+
+class TestConnectionPool:
+    """Test pool bookkeeping with psycopg2.connect mocked by FakeConnection."""
+
+    def test_reuses_connections_and_commits(self, connections):
+        """Test that a returned connection is lent again and committed on success."""
+        with ConnectionPool(DatabaseConfig(min_size=0, max_size=2)) as pool:
+            for _ in range(3):
+                with pool.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            metrics = pool.metrics()
+        check.equal(len(connections), 1)
+        check.equal(connections[0].commits, 3)
+        check.equal((metrics.checkouts, metrics.connections_created, metrics.idle), (3, 1, 1))
+
+    def test_error_rolls_back_and_broken_connection_is_dropped(self, connections):
+        """Test rollback on error, and that connection errors close the connection."""
+        with ConnectionPool(DatabaseConfig(min_size=0)) as pool:
+            with pytest.raises(ValueError), pool.cursor() as cursor:
+                cursor.execute("UPDATE tasks SET title = 'x'")
+                raise ValueError("application error")
+            check.equal(connections[0].rollbacks, 1)
+            check.equal(pool.metrics().idle, 1)
+
+            connections[0].fail_queries = True
+            with pytest.raises(psycopg2.OperationalError), pool.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            check.equal(connections[0].closed, 1)
+            check.equal(pool.metrics().size, 0)
+
+    def test_health_check_replaces_dead_connection(self, connections):
+        """Test that an idle connection failing SELECT 1 is replaced at checkout."""
+        with ConnectionPool(DatabaseConfig(min_size=1, health_check_after=0)) as pool:
+            connections[0].fail_queries = True
+            conn = pool.getconn()
+            pool.putconn(conn)
+            metrics = pool.metrics()
+        check.is_true(conn is connections[1])
+        check.equal((metrics.connections_failed_check, metrics.size), (1, 1))
+
+    def test_max_lifetime_recycles(self, connections):
+        """Test that connections older than max_lifetime are closed instead of reused."""
+        with ConnectionPool(DatabaseConfig(min_size=0, max_lifetime=0)) as pool:
+            pool.putconn(pool.getconn())
+            pool.putconn(pool.getconn())
+            metrics = pool.metrics()
+        check.equal(len(connections), 2)
+        check.is_true(all(conn.closed for conn in connections))
+        check.equal(metrics.connections_recycled, 2)
+
+    def test_failed_open_keeps_full_capacity(self, connections, monkeypatch):
+        """Test that a connect failing partway through open() leaves no slot reserved."""
+        connect = database.psycopg2.connect
+
+        def flaky_connect(**kwargs):
+            if len(connections) == 1:
+                connections.append(None)  # count the failed attempt
+                raise psycopg2.OperationalError("could not connect to server")
+            return connect(**kwargs)
+
+        monkeypatch.setattr(database.psycopg2, "connect", flaky_connect)
+        pool = ConnectionPool(DatabaseConfig(min_size=3, max_size=3, checkout_timeout=0.05))
+        with pytest.raises(psycopg2.OperationalError):
+            pool.open()
+        check.equal(pool.metrics().size, 1)
+        held = [pool.getconn() for _ in range(3)]
+        check.equal(pool.metrics().size, 3)
+        for conn in held:
+            pool.putconn(conn)
+        pool.close()
+
+    @pytest.mark.usefixtures("connections")
+    def test_checkout_waits_then_times_out(self):
+        """Test that an exhausted pool blocks until a connection is returned, or times out."""
+        with ConnectionPool(DatabaseConfig(min_size=0, max_size=1, checkout_timeout=0.05)) as pool:
+            held = pool.getconn()
+            with pytest.raises(PoolTimeout):
+                pool.getconn()
+            threading.Timer(0.01, pool.putconn, args=(held,)).start()
+            pool.putconn(pool.getconn())
+            metrics = pool.metrics()
+        check.equal((metrics.timeouts, metrics.connections_created), (1, 1))
+        check.greater(metrics.wait_ms_max, 0)
+
+
+@pytest.mark.integration
+class TestAsyncConnectionPool:
+    """Test the asyncio pool against a real Postgres (skipped when it is not running)."""
+
+    async def test_concurrent_queries(self, scratch_schema):
+        """Test that concurrent coroutines share max_size connections."""
+        async with AsyncConnectionPool(scratch_schema.config(min_size=0, max_size=3)) as pool:
+            rows = await asyncio.gather(*(pool.fetchone("SELECT %s::int, pg_sleep(0.01)", (i,)) for i in range(12)))
+            metrics = pool.metrics()
+        check.equal([row[0] for row in rows], list(range(12)))
+        check.less_equal(metrics.connections_created, 3)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()
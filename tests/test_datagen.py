@@ -0,0 +1,93 @@
+import csv
+from itertools import islice
+
+from pydantic import ValidationError
+import pytest
+import pytest_check as check
+
+from commons.datagen import DataGenerator, GeneratorConfig, copy_lines, write_csv, write_parquet
+
+
+def generated(**fields) -> dict[str, list[tuple]]:
+    return {table: list(rows) for table, _, rows in DataGenerator(GeneratorConfig(**fields)).tables()}
+
+
+class TestDataGenerator:
+    """Test generated rows in memory (no database)."""
+
+    def test_seed_reproduces_rows_and_children_reference_parents(self):
+        """Test determinism and that every foreign key points at a generated row."""
+        first = generated(tasks=300, users=20, seed=7)
+        check.equal(first, generated(tasks=300, users=20, seed=7))
+        check.not_equal(first["tasks"], generated(tasks=300, users=20, seed=8)["tasks"])
+        check.equal((len(first["tasks"]), len(first["users"])), (300, 20))
+
+        users = {row[0] for row in first["users"]}
+        tasks = {row[0] for row in first["tasks"]}
+        check.is_true({row[9] for row in first["tasks"]} - {None} <= users)
+        check.is_true({row[1] for table in ("comments", "attachments", "task_history") for row in first[table]} <= tasks)
+        check.equal({row[0] for row in first["task_categories"]}, tasks)
+        check.equal(len(set(first["task_categories"])), len(first["task_categories"]))
+
+    def test_distributions_follow_config(self):
+        """Test status weights, per-task means and the skew towards a few users and recent tasks."""
+        rows = generated(tasks=4000, users=100, seed=1, status_weights={"completed": 1},
+                         comments_per_task=2, history_per_task=0, attachments_per_task=1)
+        check.equal({row[3] for row in rows["tasks"]}, {"completed"})
+        check.is_true(all(row[6] is not None for row in rows["tasks"]))
+        check.equal(rows["task_history"], [])
+        check.almost_equal(len(rows["comments"]) / 4000, 2, rel=0.1)
+        check.almost_equal(len(rows["attachments"]) / 4000, 1, rel=0.1)
+
+        task_index = {row[0]: i for i, row in enumerate(rows["tasks"])}
+        recent = sum(task_index[row[1]] >= 2000 for row in rows["comments"])
+        check.greater(recent, len(rows["comments"]) * 0.65)
+        owners: dict[str, int] = {}
+        for row in rows["tasks"]:
+            owners[row[10]] = owners.get(row[10], 0) + 1
+        check.greater(sum(sorted(owners.values(), reverse=True)[:10]), 4000 * 0.25)
+
+    def test_rows_are_streamed(self):
+        """Test that rows come lazily, so row counts do not bound memory."""
+        tasks = DataGenerator(GeneratorConfig(tasks=10**12, seed=1)).rows("tasks")
+        check.equal(len(list(islice(tasks, 3))), 3)
+
+    def test_copy_lines(self):
+        """Test that rows become tab-separated COPY text with NULL as \\N."""
+        check.equal(list(copy_lines([(0, "x", True), (1, None, False)])), ["0\tx\tTrue\n", "1\t\\N\tFalse\n"])
+
+    def test_invalid_config_is_rejected(self):
+        """Test unknown statuses and text that COPY would need to escape."""
+        with pytest.raises(ValidationError):
+            GeneratorConfig(status_weights={"done": 1})
+        with pytest.raises(ValidationError):
+            GeneratorConfig(comment_texts=["tab\there"])
+
+
+class TestFileSinks:
+    """Test CSV and Parquet output in a temporary directory (nothing mocked)."""
+
+    def test_csv(self, tmp_path):
+        """Test one file per table with a header and the generated row count."""
+        counts = write_csv(tmp_path, DataGenerator(GeneratorConfig(tasks=50, seed=3)), batch_size=16)
+        with open(tmp_path / "tasks.csv", newline="") as file:
+            rows = list(csv.reader(file))
+        check.equal(rows[0][:3], ["id", "title", "description"])
+        check.equal(len(rows) - 1, counts["tasks"])
+        check.equal(len(list(tmp_path.glob("*.csv"))), 7)
+
+    def test_parquet(self, tmp_path):
+        """Test typed Parquet columns (skipped without pyarrow)."""
+        parquet = pytest.importorskip("pyarrow.parquet")
+        generator = DataGenerator(GeneratorConfig(tasks=50, seed=3))
+        counts = write_parquet(tmp_path, generator, batch_size=16)
+        table = parquet.read_table(tmp_path / "tasks.parquet")
+        first = next(generator.rows("tasks"))
+        check.equal(table.num_rows, counts["tasks"])
+        check.equal(table.column("created_at")[0].as_py().isoformat(" "), first[11])
+        check.equal(table.column("estimated_hours")[0].as_py(), first[7])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()
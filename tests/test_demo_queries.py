@@ -0,0 +1,71 @@
+from contextlib import closing
+from datetime import datetime
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+import pytest_check as check
+
+from commons.database import ConnectionPool
+import demo_queries
+import setup_database
+
+
+@pytest.fixture(scope="module")
+def config(module_scratch_schema):
+    """Pool settings for a scratch schema holding the sample data."""
+    with closing(module_scratch_schema.connect()) as conn, conn, conn.cursor() as cursor:
+        setup_database.create_tables(cursor)
+        setup_database.create_rollups(cursor)
+        setup_database.insert_sample_data(cursor)
+    return module_scratch_schema.config(min_size=0, max_size=3)
+
+class TestFormatting:
+    """Test the per-column formatters (pure functions, nothing mocked)."""
+
+    def test_formatters_follow_column_types(self):
+        """Test that timestamp columns are shortened and NULLs are spelled out."""
+        description = [SimpleNamespace(type_code=1114), SimpleNamespace(type_code=25)]
+        stamp, text = demo_queries.column_formatters(description)
+        check.equal(stamp(datetime(2026, 1, 2, 3, 4, 5)), "2026-01-02 03:04")
+        check.equal((stamp(None), text(None), text(42)), ("NULL", "NULL", "42"))
+
+
+@pytest.mark.integration
+class TestWorkloadRunner:
+    """Test the pooled, streaming runner against a real Postgres in a scratch schema (nothing mocked)."""
+
+    def test_run_queries_prints_in_order(self, config, capsys):
+        """Test that concurrent streaming in small batches prints every row in display order."""
+        with ConnectionPool(config) as pool:
+            counts = demo_queries.run_queries(pool, concurrency=3, fetch_size=2)
+            with pool.cursor() as cursor:
+                expected = []
+                for _, query, _ in demo_queries.DEMO_QUERIES:
+                    cursor.execute(query)
+                    expected.append(len(cursor.fetchall()))
+        out = capsys.readouterr().out
+        titles = [title for title, _, _ in demo_queries.DEMO_QUERIES]
+        check.equal(counts, expected)
+        check.equal(sorted(titles, key=out.index), titles)
+        check.is_in("bob_wilson", out)
+
+    def test_query_error_reaches_printer(self, config):
+        """Test that a failing query raises in the caller instead of hanging the printer."""
+        with ConnectionPool(config) as pool, pytest.raises(psycopg2.errors.UndefinedTable):
+            demo_queries.run_queries(pool, 2, [("Broken", "SELECT * FROM no_such_table", None),
+                                               *demo_queries.DEMO_QUERIES])
+
+    def test_matrix(self, config):
+        """Test that each concurrency level runs every query `repeat` times."""
+        results = demo_queries.run_matrix(config, [1, 2], repeat=3, fetch_size=2)
+        check.equal([r.concurrency for r in results], [1, 2])
+        for result in results:
+            check.equal(result.queries, 3 * len(demo_queries.DEMO_QUERIES))
+            check.equal({latency.count for latency in result.latency.values()}, {3})
+            check.greater(result.rows, 0)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()
@@ -0,0 +1,147 @@
+import threading
+
+import pytest_check as check
+
+from backend.events import HEARTBEAT_FRAME, RESET_FRAME, TaskEventBroadcaster
+from backend.storage import WALTaskStorage
+from backend.tasks import TaskManager
+
+
+class TestTaskEventBroadcaster:
+    """Test SSE fan-out from a real TaskManager (nothing mocked)."""
+
+    def setup_method(self):
+        """Set up a manager wired to a fresh broadcaster."""
+        self.manager = TaskManager()
+        self.broadcaster = TaskEventBroadcaster(max_buffered=3, heartbeat=0.01)
+        self.manager.add_listener(self.broadcaster.publish)
+
+    async def test_changes_reach_every_subscriber(self):
+        """Test that each subscriber receives one frame per change, in order."""
+        first, second = self.broadcaster.subscribe(), self.broadcaster.subscribe()
+        task = self.manager.add_task("Task 1", "high")
+        self.manager.complete_task(task.id)
+
+        for subscription in (first, second):
+            frames = await subscription.drain(1.0)
+            check.equal(len(frames), 2)
+            check.is_true(frames[0].startswith(b"id: 1\nevent: add\n"))
+            check.is_true(frames[1].startswith(b"id: 2\nevent: complete\n"))
+            check.is_in(b'"completed":true', frames[1])
+
+    async def test_slow_subscriber_gets_reset(self):
+        """Test that overflowing the per-client cap drops its buffer for one reset event."""
+        subscription = self.broadcaster.subscribe()
+        for i in range(5):
+            self.manager.add_task(f"Task {i}")
+
+        check.equal(await subscription.drain(1.0), [RESET_FRAME])
+        check.equal(subscription.dropped, 5)
+
+        self.manager.add_task("After reset")
+        frames = await subscription.drain(1.0)
+        check.equal(len(frames), 1)
+        check.is_true(frames[0].startswith(b"id: 6\n"))
+
+    async def test_stream_replays_from_last_event_id(self):
+        """Test that a reconnect replays missed changes, then heartbeats, then unsubscribes."""
+        for i in range(3):
+            self.manager.add_task(f"Task {i}")
+
+        async def connected() -> bool:
+            return False
+
+        stream = self.broadcaster.stream(self.manager, "1", connected)
+        replay = await anext(stream)
+        check.equal(replay.count(b"event: add"), 2)
+        check.is_true(replay.startswith(b"id: 2\n"))
+        check.equal(await anext(stream), HEARTBEAT_FRAME)
+        check.equal(len(self.broadcaster), 1)
+        await stream.aclose()
+        check.equal(len(self.broadcaster), 0)
+
+    async def test_event_ids_carry_the_epoch(self):
+        """Test that ids are `<epoch>.<version>` and a Last-Event-ID from another epoch gets a reset."""
+        broadcaster = TaskEventBroadcaster(heartbeat=0.01, manager=self.manager)
+        self.manager.add_listener(broadcaster.publish)
+        subscription = broadcaster.subscribe()
+        self.manager.add_task("A")
+        (frame,) = await subscription.drain(1.0)
+        check.is_true(frame.startswith(f"id: {self.manager.epoch}.1\n".encode()))
+
+        async def disconnected() -> bool:
+            return True
+
+        replay = [f async for f in broadcaster.stream(self.manager, f"{self.manager.epoch}.0", disconnected)]
+        check.equal(len(replay), 1)
+        check.is_true(replay[0].startswith(f"id: {self.manager.epoch}.1\n".encode()))
+        for stale in ("deadbeef.0", "0", "garbage"):
+            check.equal([f async for f in broadcaster.stream(self.manager, stale, disconnected)], [RESET_FRAME])
+
+    async def test_write_during_replay_is_delivered(self):
+        """Test that a write racing the Last-Event-ID read is streamed, not skipped."""
+        manager = TaskManager(thread_safe=True)
+        manager.add_listener(self.broadcaster.publish)
+        manager.add_task("Before")
+        writer = threading.Thread(target=manager.add_task, args=("During",))
+        changes_since = manager.changes_since
+
+        def racing_changes_since(version):
+            missed = changes_since(version)
+            writer.start()
+            writer.join(0.05)  # lands here unless the replay holds the manager lock
+            return missed
+
+        manager.changes_since = racing_changes_since
+
+        async def connected() -> bool:
+            return False
+
+        stream = self.broadcaster.stream(manager, "0", connected)
+        check.is_true((await anext(stream)).startswith(b"id: 1\n"))
+        writer.join()
+        check.is_true((await anext(stream)).startswith(b"id: 2\n"))
+        await stream.aclose()
+
+    async def test_event_ids_follow_a_restore(self, tmp_path):
+        """Test that ids use the epoch of the restored state, not the one at construction."""
+        before = TaskManager()
+        with WALTaskStorage(tmp_path) as storage:
+            storage.open(before)
+            before.add_task("Before restart")
+
+        manager = TaskManager()
+        broadcaster = TaskEventBroadcaster(heartbeat=0.01, manager=manager)
+        manager.add_listener(broadcaster.publish)
+        stale = manager.epoch
+        with WALTaskStorage(tmp_path) as storage:
+            storage.open(manager)
+            check.not_equal(manager.epoch, stale)
+            subscription = broadcaster.subscribe()
+            manager.add_task("After restart")
+            (frame,) = await subscription.drain(1.0)
+            check.is_true(frame.startswith(f"id: {manager.epoch}.2\n".encode()))
+
+            async def disconnected() -> bool:
+                return True
+
+            replay = [f async for f in broadcaster.stream(manager, f"{manager.epoch}.1", disconnected)]
+            check.equal(len(replay), 1)
+            check.is_true(replay[0].startswith(f"id: {manager.epoch}.2\n".encode()))
+            check.equal([f async for f in broadcaster.stream(manager, f"{stale}.1", disconnected)], [RESET_FRAME])
+
+    async def test_stream_resets_when_history_is_gone(self):
+        """Test that an evicted Last-Event-ID yields a reset event first."""
+        manager = TaskManager(change_log_size=1)
+        manager.add_tasks([("A", "low"), ("B", "low")])
+
+        async def disconnected() -> bool:
+            return True
+
+        frames = [frame async for frame in self.broadcaster.stream(manager, "0", disconnected)]
+        check.equal(frames, [RESET_FRAME])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()
@@ -0,0 +1,86 @@
+import pytest
+import pytest_check as check
+import requests
+
+from commons.mock_hasura import MockHasura
+import graphql_health
+import track_tables
+
+QUERIES = sum(len(queries) for _, _, queries in graphql_health.SUITES)
+
+
+@pytest.fixture
+def hasura():
+    """A local mock Hasura with every table tracked, stopped afterwards."""
+    with MockHasura() as mock, requests.Session() as session:
+        track_tables.bootstrap(session, mock.url)
+        mock.reset_counters()
+        yield mock
+
+
+class TestHealthSuite:
+    """Test the GraphQL health suite against commons.mock_hasura (no real Hasura)."""
+
+    async def test_every_query_passes_with_percentiles_and_sizes(self, hasura):
+        """Test that each query runs `repeat` times and reports latency and response size."""
+        connected, results, _ = await graphql_health.run_health_check(hasura.url, concurrency=4, repeat=3)
+        check.is_true(connected)
+        check.equal(len(results), QUERIES)
+        check.is_true(all(r.passed for r in results))
+        check.equal({r.runs for r in results}, {3})
+        check.equal({r.latency.count for r in results}, {3})
+        check.is_true(all(r.latency.p50_ms <= r.latency.p95_ms <= r.latency.p99_ms for r in results))
+        check.equal(results[0].size_bytes, len(b'{"data": {"users": []}}'))
+        check.equal(hasura.requests, 1 + 3 * QUERIES)
+        check.less_equal(hasura.connections, 4)
+
+    async def test_concurrency_overlaps_requests(self, hasura):
+        """Test that at most `concurrency` requests are in flight, and that 8 do overlap."""
+        hasura.latency_ms = 20
+        peaks = {}
+        for concurrency in (1, 8):
+            hasura.reset_counters()
+            async with graphql_health.create_client(hasura.url, concurrency) as client:
+                await graphql_health.run_suites(client, concurrency=concurrency, repeat=1)
+            peaks[concurrency] = hasura.peak_in_flight
+        check.equal(peaks[1], 1)
+        check.greater(peaks[8], 1)
+        check.less_equal(peaks[8], 8)
+
+    async def test_non_json_response_fails_the_run(self, hasura):
+        """Test that a 200 with a non-JSON body counts as a failed run instead of aborting the suite."""
+        hasura.graphql = lambda _body: "<html>proxy error</html>"
+        _, results, _ = await graphql_health.run_health_check(hasura.url, concurrency=2, repeat=2)
+        check.equal(len(results), QUERIES)
+        check.equal({r.failures for r in results}, {2})
+        check.is_in("invalid JSON response", results[0].error)
+
+    @pytest.mark.parametrize("option", ["--concurrency", "--repeat"])
+    def test_counts_below_one_are_rejected(self, monkeypatch, option):
+        """Test that zero concurrency or repeats is a usage error rather than a hang or a crash."""
+        monkeypatch.setattr("sys.argv", ["graphql_health.py", option, "0"])
+        with pytest.raises(SystemExit) as exc:
+            graphql_health.main()
+        check.equal(exc.value.code, 2)
+
+    async def test_untracked_table_fails_its_query(self, hasura):
+        """Test that a GraphQL error fails that query only, with the error kept for the report."""
+        hasura.sources["default"]["tables"].pop(("public", "attachments"))
+        _, results, _ = await graphql_health.run_health_check(hasura.url, concurrency=2, repeat=2)
+        failed = [r for r in results if not r.passed]
+        check.equal([r.description for r in failed], ["Attachments table access"])
+        check.equal(failed[0].failures, 2)
+        check.is_in("field 'attachments' not found", failed[0].error)
+        summary = graphql_health.print_results(results)
+        check.equal(summary, {"Basic queries": False, "Relationship queries": True, "Complex queries": True})
+
+    async def test_unreachable_endpoint(self):
+        """Test that a closed port reports no connectivity instead of raising."""
+        with MockHasura() as mock:
+            url = mock.url
+        check.equal(await graphql_health.run_health_check(url, repeat=1), (False, [], 0.0))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()
@@ -0,0 +1,104 @@
+import pytest
+import pytest_check as check
+
+import history_maintenance
+import setup_database
+
+pytestmark = pytest.mark.integration
+
+# Full-snapshot rows, one per task and month offset from now; only the status differs.
+INSERT_HISTORY = """
+    INSERT INTO task_history (task_id, user_id, action, old_values, new_values, created_at)
+    SELECT t.id, t.created_by, 'snapshot', to_jsonb(t), to_jsonb(t) || '{"status": "archived"}',
+           date_trunc('month', LOCALTIMESTAMP) + make_interval(months => m, days => 1)
+    FROM tasks t, unnest(%s::int[]) AS m
+"""
+
+
+@pytest.fixture
+def conn(scratch_schema):
+    """A connection to a scratch schema holding the sample data (task_history not yet partitioned)."""
+    conn = scratch_schema.connect()
+    try:
+        with conn, conn.cursor() as cursor:
+            setup_database.create_tables(cursor)
+            setup_database.create_indexes(cursor)
+            setup_database.insert_sample_data(cursor)
+        yield conn
+    finally:
+        conn.close()
+
+def rows_by_partition(conn):
+    with conn, conn.cursor() as cursor:
+        cursor.execute("SELECT tableoid::regclass::text, count(*) FROM task_history GROUP BY 1")
+        return dict(cursor.fetchall())
+
+
+class TestHistoryPartitioning:
+    """Test partitioning, rollover and compaction against a real Postgres in a scratch schema (nothing mocked)."""
+
+    def test_existing_rows_become_the_legacy_partition(self, conn):
+        """Test that conversion keeps every row and index, is a no-op when re-run, and rollover empties the default."""
+        with conn, conn.cursor() as cursor:
+            cursor.execute(INSERT_HISTORY, ([-14, -3],))
+            cursor.execute("SELECT count(*) FROM task_history")
+            before = cursor.fetchone()[0]
+            setup_database.create_history_partitions(cursor)
+            setup_database.create_history_partitions(cursor)
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = 'task_history'::regclass")
+            check.equal(cursor.fetchone()[0], "p")
+            cursor.execute("SELECT count(*) FROM pg_indexes WHERE tablename = 'task_history' AND schemaname = current_schema()")
+            check.equal(cursor.fetchone()[0], 3)  # primary key, task_id and the BRIN index
+            cursor.execute(INSERT_HISTORY, ([8],))
+        check.equal(rows_by_partition(conn), {"task_history_legacy": before, "task_history_default": 5})
+
+        changes = history_maintenance.rollover(conn, ahead=3)
+        month = [p.name for p in history_maintenance.partitions(conn)][-2]
+        check.equal(changes, [f"created {month}"])
+        check.equal(rows_by_partition(conn), {"task_history_legacy": before, month: 5})
+
+    def test_conversion_keeps_old_and_undated_rows(self, conn):
+        """Test that partitioning deletes nothing: rows past retention and NULL created_at stay."""
+        with conn, conn.cursor() as cursor:
+            cursor.execute(INSERT_HISTORY, ([-40],))
+            cursor.execute("UPDATE task_history SET created_at = NULL WHERE action = 'created'")
+            cursor.execute("SELECT count(*), count(*) FILTER (WHERE created_at IS NULL) FROM task_history")
+            before, undated = cursor.fetchone()
+            setup_database.create_history_partitions(cursor)
+            cursor.execute("SELECT count(*), min(created_at) FROM task_history WHERE action = 'created'")
+            created_rows, oldest = cursor.fetchone()
+            cursor.execute("SELECT count(*) FROM task_history")
+            check.equal(cursor.fetchone()[0], before)
+        check.greater(undated, 0)
+        check.equal(created_rows, undated)
+        check.greater(oldest.year, 2000)  # a real timestamp, not -infinity
+
+        check.equal(history_maintenance.rollover(conn, keep_months=24)[-1], "deleted 5 expired rows")
+
+    def test_retention_and_compaction(self, conn):
+        """Test that old partitions are dropped and closed ones keep only changed keys, once."""
+        with conn, conn.cursor() as cursor:
+            cursor.execute("DELETE FROM task_history")  # monthly partitions only, no legacy one
+            setup_database.create_history_partitions(cursor)
+            cursor.execute(INSERT_HISTORY, ([-30, -2, 0],))
+        check.equal(history_maintenance.rollover(conn, keep_months=24)[-1], "deleted 5 expired rows")
+
+        results = history_maintenance.compact(conn)
+        check.equal([r.rows for r in results], [5])
+        check.less_equal(results[0].bytes_after, results[0].bytes_before)
+        with conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT created_at < date_trunc('month', LOCALTIMESTAMP), old_values, new_values "
+                "FROM task_history WHERE action = 'snapshot' ORDER BY 1"
+            )
+            rows = cursor.fetchall()
+        check.equal(len(rows), 10)
+        check.is_true(all(len(old) > 5 for closed, old, _ in rows if not closed))
+        check.equal({(closed, len(old)) for closed, old, new in rows if closed}, {(True, 1)})
+        check.is_true(all(new == {"status": "archived"} for closed, _, new in rows if closed))
+        check.equal([r.rows for r in history_maintenance.compact(conn)], [0])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()
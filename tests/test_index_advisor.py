@@ -0,0 +1,89 @@
+import pytest
+import pytest_check as check
+
+from commons.datagen import GeneratorConfig
+import index_advisor
+from index_advisor import CandidateResult, IndexCandidate
+import setup_database
+
+
+@pytest.fixture(scope="module")
+def conn(module_scratch_schema):
+    """A connection to a seeded scratch schema (2,000 tasks, performance indexes only)."""
+    conn = module_scratch_schema.connect()
+    try:
+        with conn, conn.cursor() as cursor:
+            setup_database.create_tables(cursor)
+            setup_database.insert_bulk_data(cursor, GeneratorConfig(tasks=2_000, seed=7))
+            for entry in setup_database.INDEXES:
+                cursor.execute(setup_database.index_sql(*entry))
+            setup_database.create_rollups(cursor)
+        index_advisor.prepare(conn, index_advisor.WORKLOAD)
+        yield conn
+    finally:
+        conn.close()
+
+def index_exists(conn, name):
+    with conn, conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.integration
+class TestIndexAdvisor:
+    """Test the advisor against a real Postgres in a scratch schema (nothing mocked)."""
+
+    def test_measure_and_propose(self, conn):
+        """Test that plans yield composite, partial and covering candidates for the performance query."""
+        with conn.cursor() as cursor:
+            baseline = index_advisor.measure(cursor, index_advisor.WORKLOAD, repeat=1)
+            plans = {name: index_advisor.explain(cursor, query)["Plan"] for name, query in index_advisor.WORKLOAD}
+            candidates = index_advisor.propose(cursor, plans)
+        conn.rollback()
+        check.equal(list(baseline), [name for name, _ in index_advisor.WORKLOAD])
+        check.is_true(all(m.execution_ms > 0 for m in baseline.values()))
+        check.equal(baseline["Pending High-Priority Tasks"].tables, ["categories", "task_categories", "tasks", "users"])
+        check.equal(len({c.name for c in candidates}), len(candidates))
+        on_tasks = {(c.kind, tuple(c.columns)) for c in candidates if c.table == "tasks"}
+        check.is_in(("composite", ("status", "priority")), on_tasks)
+        check.is_in(("covering", ("status", "priority")), on_tasks)
+        check.is_true(any(c.kind == "partial" and c.where for c in candidates))
+
+    def test_trial_rolls_back_and_apply_builds(self, conn):
+        """Test that a trial leaves no index behind and --apply builds it for good."""
+        candidate = IndexCandidate(kind="covering", table="tasks", columns=["status", "priority"],
+                                   include=["assigned_to", "id", "title"], reason="test")
+        with conn.cursor() as cursor:
+            baseline = index_advisor.measure(cursor, index_advisor.WORKLOAD, repeat=1)
+        conn.rollback()
+        result = index_advisor.trial(conn, candidate, index_advisor.WORKLOAD, baseline, repeat=1)
+        check.greater(result.size_bytes, 0)
+        check.is_in("Pending High-Priority Tasks", result.after_ms)
+        check.is_false(index_exists(conn, candidate.name))
+
+        index_advisor.apply(conn, [candidate])
+        check.is_true(index_exists(conn, candidate.name))
+        check.is_false(conn.autocommit)
+
+
+class TestRecommend:
+    """Test the greedy selection on hand-made results (no database)."""
+
+    def test_skips_small_and_redundant_gains(self):
+        """Test that a candidate must beat the threshold and speed up a query not already covered."""
+        def result(name, before, after):
+            candidate = IndexCandidate(kind="composite", table="tasks", columns=[name], reason="test")
+            return CandidateResult(candidate=candidate, before_ms=before, after_ms=after, size_bytes=1, build_ms=1)
+
+        best = result("a", {"q1": 100, "q2": 50}, {"q1": 40, "q2": 30})
+        redundant = result("b", {"q1": 100}, {"q1": 50})
+        small = result("c", {"q3": 100}, {"q3": 95})
+        other = result("d", {"q3": 100}, {"q3": 80})
+        chosen = index_advisor.recommend([small, redundant, other, best], min_gain_pct=10)
+        check.equal([r.candidate.columns for r in chosen], [["a"], ["d"]])
+        check.almost_equal(best.gain_pct, 80 / 150 * 100)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()
@@ -0,0 +1,30 @@
+import pytest
+import pytest_check as check
+
+from commons.latency import percentile, summarize_ms
+
+
+class TestLatency:
+    """Test the shared latency summary helpers (pure functions, nothing mocked)."""
+
+    def test_summarize(self):
+        """Test nearest-rank percentiles over 1..100 ms."""
+        summary = summarize_ms(float(ms) for ms in range(100, 0, -1))
+        check.equal(summary.count, 100)
+        check.equal(summary.mean_ms, 50.5)
+        check.equal(summary.p50_ms, 50.0)
+        check.equal(summary.p95_ms, 95.0)
+        check.equal(summary.p99_ms, 99.0)
+        check.equal(summary.max_ms, 100.0)
+
+    def test_small_samples(self):
+        """Test that percentiles of tiny samples stay within the data."""
+        check.equal(percentile([3.0], 99), 3.0)
+        check.equal(percentile([1.0, 2.0], 50), 1.0)
+        with pytest.raises(ValueError):
+            summarize_ms([])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()
@@ -0,0 +1,274 @@
+import shutil
+import threading
+
+from fastapi.testclient import TestClient
+import pytest
+import pytest_check as check
+
+import backend.main as main
+import backend.serialization as serialization
+from backend.storage import WALTaskStorage
+from backend.tasks import TaskManager
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """A TestClient over the real app with a fresh TaskManager (nothing mocked)."""
+    monkeypatch.setattr(main, "manager", TaskManager())
+    return TestClient(main.app)
+
+
+class TestTaskPagination:
+    """Test cursor pagination and filters on GET /tasks."""
+
+    def test_pages_cover_all_tasks(self, client):
+        """Test that following next_cursor returns every task exactly once."""
+        for i in range(25):
+            client.post("/tasks", json={"desc": f"Task {i}"})
+
+        ids, cursor = [], None
+        while True:
+            params = {"limit": 10} if cursor is None else {"limit": 10, "cursor": cursor}
+            page = client.get("/tasks", params=params).json()
+            ids.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        check.equal(ids, list(range(1, 26)))
+
+    def test_cursor_survives_concurrent_mutations(self, client):
+        """Test that a cursor stays valid when tasks are deleted and added between pages."""
+        for i in range(6):
+            client.post("/tasks", json={"desc": f"Task {i}"})
+
+        first = client.get("/tasks", params={"limit": 3}).json()
+        check.equal([item["id"] for item in first["items"]], [1, 2, 3])
+
+        client.delete("/tasks/3")  # the cursor task itself
+        client.delete("/tasks/4")
+        client.post("/tasks", json={"desc": "Late task"})
+
+        second = client.get("/tasks", params={"limit": 3, "cursor": first["next_cursor"]}).json()
+        check.equal([item["id"] for item in second["items"]], [5, 6, 7])
+        check.is_none(second["next_cursor"])
+
+    def test_filters(self, client):
+        """Test priority and completed filters, alone and combined."""
+        for priority in ["high", "low", "high", "medium", "high"]:
+            client.post("/tasks", json={"desc": "Task", "priority": priority})
+        client.put("/tasks/1")
+        client.put("/tasks/2")
+
+        def ids(**params):
+            paged = [item["id"] for item in client.get("/tasks", params={"limit": 10, **params}).json()["items"]]
+            check.equal([item["id"] for item in client.get("/tasks", params=params).json()], paged)
+            return paged
+
+        check.equal(ids(priority="high"), [1, 3, 5])
+        check.equal(ids(completed=True), [1, 2])
+        check.equal(ids(completed=False), [3, 4, 5])
+        check.equal(ids(priority="high", completed=False), [3, 5])
+
+    def test_without_cursor_or_limit_returns_a_bare_list(self, client):
+        """Test that a plain GET /tasks keeps its original response: every task, as a JSON array."""
+        client.post("/tasks/batch", json={"tasks": [{"desc": f"Task {i}"} for i in range(main.DEFAULT_PAGE_SIZE + 1)]})
+        tasks = client.get("/tasks").json()
+        check.is_instance(tasks, list)
+        check.equal(len(tasks), main.DEFAULT_PAGE_SIZE + 1)
+        check.equal({k: tasks[0][k] for k in ("id", "description", "priority", "completed")},
+                    {"id": 1, "description": "Task 0", "priority": "medium", "completed": False})
+        check.equal(len(client.get("/tasks", params={"limit": 10}).json()["items"]), 10)
+        check.equal(len(client.get("/tasks", params={"cursor": "1"}).json()["items"]), main.DEFAULT_PAGE_SIZE)
+
+    def test_invalid_parameters(self, client):
+        """Test that malformed cursors and out-of-range limits are rejected."""
+        check.equal(client.get("/tasks", params={"cursor": "not-a-cursor"}).status_code, 400)
+        check.equal(client.get("/tasks", params={"limit": 0}).status_code, 422)
+        check.equal(client.get("/tasks", params={"priority": "urgent"}).status_code, 422)
+
+
+
+class TestBatchEndpoints:
+    """Test the batch create/complete/delete routes."""
+
+    def test_batch_roundtrip(self, client):
+        """Test creating, completing and deleting tasks in batches with per-item results."""
+        created = client.post(
+            "/tasks/batch",
+            json={"tasks": [{"desc": "A", "priority": "high"}, {"desc": "B"}, {"desc": "C"}]},
+        ).json()["items"]
+        check.equal([t["id"] for t in created], [1, 2, 3])
+        check.equal(created[1]["priority"], "medium")
+
+        completed = client.post("/tasks/batch/complete", json={"ids": [1, 42]}).json()["results"]
+        check.equal(completed, [{"id": 1, "status": "success"}, {"id": 42, "status": "not_found"}])
+
+        deleted = client.post("/tasks/batch/delete", json={"ids": [2, 3]}).json()["results"]
+        check.equal([r["status"] for r in deleted], ["success", "success"])
+
+        items = client.get("/tasks").json()
+        check.equal([(t["id"], t["completed"]) for t in items], [(1, True)])
+
+    def test_batch_create_validates_every_item(self, client):
+        """Test that an invalid item rejects the batch before anything is stored."""
+        response = client.post("/tasks/batch", json={"tasks": [{"desc": "A"}, {"desc": "B", "priority": "bad"}]})
+        check.equal(response.status_code, 422)
+        check.equal(client.get("/tasks").json(), [])
+
+
+class TestTaskValidation:
+    """Test request validation and priority normalization on the task routes."""
+
+    def test_in_memory_descriptions_have_no_length_limit(self, client):
+        """Test that the 255-character limit of the Postgres store does not apply to the in-memory one."""
+        check.equal(client.post("/tasks", json={"desc": "x" * 1_000}).status_code, 200)
+        check.equal(client.get("/tasks").json()[0]["description"], "x" * 1_000)
+
+    def test_create_normalizes_priority_case(self, client):
+        """Test that TaskCreate shares Task's case-insensitive priority lookup."""
+        created = client.post("/tasks", json={"desc": "A", "priority": "HiGh"}).json()
+        check.equal(created["priority"], "high")
+
+    def test_priority_filter_ignores_case(self, client):
+        """Test that the GET /tasks priority filter accepts any letter case."""
+        client.post("/tasks", json={"desc": "A", "priority": "high"})
+        client.post("/tasks", json={"desc": "B", "priority": "low"})
+        items = client.get("/tasks", params={"priority": "HIGH"}).json()
+        check.equal([t["id"] for t in items], [1])
+
+
+class TestConditionalGet:
+    """Test ETag / If-None-Match handling on GET /tasks."""
+
+    def test_not_modified_until_mutation(self, client):
+        """Test that a matching ETag yields 304 and any mutation changes the ETag."""
+        client.post("/tasks", json={"desc": "A"})
+        first = client.get("/tasks")
+        etag = first.headers["etag"]
+
+        cached = client.get("/tasks", headers={"If-None-Match": etag})
+        check.equal(cached.status_code, 304)
+        check.equal(cached.content, b"")
+        check.equal(cached.headers["etag"], etag)
+        check.equal(client.get("/tasks", headers={"If-None-Match": f'"x", W/{etag}'}).status_code, 304)
+
+        client.put("/tasks/1")
+        refreshed = client.get("/tasks", headers={"If-None-Match": etag})
+        check.equal(refreshed.status_code, 200)
+        check.not_equal(refreshed.headers["etag"], etag)
+        check.is_true(refreshed.json()[0]["completed"])
+
+
+class TestChangeFeed:
+    """Test the GET /tasks/changes delta feed."""
+
+    def test_delta_since_version(self, client):
+        """Test that only changes after `since` are returned, in order."""
+        client.post("/tasks", json={"desc": "A"})
+        first = client.get("/tasks/changes").json()
+        check.is_true(first["reset"])  # no epoch yet: the full list
+        since, epoch = first["version"], first["epoch"]
+        client.post("/tasks", json={"desc": "B", "priority": "low"})
+        client.put("/tasks/1")
+        client.delete("/tasks/2")
+
+        feed = client.get("/tasks/changes", params={"since": since, "epoch": epoch}).json()
+        check.is_false(feed["reset"])
+        check.equal(feed["version"], since + 3)
+        check.equal([(c["op"], c["id"]) for c in feed["changes"]], [("add", 2), ("complete", 1), ("remove", 2)])
+        check.is_true(feed["changes"][1]["task"]["completed"])
+        check.is_none(feed["changes"][2]["task"])
+
+        up_to_date = client.get("/tasks/changes", params={"since": feed["version"], "epoch": epoch}).json()
+        check.equal(up_to_date["changes"], [])
+
+    def test_write_during_read_is_not_skipped(self, client, monkeypatch):
+        """Test that a write racing the read is either in the response or after its version."""
+        monkeypatch.setattr(main, "manager", TaskManager(thread_safe=True))
+        client.post("/tasks", json={"desc": "A"})
+        epoch = main.manager.epoch
+        writer = threading.Thread(target=main.manager.add_task, args=("B",))
+        changes_since = main.manager.changes_since
+
+        def racing_changes_since(version):
+            writer.start()
+            writer.join(0.05)  # lands here unless the read holds the manager lock
+            return changes_since(version)
+
+        monkeypatch.setattr(main.manager, "changes_since", racing_changes_since)
+        feed = client.get("/tasks/changes", params={"since": 0, "epoch": epoch}).json()
+        writer.join()
+        check.equal(feed["version"], len(feed["changes"]))
+        check.equal(feed["version"], 1)
+
+    def test_snapshot_when_evicted(self, client, monkeypatch):
+        """Test the full-snapshot fallback once `since` has left the ring buffer."""
+        monkeypatch.setattr(main, "manager", TaskManager(change_log_size=2))
+        for desc in ["A", "B", "C"]:
+            client.post("/tasks", json={"desc": desc})
+
+        epoch = main.manager.epoch
+        feed = client.get("/tasks/changes", params={"since": 0, "epoch": epoch}).json()
+        check.is_true(feed["reset"])
+        check.equal(feed["version"], 3)
+        check.equal([t["description"] for t in feed["tasks"]], ["A", "B", "C"])
+
+        check.is_false(client.get("/tasks/changes", params={"since": 1, "epoch": epoch}).json()["reset"])
+        check.is_true(client.get("/tasks/changes", params={"since": 99, "epoch": epoch}).json()["reset"])
+
+    def test_restart_resets_clients(self, client, monkeypatch):
+        """Test that the same version after a restart is not mistaken for the old data."""
+        client.post("/tasks", json={"desc": "Before restart"})
+        feed = client.get("/tasks/changes").json()
+        etag = client.get("/tasks").headers["etag"]
+
+        monkeypatch.setattr(main, "manager", TaskManager())  # a new process, back at version 0
+        client.post("/tasks", json={"desc": "After restart"})
+        check.equal(main.manager.version, feed["version"])
+
+        check.equal(client.get("/tasks", headers={"If-None-Match": etag}).status_code, 200)
+        stale = client.get("/tasks/changes", params={"since": feed["version"], "epoch": feed["epoch"]}).json()
+        check.is_true(stale["reset"])
+        check.equal([t["description"] for t in stale["tasks"]], ["After restart"])
+        check.not_equal(stale["epoch"], feed["epoch"])
+
+
+class TestPersistence:
+    """Test that writes are acknowledged only once they are durable."""
+
+    def test_acknowledged_writes_survive_a_crash(self, monkeypatch, tmp_path):
+        """Test that a task is in the log on disk as soon as its POST returns."""
+        live, crashed = tmp_path / "live", tmp_path / "crashed"
+        monkeypatch.setattr(main, "manager", TaskManager(thread_safe=True))
+        monkeypatch.setattr(main, "storage", WALTaskStorage(live, commit_interval=0.5))
+        with TestClient(main.app) as client:
+            client.post("/tasks", json={"desc": "Acknowledged"})
+            client.put("/tasks/1")
+            shutil.copytree(live, crashed)  # the files as a crash right now would leave them
+
+        restored = TaskManager()
+        with WALTaskStorage(crashed) as storage:
+            storage.open(restored)
+        check.equal([(t.description, t.completed) for t in restored.list_tasks()], [("Acknowledged", True)])
+
+
+class TestJSONEncoding:
+    """Test the pre-encoded JSON response path."""
+
+    def test_stdlib_fallback_matches(self, client, monkeypatch):
+        """Test that responses decode the same with and without orjson (orjson patched out)."""
+        client.post("/tasks", json={"desc": "Café ☕", "priority": "high"})
+        client.put("/tasks/1")
+        with_default = client.get("/tasks").json()
+
+        monkeypatch.setattr(serialization, "orjson", None)
+        main.manager.get_task(1).mark_completed()  # drop the cached fragment
+        with_stdlib = client.get("/tasks").json()
+
+        check.equal(with_stdlib, with_default)
+        check.equal(with_stdlib[0]["description"], "Café ☕")
+        check.is_true(with_stdlib[0]["completed"])
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()
@@ -0,0 +1,106 @@
+import psycopg2
+import pytest
+import pytest_check as check
+
+import migrate
+from migrate import MigrationOptions
+import setup_database
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture
+def conn(scratch_schema):
+    """A connection whose search_path is an empty scratch schema."""
+    conn = scratch_schema.connect()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+TRIGGER_COUNT = (
+    "SELECT count(*) FROM pg_trigger t JOIN pg_class c ON c.oid = t.tgrelid "
+    "WHERE t.tgname LIKE 'trigger_update_%' AND c.relnamespace = current_schema()::regnamespace"
+)
+
+
+def scalar(conn, query):
+    with conn, conn.cursor() as cursor:
+        cursor.execute(query)
+        return cursor.fetchone()[0]
+
+
+class TestMigrate:
+    """Test migrations against a real Postgres in a scratch schema (nothing mocked)."""
+
+    def test_dry_run_then_apply_once(self, conn):
+        """Test that the plan changes nothing, applying records every version and a re-run is a no-op."""
+        planned = migrate.plan(conn)
+        check.equal([m.version for m, _ in planned], [m.version for m in migrate.MIGRATIONS])
+        check.is_in("CREATE TABLE IF NOT EXISTS tasks", migrate.format_plan(planned))
+        check.is_none(scalar(conn, "SELECT to_regclass('schema_migrations')"))
+
+        check.equal(migrate.migrate(conn), [m.version for m in migrate.MIGRATIONS])
+        check.equal(migrate.migrate(conn), [])
+        check.equal(migrate.format_plan(migrate.plan(conn)), "Schema is up to date.")
+        check.equal(scalar(conn, "SELECT count(*) FROM schema_migrations"), len(migrate.MIGRATIONS))
+        check.equal(scalar(conn, TRIGGER_COUNT), len(setup_database.UPDATED_AT_TABLES))
+
+    def test_target_and_concurrent_index_builds(self, conn):
+        """Test --target, and that tables over the size threshold get non-transactional CONCURRENTLY builds."""
+        check.equal(migrate.migrate(conn, target=2), [1, 2])
+        options = MigrationOptions(concurrent_min_bytes=0)
+        _, steps = migrate.plan(conn, options, target=3)[0]
+        check.is_true(all(not step.transactional and "CONCURRENTLY" in step.sql for step in steps))
+        check.equal(migrate.migrate(conn, options), [3, 4, 5, 6, 7])
+        check.equal(scalar(conn, "SELECT count(*) FROM pg_indexes WHERE indexname LIKE 'idx_%' "
+                                 "AND schemaname = current_schema()"),
+                    len(setup_database.INDEXES) + len(setup_database.WORKLOAD_INDEXES) + 1)  # + task_history's BRIN
+
+    def test_baseline_predates_the_number_column(self, conn):
+        """Test that migration 1 creates tasks as first shipped, and migration 2 adds `number`."""
+        number_column = (
+            "SELECT count(*) FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = 'tasks' AND column_name = 'number'"
+        )
+        migrate.migrate(conn, target=1)
+        check.equal(scalar(conn, number_column), 0)
+        migrate.migrate(conn, target=2)
+        check.equal(scalar(conn, number_column), 1)
+
+    def test_concurrent_index_builds_time_out_on_locks(self, conn, scratch_schema):
+        """Test that a CONCURRENTLY build gives up after lock_timeout, then succeeds once the lock is gone."""
+        migrate.migrate(conn, target=2)
+        options = MigrationOptions(concurrent_min_bytes=0, lock_timeout="100ms")
+        blocker = scratch_schema.connect()
+        try:
+            with blocker.cursor() as cursor:
+                cursor.execute("LOCK TABLE users IN SHARE UPDATE EXCLUSIVE MODE")
+            with pytest.raises(psycopg2.errors.LockNotAvailable):
+                migrate.migrate(conn, options, target=3)
+            check.equal(scalar(conn, "SHOW lock_timeout"), "0")  # not left on the session
+        finally:
+            blocker.close()
+        check.equal(migrate.migrate(conn, options, target=3), [3])
+
+    def test_failed_migration_is_rolled_back_and_not_recorded(self, conn):
+        """Test that a failing transactional migration leaves no trace and can be fixed and re-run."""
+        broken = migrate.Migration(1, "broken", migrate._statements("CREATE TABLE half_done (id INT);", "SELECT 1/0;"))
+        with pytest.raises(psycopg2.errors.DivisionByZero):
+            migrate.migrate(conn, migrations=[broken])
+        conn.rollback()
+        check.is_none(scalar(conn, "SELECT to_regclass('half_done')"))
+        check.equal(migrate.applied_versions(conn), set())
+
+    def test_create_triggers_is_idempotent(self, conn):
+        """Test that setup_database.create_triggers can run twice."""
+        with conn, conn.cursor() as cursor:
+            setup_database.create_tables(cursor)
+            setup_database.create_triggers(cursor)
+            setup_database.create_triggers(cursor)
+        check.equal(scalar(conn, TRIGGER_COUNT), len(setup_database.UPDATED_AT_TABLES))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()
@@ -0,0 +1,163 @@
+from contextlib import closing
+import threading
+import time
+
+from fastapi.testclient import TestClient
+import pytest
+import pytest_check as check
+
+import backend.main as main
+from backend.postgres import MAX_DESCRIPTION_LENGTH, PostgresTaskManager
+import setup_database
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture
+def schema(scratch_schema):
+    """A scratch schema with the setup_database.py tables."""
+    with closing(scratch_schema.connect()) as conn, conn, conn.cursor() as cursor:
+        setup_database.create_extensions(cursor)
+        setup_database.create_tables(cursor)
+        setup_database.create_indexes(cursor)
+    return scratch_schema
+
+
+@pytest.fixture
+def manager(schema):
+    with PostgresTaskManager(schema.config(max_size=4)) as manager:
+        yield manager
+
+
+class TestPostgresTaskManager:
+    """Test the Postgres store against a real database in a scratch schema (nothing mocked)."""
+
+    def test_crud_round_trip(self, manager):
+        """Test that added tasks read back with their ids, priorities and state."""
+        first = manager.add_task("Write tests", "HIGH")
+        second, third = manager.add_tasks([("Review", "low"), ("Ship", "medium")])
+        check.equal((second.id, third.id), (first.id + 1, first.id + 2))
+        check.equal(manager.get_task(first.id).to_dict(), first.to_dict())
+        check.almost_equal(manager.get_task(first.id).created_ts, first.created_ts, abs=1e-5)
+
+        check.is_true(manager.complete_task(second.id))
+        check.is_true(manager.complete_task(second.id))  # already completed still counts as found
+        check.is_false(manager.complete_task(9_999_999))
+        check.is_true(manager.remove_task(third.id))
+        check.is_false(manager.remove_task(third.id))
+        assert manager.get_task(third.id) is None  # Keep assert for None checks
+
+        check.equal([t.id for t in manager.list_tasks()], [first.id, second.id])
+        check.equal([t.id for t in manager.get_completed_tasks()], [second.id])
+        check.equal([t.id for t in manager.get_pending_tasks()], [first.id])
+        check.equal([t.id for t in manager.get_priority_sorted_tasks()], [first.id, second.id])
+
+    def test_page_tasks_filters_and_cursor(self, manager):
+        """Test keyset pagination with and without filters."""
+        tasks = manager.add_tasks([(f"Task {i}", ("high", "medium", "low")[i % 3]) for i in range(9)])
+        manager.complete_tasks([t.id for t in tasks[::2]])
+        page, cursor = manager.page_tasks(limit=4)
+        check.equal([t.id for t in page], [t.id for t in tasks[:4]])
+        page, cursor = manager.page_tasks(cursor, limit=10)
+        check.equal([t.id for t in page], [t.id for t in tasks[4:]])
+        assert cursor is None  # Keep assert for None checks
+        page, _ = manager.page_tasks(limit=10, priority="high", completed=True)
+        check.equal([t.id for t in page], [tasks[0].id, tasks[6].id])
+        check.equal(manager.page_tasks(priority="urgent"), ([], None))
+
+    def test_urgent_rows_read_as_high(self, manager, schema):
+        """Test that rows created outside the API with the schema's extra priority are readable."""
+        with closing(schema.connect()) as conn, conn, conn.cursor() as cursor:
+            cursor.execute("INSERT INTO tasks (title, priority) VALUES ('Hotfix', 'urgent') RETURNING number")
+            number = cursor.fetchone()[0]
+        check.equal(manager.get_task(number).priority, "high")
+        check.equal([t.id for t in manager.get_tasks_by_priority("high")], [number])
+
+    def test_batches_report_per_id_and_record_changes(self, manager):
+        """Test batch results, duplicate ids and the change log used by the API feeds."""
+        a, b = manager.add_tasks([("A", "low"), ("B", "low")])
+        check.equal(manager.complete_tasks([a.id, a.id, 9_999_999]), [True, True, False])
+        check.equal(manager.remove_tasks([b.id, b.id]), [True, False])
+        changes = manager.changes_since(0)
+        check.equal([(c.version, c.op, c.task_id) for c in changes],
+                    [(1, "add", a.id), (2, "add", b.id), (3, "complete", a.id), (4, "remove", b.id)])
+        check.is_true(changes[2].task.completed)
+
+
+    def test_descriptions_must_fit_the_title_column(self, manager, monkeypatch):
+        """Test that over-long descriptions reject the whole batch, and are a 422 through the API."""
+        long = "x" * (MAX_DESCRIPTION_LENGTH + 1)
+        check.equal(len(manager.add_task("x" * MAX_DESCRIPTION_LENGTH).description), MAX_DESCRIPTION_LENGTH)
+        with pytest.raises(ValueError, match="at most 255"):
+            manager.add_tasks([("Fits", "low"), (long, "low")])
+        check.equal(len(manager.list_tasks()), 1)
+
+        monkeypatch.setattr(main, "manager", manager)
+        client = TestClient(main.app)
+        check.equal(client.post("/tasks", json={"desc": long}).status_code, 422)
+        check.equal(client.post("/tasks/batch", json={"tasks": [{"desc": "A"}, {"desc": long}]}).status_code, 422)
+        check.equal(len(manager.list_tasks()), 1)
+
+    def test_open_fails_fast_without_the_number_column(self, schema):
+        """Test that a database predating tasks.number is left to migrate.py, not altered at startup."""
+        with closing(schema.connect()) as conn, conn, conn.cursor() as cursor:
+            cursor.execute("ALTER TABLE tasks DROP COLUMN number")
+        with pytest.raises(RuntimeError, match=r"migrate\.py"):
+            PostgresTaskManager(schema.config()).open()
+
+    def test_writes_run_outside_the_lock_and_commit_under_it(self, manager, schema):
+        """Test that an insert executes while the manager lock is held elsewhere, then commits after."""
+        with closing(schema.connect()) as conn, conn.cursor() as cursor:
+            conn.autocommit = True
+            cursor.execute("SELECT pg_get_serial_sequence('tasks', 'number')")
+            (sequence,) = cursor.fetchone()
+
+            def inserted() -> bool:
+                cursor.execute(f"SELECT is_called FROM {sequence}")  # sequences ignore transactions
+                return cursor.fetchone()[0]
+
+            with manager.locked():
+                writer = threading.Thread(target=manager.add_task, args=("Concurrent",))
+                writer.start()
+                deadline = time.monotonic() + 5
+                while not inserted() and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                check.is_true(inserted())
+                check.equal(manager.list_tasks(), [])
+                check.equal(manager.version, 0)
+            writer.join()
+        check.equal([t.description for t in manager.list_tasks()], ["Concurrent"])
+        check.equal(manager.version, 1)
+
+    def test_versions_follow_commit_order(self, manager, schema):
+        """Test that a write blocked on another's row lock is recorded after it, not first."""
+        task = manager.add_task("Contended")
+        with closing(schema.connect()) as conn, conn.cursor() as cursor:
+            conn.autocommit = True
+
+            def remove_waits_on_a_row_lock() -> bool:
+                cursor.execute(
+                    "SELECT count(*) FROM pg_stat_activity "
+                    "WHERE wait_event_type = 'Lock' AND query LIKE 'EXECUTE task_remove%'"
+                )
+                return cursor.fetchone()[0] > 0
+
+            with manager.locked():
+                completer = threading.Thread(target=manager.complete_task, args=(task.id,))
+                completer.start()
+                time.sleep(0.1)  # the UPDATE runs, then waits for the manager lock to commit
+                remover = threading.Thread(target=manager.remove_task, args=(task.id,))
+                remover.start()
+                deadline = time.monotonic() + 5
+                while not remove_waits_on_a_row_lock() and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                check.is_true(remove_waits_on_a_row_lock())
+            completer.join()
+            remover.join()
+        check.equal([(c.version, c.op) for c in manager.changes_since(0)],
+                    [(1, "add"), (2, "complete"), (3, "remove")])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()
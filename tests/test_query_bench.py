@@ -0,0 +1,49 @@
+import pytest
+import pytest_check as check
+
+from commons import query_bench
+from commons.latency import summarize_ms
+from commons.query_bench import BenchmarkReport, QueryResult
+
+
+def report(**p50_ms) -> BenchmarkReport:
+    queries = {name: QueryResult(rows=1, latency=summarize_ms([ms]), rows_per_sec=1000 / ms) for name, ms in p50_ms.items()}
+    return BenchmarkReport(server_version="16", table_rows={}, warmup=0, iterations=1, queries=queries)
+
+
+class TestCompare:
+    """Test regression detection on hand-made reports (no database)."""
+
+    def test_tolerance_and_absolute_floor(self, tmp_path):
+        """Test that only queries slower by both the percentage and the floor regress."""
+        baseline = report(slow=100.0, tiny=0.2, steady=50.0, dropped=10.0)
+        baseline.save(tmp_path / "bench.json")
+        current = report(slow=130.0, tiny=0.5, steady=55.0, added=1.0)
+        comparisons = query_bench.compare(BenchmarkReport.load(tmp_path / "bench.json"), current, tolerance_pct=20)
+        check.equal({c.name: c.regressed for c in comparisons}, {"slow": True, "tiny": False, "steady": False})
+        check.almost_equal(comparisons[0].change_pct, 30.0)
+
+
+@pytest.mark.integration
+class TestRunBenchmark:
+    """Test the harness against a real Postgres (skipped when it is not running)."""
+
+    def test_percentiles_and_rows(self, scratch_schema):
+        """Test that every query gets the requested iterations and a row count."""
+        conn = scratch_schema.connect()
+        workload = [("series", "SELECT generate_series(1, 500)"), ("one", "SELECT 1")]
+        try:
+            result = query_bench.run_benchmark(conn, workload, warmup=1, iterations=5)
+        finally:
+            conn.close()
+        check.equal(list(result.queries), ["series", "one"])
+        series = result.queries["series"]
+        check.equal((series.rows, series.latency.count), (500, 5))
+        check.less_equal(series.latency.p50_ms, series.latency.p99_ms)
+        check.greater(series.rows_per_sec, 0)
+        check.equal(BenchmarkReport.model_validate_json(result.model_dump_json()), result)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()
@@ -0,0 +1,161 @@
+import pytest
+import pytest_check as check
+
+from commons.datagen import GeneratorConfig
+import setup_database
+from setup_database import CopyStream, insert_bulk_data
+
+
+class RecordingCursor:
+    """Stands in for a psycopg2 cursor: keeps the statements and what each COPY reads, runs nothing."""
+
+    def __init__(self, foreign_keys=()):
+        self.copied: dict[str, list[list[str]]] = {}
+        self.executed: list[str] = []
+        self.foreign_keys = list(foreign_keys)
+
+    def execute(self, query, _params=None):
+        self.executed.append(query)
+
+    def fetchone(self):
+        return (False,)
+
+    def fetchall(self):
+        return self.foreign_keys
+
+    def copy_expert(self, sql, stream, size):
+        chunks = iter(lambda: stream.read(size), "")
+        table = sql.split()[1]
+        self.copied[table] = [line.split("\t") for line in "".join(chunks).splitlines()]
+
+
+@pytest.fixture
+def schema_cursor(scratch_schema):
+    """A cursor whose search_path is a scratch schema with the setup_database.py tables, rolled back afterwards."""
+    conn = scratch_schema.connect()
+    try:
+        with conn.cursor() as cursor:
+            setup_database.create_extensions(cursor)
+            setup_database.create_tables(cursor)
+            yield cursor
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+class TestCopyStream:
+    """Test the COPY reader (plain iterators, no database)."""
+
+    def test_reads_every_line_in_batches(self):
+        """Test that small reads return all lines and batches are counted."""
+        stream = CopyStream((f"{i}\n" for i in range(10)), batch_size=4)
+        chunks = iter(lambda: stream.read(3), "")
+        check.equal("".join(chunks), "".join(f"{i}\n" for i in range(10)))
+        check.equal((stream.rows, stream.batches), (10, 3))
+        check.equal(stream.read(3), "")
+
+
+class TestBulkData:
+    """Test generated rows with the COPY cursor mocked by RecordingCursor."""
+
+    def test_seed_reproduces_rows_and_children_reference_parents(self, capsys):
+        """Test determinism, requested counts and that foreign keys point at generated rows."""
+        first, second = RecordingCursor(), RecordingCursor()
+        counts = insert_bulk_data(first, GeneratorConfig(tasks=300, users=20, seed=7))
+        insert_bulk_data(second, GeneratorConfig(tasks=300, users=20, seed=7))
+        check.equal(first.copied, second.copied)
+        check.equal((counts["tasks"], counts["users"]), (300, 20))
+        check.equal(counts, {table: len(rows) for table, rows in first.copied.items()})
+        check.is_in("rows/s", capsys.readouterr().out)
+
+        users = {row[0] for row in first.copied["users"]}
+        tasks = {row[0] for row in first.copied["tasks"]}
+        check.is_true({row[9] for row in first.copied["tasks"]} - {r"\N"} <= users)
+        check.is_true({row[1] for row in first.copied["comments"]} <= tasks)
+        check.is_true({row[2] for row in first.copied["comments"]} <= users)
+        check.is_true({row[0] for row in first.copied["task_categories"]} == tasks)
+
+    FOREIGN_KEY = ("comments", "comments_task_id_fkey", "FOREIGN KEY (task_id) REFERENCES tasks(id)")
+
+    def test_constraints_are_left_alone_by_default(self):
+        """Test that a plain load copies every table without touching foreign keys."""
+        cursor = RecordingCursor([self.FOREIGN_KEY])
+        counts = insert_bulk_data(cursor, GeneratorConfig(tasks=20, seed=1), batch_size=8)
+        check.equal(counts["tasks"], len(cursor.copied["tasks"]))
+        check.equal(len(cursor.copied), 7)
+        check.equal([q for q in cursor.executed if "ALTER TABLE" in q or "pg_constraint" in q], [])
+
+    def test_deferred_foreign_keys_are_dropped_and_re_added(self):
+        """Test that opting in drops each foreign key before the COPYs and re-adds it after."""
+        cursor = RecordingCursor([self.FOREIGN_KEY])
+        insert_bulk_data(cursor, GeneratorConfig(tasks=20, seed=1), defer_foreign_keys=True)
+        check.equal([q for q in cursor.executed if q.startswith("ALTER TABLE")], [
+            "ALTER TABLE comments DROP CONSTRAINT comments_task_id_fkey;",
+            "ALTER TABLE comments ADD CONSTRAINT comments_task_id_fkey FOREIGN KEY (task_id) REFERENCES tasks(id);",
+        ])
+
+
+@pytest.mark.integration
+class TestBulkLoad:
+    """Test COPY into a scratch schema on a real Postgres (skipped when it is not running)."""
+
+    def test_load_keeps_foreign_keys(self, schema_cursor):
+        """Test that the rows load and the foreign keys dropped for a deferred load are back."""
+        counts = insert_bulk_data(schema_cursor, GeneratorConfig(tasks=500, seed=1), batch_size=128,
+                                  defer_foreign_keys=True)
+        schema_cursor.execute(
+            "SELECT count(*) FROM pg_constraint WHERE contype = 'f' AND connamespace = current_schema()::regnamespace"
+        )
+        check.equal(schema_cursor.fetchone()[0], 11)
+        schema_cursor.execute("SELECT count(*) FROM comments JOIN tasks ON tasks.id = comments.task_id")
+        check.equal(schema_cursor.fetchone()[0], counts["comments"])
+        schema_cursor.execute("SELECT min(number), max(number), count(*) FROM tasks")
+        check.equal(schema_cursor.fetchone(), (1, 500, 500))
+
+
+
+ROLLUPS = (
+    "SELECT user_id, status, task_count FROM user_status_counts WHERE task_count <> 0 ORDER BY 1, 2",
+    "SELECT task_id, user_id, comment_count FROM task_commenters WHERE comment_count <> 0 ORDER BY 1, 2",
+    "SELECT task_id, comment_count, unique_commenters, last_comment_at FROM task_comment_stats WHERE comment_count <> 0 ORDER BY 1",
+)
+
+
+def rollups(cursor):
+    result = []
+    for query in ROLLUPS:
+        cursor.execute(query)
+        result.append(cursor.fetchall())
+    return result
+
+
+class TestRollups:
+    """Test the trigger-maintained report rollups in a scratch schema on a real Postgres (nothing mocked)."""
+
+    def test_triggers_match_a_rebuild(self, schema_cursor):
+        """Test that after inserts, updates, moves and deletes the rollups equal a from-scratch refresh."""
+        setup_database.insert_bulk_data(schema_cursor, GeneratorConfig(tasks=300, seed=3))
+        setup_database.create_rollups(schema_cursor)
+        statements = (
+            "UPDATE tasks SET status = 'completed' WHERE number % 3 = 0",
+            "UPDATE tasks SET assigned_to = (SELECT min(id::text)::uuid FROM users) WHERE number % 5 = 0",
+            "INSERT INTO comments (task_id, user_id, content, created_at) "
+            "SELECT id, created_by, 'late', now() + interval '1 day' FROM tasks WHERE number % 4 = 0",
+            "DELETE FROM comments WHERE content = 'late' AND ctid IN (SELECT ctid FROM comments WHERE content = 'late' LIMIT 20)",
+            "UPDATE comments SET task_id = (SELECT id FROM tasks WHERE number = 1) WHERE content = 'late'",
+            "UPDATE comments SET content = 'edited'",
+            "DELETE FROM users WHERE id IN (SELECT assigned_to FROM tasks WHERE number = 2)",
+            "DELETE FROM tasks WHERE number % 7 = 0",
+        )
+        for sql in statements:
+            schema_cursor.execute(sql)
+            live = rollups(schema_cursor)
+            schema_cursor.execute("SELECT refresh_rollups()")
+            check.equal(live, rollups(schema_cursor), sql)
+        schema_cursor.execute("SELECT count(*) FROM task_comment_stats WHERE task_id NOT IN (SELECT id FROM tasks)")
+        check.equal(schema_cursor.fetchone()[0], 0)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()
@@ -0,0 +1,99 @@
+import pytest
+import pytest_check as check
+
+from backend.snapshot import MmapTaskSnapshot, capture_rows, write_snapshot
+from backend.tasks import TaskManager
+
+
+def snapshot_of(manager: TaskManager, path) -> MmapTaskSnapshot:
+    """Write `manager` to `path` and map it back."""
+    write_snapshot(path, capture_rows(manager.tasks), manager.version, manager.next_id)
+    return MmapTaskSnapshot(path)
+
+
+@pytest.fixture
+def source() -> TaskManager:
+    manager = TaskManager()
+    manager.add_tasks([("Write tests", "high"), ("Ship it 🚀", "low"), ("Drop me", "medium"), ("Ünïcode", "high")])
+    manager.complete_task(1)
+    manager.remove_task(3)
+    return manager
+
+
+class TestMmapTaskSnapshot:
+    """Test the binary snapshot format through real files in a temp dir (nothing mocked)."""
+
+    def test_round_trip(self, source, tmp_path):
+        """Test that every field survives a write and a mapped read."""
+        with snapshot_of(source, tmp_path / "snapshot.bin") as snapshot:
+            check.equal((snapshot.count, snapshot.version, snapshot.next_id), (3, source.version, 5))
+            check.equal(list(snapshot.ids), [1, 2, 4])
+            for index, original in enumerate(source.list_tasks()):
+                task = snapshot.task_at(index)
+                check.equal(task.to_dict(), original.to_dict())
+                check.equal(task.created_ts, original.created_ts)
+            check.equal(snapshot.ids_with_priority("high"), [1, 4])
+            check.equal(snapshot.ids_with_completed(True), [1])
+            check.equal(snapshot.ids_with_completed(False), [2, 4])
+            assert snapshot.index_of(3) is None  # Keep assert for None checks
+
+    def test_rejects_foreign_and_truncated_files(self, source, tmp_path):
+        """Test that a wrong magic or a short file is refused instead of misread."""
+        path = tmp_path / "snapshot.bin"
+        snapshot_of(source, path).close()
+        data = path.read_bytes()
+        path.write_bytes(data[:-1])
+        with pytest.raises(ValueError):
+            MmapTaskSnapshot(path)
+        path.write_bytes(b"NOTASNAP" + data[8:])
+        with pytest.raises(ValueError):
+            MmapTaskSnapshot(path)
+
+
+class TestRestoreSnapshot:
+    """Test a TaskManager restored lazily from a mapped snapshot (nothing mocked)."""
+
+    def test_tasks_are_materialized_on_access(self, source, tmp_path):
+        """Test that restoring reads no task and lookups only read what they touch."""
+        manager = TaskManager()
+        manager.restore_snapshot(snapshot_of(source, tmp_path / "snapshot.bin"))
+        check.equal(manager.tasks.materialized, 0)
+        check.equal(len(manager.tasks), 3)
+        check.equal(manager.get_task(2).description, "Ship it 🚀")
+        assert manager.get_task(3) is None  # Keep assert for None checks
+        check.equal(manager.tasks.materialized, 1)
+        check.equal([t.id for t in manager.page_tasks(limit=1, priority="high")[0]], [1])
+        check.equal(manager.tasks.materialized, 2)
+
+    def test_behaves_like_the_source_manager(self, source, tmp_path):
+        """Test that queries, mutations and id allocation continue where the source left off."""
+        manager = TaskManager()
+        manager.restore_snapshot(snapshot_of(source, tmp_path / "snapshot.bin"))
+        check.equal([t.to_dict() for t in manager.list_tasks()], [t.to_dict() for t in source.list_tasks()])
+        check.equal(manager.version, source.version)
+        check.equal(manager.add_task("New").id, 5)
+        check.is_true(manager.complete_task(4))
+        check.is_true(manager.remove_task(2))
+        check.is_false(manager.remove_task(2))
+        check.equal([t.id for t in manager.list_tasks()], [1, 4, 5])
+        check.equal([t.id for t in manager.get_pending_tasks()], [5])
+        check.equal([t.id for t in manager.get_completed_tasks()], [1, 4])
+        check.equal([t.id for t in manager.get_tasks_by_priority("high")], [1, 4])
+
+    def test_rewrite_copies_untouched_rows(self, source, tmp_path):
+        """Test that a snapshot of a lazily restored manager keeps untouched and changed tasks."""
+        manager = TaskManager()
+        manager.restore_snapshot(snapshot_of(source, tmp_path / "first.bin"))
+        manager.complete_task(2)
+        manager.remove_task(4)
+        manager.add_task("Added after restore", "low")
+
+        restored = TaskManager()
+        restored.restore_snapshot(snapshot_of(manager, tmp_path / "second.bin"))
+        check.equal([t.to_dict() for t in restored.list_tasks()], [t.to_dict() for t in manager.list_tasks()])
+        check.equal(restored.next_id, 6)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()
@@ -1,5 +1,10 @@
+from datetime import datetime
+import json
+import threading
+
 import pytest
 import pytest_check as check
+
 from backend.tasks import Task, TaskManager
 
 
@@ -46,6 +51,43 @@ class TestTask:
         check.is_in("🔴", str(task))  # priority symbol preserved
         check.is_in("(high)", str(task))  # priority text preserved
     
+    def test_compact_representation(self):
+        """Test that Task is slotted and still exposes created_at as a datetime."""
+        task = Task(1, "Test task", "HIGH")
+        assert not hasattr(task, "__dict__")  # slotted, no per-instance dict
+        assert isinstance(task.created_at, datetime)
+        check.is_(task.priority, Task(2, "Other", "high").priority)  # shared interned string
+
+        when = datetime(2024, 1, 2, 3, 4, 5)
+        task.created_at = when
+        check.equal(task.created_at, when)
+
+    def test_json_fragment_cache(self):
+        """Test that to_json is cached and refreshed after mark_completed."""
+        task = Task(1, "Test \"quoted\" task", "low")
+        fragment = task.to_json()
+        check.is_(task.to_json(), fragment)
+        check.equal(json.loads(fragment), task.to_dict())
+
+        task.mark_completed()
+        check.is_true(json.loads(task.to_json())["completed"])
+
+    def test_json_cache_follows_field_assignment(self):
+        """Test that assigning any API field refreshes to_json."""
+        task = Task(1, "Before", "low")
+        task.to_json()
+
+        task.id = 7
+        task.description = "After"
+        task.priority = "HIGH"
+        check.equal(json.loads(task.to_json()), {"id": 7, "description": "After", "priority": "high", "completed": False})
+
+        task.completed = True
+        check.is_true(json.loads(task.to_json())["completed"])
+
+        with pytest.raises(ValueError):
+            task.priority = "urgent"
+
     def test_priority_validation(self):
         """Test priority validation."""
         # Valid priorities
@@ -134,6 +176,21 @@ class TestTaskManager:
         result = self.manager.remove_task(999)
         check.is_false(result)
     
+    def test_remove_task_keeps_insertion_order(self):
+        """Test that removing from the middle keeps the remaining tasks in order."""
+        task1 = self.manager.add_task("Task 1")
+        task2 = self.manager.add_task("Task 2")
+        task3 = self.manager.add_task("Task 3")
+
+        check.is_true(self.manager.remove_task(task2.id))
+        check.is_false(self.manager.remove_task(task2.id))
+        assert self.manager.get_task(task2.id) is None  # Keep assert for None checks
+        check.equal([t.id for t in self.manager.list_tasks()], [task1.id, task3.id])
+
+        task4 = self.manager.add_task("Task 4")
+        check.equal(task4.id, 4)  # ids are never reused
+        check.equal([t.id for t in self.manager.list_tasks()], [1, 3, 4])
+
     def test_get_pending_tasks(self):
         """Test getting only pending tasks."""
         task1 = self.manager.add_task("Task 1")
@@ -201,6 +258,99 @@ class TestTaskManager:
         check.equal(sorted_tasks[2].priority, "low")
 
 
+    def test_indexed_views_follow_mutations(self):
+        """Test that pending/completed/priority views stay in id order across mutations."""
+        tasks = [self.manager.add_task(f"Task {i}", ("high", "low")[i % 2]) for i in range(200)]
+
+        for task in reversed(tasks[:150]):
+            self.manager.complete_task(task.id)
+        for task in tasks[:100]:
+            self.manager.remove_task(task.id)
+
+        completed_ids = [t.id for t in self.manager.get_completed_tasks()]
+        pending_ids = [t.id for t in self.manager.get_pending_tasks()]
+        check.equal(completed_ids, [t.id for t in tasks[100:150]])
+        check.equal(pending_ids, [t.id for t in tasks[150:]])
+        check.equal(len(self.manager.get_tasks_by_priority("high")), 50)
+        check.equal(self.manager.get_tasks_by_priority("urgent"), [])
+        check.equal(len(self.manager.get_tasks_by_priority("HIGH")), 50)
+
+        sorted_tasks = self.manager.get_priority_sorted_tasks()
+        check.equal(len(sorted_tasks), 100)
+        check.equal([t.priority for t in sorted_tasks], ["high"] * 50 + ["low"] * 50)
+
+    def test_bulk_operations(self):
+        """Test add_tasks/complete_tasks/remove_tasks and their per-item results."""
+        tasks = self.manager.add_tasks([("Task 1", "high"), ("Task 2", "LOW"), ("Task 3", "medium")])
+        check.equal([t.id for t in tasks], [1, 2, 3])
+        check.equal(tasks[1].priority, "low")
+
+        check.equal(self.manager.complete_tasks([1, 99, 3]), [True, False, True])
+        check.equal([t.id for t in self.manager.get_completed_tasks()], [1, 3])
+
+        check.equal(self.manager.remove_tasks([2, 2, 3]), [True, False, True])
+        check.equal([t.id for t in self.manager.list_tasks()], [1])
+
+    def test_add_tasks_is_all_or_nothing(self):
+        """Test that one invalid priority rejects the whole batch."""
+        with pytest.raises(ValueError):
+            self.manager.add_tasks([("Task 1", "high"), ("Task 2", "invalid")])
+        check.equal(len(self.manager.tasks), 0)
+        check.equal(self.manager.add_task("Task").id, 1)
+
+    def test_version_counts_state_changes(self):
+        """Test that version increases on each change and not on no-op calls."""
+        check.equal(self.manager.version, 0)
+        task = self.manager.add_task("Task 1")
+        self.manager.add_tasks([("Task 2", "low"), ("Task 3", "low")])
+        check.equal(self.manager.version, 3)
+
+        self.manager.complete_task(task.id)
+        self.manager.complete_task(task.id)  # already completed
+        self.manager.complete_task(999)
+        check.equal(self.manager.version, 4)
+
+        self.manager.remove_task(task.id)
+        self.manager.remove_task(task.id)
+        check.equal(self.manager.version, 5)
+
+
+class TestThreadSafeTaskManager:
+    """Stress the thread-safe mode from many real threads (nothing mocked)."""
+
+    def test_concurrent_mutations_keep_state_consistent(self):
+        """Test unique sequential ids and consistent indexes under concurrent add/complete/remove."""
+        manager = TaskManager(thread_safe=True)
+        n_threads, per_thread = 8, 500
+        created: list[list[int]] = [[] for _ in range(n_threads)]
+        barrier = threading.Barrier(n_threads)
+
+        def worker(slot: int) -> None:
+            barrier.wait()
+            for i in range(per_thread):
+                task = manager.add_task(f"T{slot}-{i}", ("high", "medium", "low")[i % 3])
+                created[slot].append(task.id)
+                if i % 2:
+                    manager.complete_task(task.id)
+                if i % 5 == 0:
+                    manager.remove_task(task.id)
+                manager.page_tasks(limit=10, completed=True)
+                manager.changes_since(max(0, manager.version - 5))
+
+        threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(n_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        all_ids = sorted(task_id for ids in created for task_id in ids)
+        check.equal(all_ids, list(range(1, n_threads * per_thread + 1)))
+        remaining = manager.list_tasks()
+        check.equal(len(remaining), n_threads * per_thread * 4 // 5)
+        check.equal(len(manager.get_pending_tasks()) + len(manager.get_completed_tasks()), len(remaining))
+        check.equal(len(manager.get_priority_sorted_tasks()), len(remaining))
+        check.is_true(all(task.completed for task in manager.get_completed_tasks()))
+
 if __name__ == "__main__":  # pragma: no cover
     from commons.utils import pytest_this_file
     pytest_this_file()
\ No newline at end of file
@@ -0,0 +1,64 @@
+import pytest
+import pytest_check as check
+import requests
+
+from commons.mock_hasura import MockHasura
+import track_tables
+
+RELATIONSHIPS = len(track_tables.OBJECT_RELATIONSHIPS) + len(track_tables.ARRAY_RELATIONSHIPS)
+
+
+@pytest.fixture
+def hasura():
+    """A local mock Hasura with empty metadata, stopped afterwards."""
+    with MockHasura() as mock:
+        yield mock
+
+
+class TestBootstrap:
+    """Test the metadata bootstrap against commons.mock_hasura (no real Hasura)."""
+
+    def test_one_bulk_request_then_idempotent(self, hasura):
+        """Test that a first run is export + one bulk on one connection, and a re-run only exports."""
+        with requests.Session() as session:
+            applied = track_tables.bootstrap(session, hasura.url)
+        check.equal(len(applied), 1 + len(track_tables.TABLES) + RELATIONSHIPS)
+        check.equal((hasura.requests, hasura.connections), (2, 1))
+
+        hasura.reset_counters()
+        with requests.Session() as session:
+            check.equal(track_tables.bootstrap(session, hasura.url), [])
+            response = session.post(f"{hasura.url}/v1/graphql", json={"query": "{ users { id } tasks { title } }"})
+        check.equal(response.json(), {"data": {"users": [], "tasks": []}})
+        check.equal((hasura.requests, hasura.connections), (2, 1))
+
+    def test_partial_metadata_gets_only_the_rest(self, hasura):
+        """Test that tables and relationships already tracked are not sent again."""
+        hasura.metadata({"type": "bulk", "args": [
+            track_tables.add_source_command(),
+            track_tables.track_table_command("users"),
+            track_tables.track_table_command("tasks"),
+            track_tables.object_relationship_command("tasks", "assigned_to", "assigned_user"),
+        ]})
+        with requests.Session() as session:
+            applied = track_tables.bootstrap(session, hasura.url)
+        check.equal(len(applied), len(track_tables.TABLES) - 2 + RELATIONSHIPS - 1)
+        check.is_false(any(c["type"] == "pg_add_source" for c in applied))
+        tables = hasura.export_metadata()["sources"][0]["tables"]
+        check.equal(len(tables), len(track_tables.TABLES))
+        check.equal(sum(len(t.get("object_relationships", [])) + len(t.get("array_relationships", [])) for t in tables),
+                    RELATIONSHIPS)
+
+    def test_failed_bulk_changes_nothing(self, hasura):
+        """Test that a rejected command fails the run and leaves the metadata untouched."""
+        hasura.metadata(track_tables.add_source_command())
+        hasura.metadata(track_tables.track_table_command("users"))
+        bad = track_tables.object_relationship_command("users", "id", "id")  # the second copy clashes with the first
+        with requests.Session() as session, pytest.raises(RuntimeError, match="already exists"):
+            track_tables.post_metadata(session, hasura.url, {"type": "bulk", "args": [bad, bad]})
+        check.equal(hasura.export_metadata()["sources"][0]["tables"], [{"table": {"schema": "public", "name": "users"}}])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from commons.utils import pytest_this_file
+    pytest_this_file()